@@ -1,138 +1,107 @@
 
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from datetime import datetime
-import re
-import io
+import time
+
+from buyit import analytics, archive, core, dashboard, export, ingest, ledger, lineage, profiling, queries, rollups, search, storage, vendors, workflow
+from buyit.intake import extract_fields
+from buyit.query_cache import QueryCache
 
 st.set_page_config(page_title="BuyIT Hub Demo", layout="wide")
 
-DB_URL = "sqlite:///buyit_hub.db"
-engine = create_engine(DB_URL, future=True)
-
-# ---------- DB Setup ----------
-DDL = """
-CREATE TABLE IF NOT EXISTS users (
-  user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-  name TEXT NOT NULL,
-  role TEXT NOT NULL
-);
-
-CREATE TABLE IF NOT EXISTS vendors (
-  vendor_id INTEGER PRIMARY KEY AUTOINCREMENT,
-  vendor_name TEXT NOT NULL UNIQUE
-);
-
-CREATE TABLE IF NOT EXISTS requests (
-  request_id INTEGER PRIMARY KEY AUTOINCREMENT,
-  created_at TEXT NOT NULL,
-  requester_name TEXT NOT NULL,
-  department TEXT NOT NULL,
-  item_desc TEXT NOT NULL,
-  quantity INTEGER NOT NULL,
-  est_cost REAL NOT NULL,
-  justification TEXT NOT NULL,
-  vendor_name TEXT,
-  status TEXT NOT NULL DEFAULT 'Submitted'
-);
-
-CREATE TABLE IF NOT EXISTS approvals (
-  approval_id INTEGER PRIMARY KEY AUTOINCREMENT,
-  request_id INTEGER NOT NULL,
-  approver_name TEXT NOT NULL,
-  decision TEXT NOT NULL,
-  comments TEXT,
-  decided_at TEXT NOT NULL,
-  FOREIGN KEY(request_id) REFERENCES requests(request_id)
-);
-
-CREATE TABLE IF NOT EXISTS purchase_orders (
-  po_id INTEGER PRIMARY KEY AUTOINCREMENT,
-  request_id INTEGER NOT NULL UNIQUE,
-  po_number TEXT NOT NULL UNIQUE,
-  created_at TEXT NOT NULL,
-  created_by TEXT NOT NULL,
-  vendor_name TEXT NOT NULL,
-  total_amount REAL NOT NULL,
-  status TEXT NOT NULL DEFAULT 'Created',
-  FOREIGN KEY(request_id) REFERENCES requests(request_id)
-);
-
-CREATE TABLE IF NOT EXISTS invoices (
-  invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
-  po_number TEXT NOT NULL,
-  vendor_name TEXT NOT NULL,
-  invoice_number TEXT NOT NULL,
-  invoice_amount REAL NOT NULL,
-  invoice_date TEXT NOT NULL,
-  status TEXT NOT NULL,
-  exception_reason TEXT,
-  created_at TEXT NOT NULL
-);
-
-CREATE INDEX IF NOT EXISTS idx_requests_status ON requests(status);
-CREATE INDEX IF NOT EXISTS idx_invoices_status ON invoices(status);
-"""
-
-def init_db():
-    with engine.begin() as conn:
-        for stmt in DDL.strip().split(";"):
-            s = stmt.strip()
-            if s:
-                conn.execute(text(s))
+DB_URL = storage.DEFAULT_DB_URL
 
-def seed_data():
-    with engine.begin() as conn:
-        conn.execute(text("INSERT OR IGNORE INTO vendors(vendor_name) VALUES (:v)"),
-                     [{"v":"Figma"}, {"v":"Microsoft"}, {"v":"Amazon Business"}, {"v":"Dell"}, {"v": "T"}])
-        conn.execute(text("INSERT INTO users(name, role) VALUES (:n, :r)"), [
-            {"n":"Rohan", "r":"Employee/Requester"},
-            {"n":"Isha", "r":"Approver"},
-            {"n":"Shalini", "r":"Procurement Specialist"},
-            {"n":"Asha", "r":"AP Analyst"},
-            {"n":"Neel", "r":"Compliance Auditor"},
-        ])
-
-init_db()
+@st.cache_resource
+def get_profiler():
+    return profiling.Profiler.from_env()
+
+profiler = get_profiler()
+
+@st.cache_resource
+def get_hub():
+    """Storage for this process; the schema is migrated once here, not on every rerun."""
+    hub = core.Hub(DB_URL, attach=profiler.attach)
+    hub.ensure_schema()
+    return hub
+
+hub = get_hub()
+engine = hub.engine
+
+def write_tx(fn, invalidates=()):
+    """Run fn(conn) in a write transaction (through the writer queue in production mode)."""
+    try:
+        return hub.write(fn)
+    finally:
+        if invalidates:
+            get_query_cache().invalidate_tables(invalidates)
 
 # ---------- Helpers ----------
-def df(query, params=None):
+@st.cache_resource
+def get_query_cache():
+    cache = QueryCache(max_entries=256, max_bytes=64 * 1024 * 1024, ttl=30.0)
+    for table in rollups.SOURCE_TABLES:
+        cache.add_dependents(table, rollups.ROLLUP_TABLES)
+    for table in lineage.SOURCE_TABLES:
+        cache.add_dependents(table, lineage.LINEAGE_TABLES)
+    for table in search.SOURCE_TABLES:
+        cache.add_dependents(table, search.SEARCH_TABLES)
+    for table in ledger.SOURCE_TABLES:
+        cache.add_dependents(table, ledger.LEDGER_TABLES)
+    return cache
+
+query_cache = get_query_cache()
+
+def _read_sql(query, params=None):
     with engine.begin() as conn:
         return pd.read_sql(text(query), conn, params=params or {})
 
-def exec_sql(query, params=None):
-    with engine.begin() as conn:
-        conn.execute(text(query), params or {})
+def df(query, params=None):
+    if not profiler.enabled:
+        return query_cache.get_or_load(query, params, lambda: _read_sql(query, params))
+    started = time.perf_counter()
+    frame = query_cache.get_or_load(query, params, lambda: _read_sql(query, params))
+    profiler.record_query("df", query, time.perf_counter() - started, len(frame))
+    return frame
+
+@st.cache_resource
+def get_dashboard_loader():
+    return dashboard.DashboardLoader(profiler.attach(dashboard.make_readonly_engine(DB_URL)))
+
+def df_readonly(query, params=None):
+    """``df`` for worker threads: same cache, read-only pool, no Streamlit calls."""
+    loader = get_dashboard_loader()
+    started = time.perf_counter()
+    frame = query_cache.get_or_load(query, params, lambda: dashboard.read_frame(loader.engine, query, params))
+    if profiler.enabled:
+        profiler.record_query("df", query, time.perf_counter() - started, len(frame))
+    return frame
+
+@st.cache_resource
+def sweep_old_reports():
+    """Once per process: remove temp reports a previous, killed process left behind."""
+    return export.sweep_reports()
+
+sweep_old_reports()
+
+@st.cache_resource
+def get_archive():
+    return archive.ArchiveStore(hub.archive_root())
+
+def with_archive(name, frame):
+    """Add archived (cold) rows to a dashboard panel read from the hot tables."""
+    with engine.connect() as conn:
+        return get_archive().merge_panel(conn, name, frame)
+
+def vendor_index():
+    """The vendor master index (reloaded only when vendors or aliases change)."""
+    with engine.connect() as conn:
+        return vendors.current(conn)
 
 def now_iso():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def extract_fields(free_text: str):
-    t = free_text.strip()
-    qty = None
-    m = re.search(r"\b(\d+)\s*(licenses|license|units|laptops|seats|subscriptions)?\b", t, flags=re.I)
-    if m:
-        qty = int(m.group(1))
-
-    cost = None
-    m = re.search(r"(\$|usd)\s*([\d,]+(\.\d+)?)", t, flags=re.I)
-    if m:
-        cost = float(m.group(2).replace(",", ""))
-    else:
-        m = re.search(r"\b([\d,]+(\.\d+)?)\s*(usd|dollars)\b", t, flags=re.I)
-        if m:
-            cost = float(m.group(1).replace(",", ""))
-
-    vendor = ""
-    for v in ["Figma", "Microsoft", "Amazon", "Dell", "Adobe", "Google"]:
-        if re.search(rf"\b{re.escape(v)}\b", t, flags=re.I):
-            vendor = "Amazon Business" if v.lower()=="amazon" else v
-            break
-
-    item_desc = t.split(".")[0][:180] if t else "Software/Hardware purchase"
-    return {"item_desc": item_desc, "quantity": qty or 1, "est_cost": cost or 0.0, "vendor_name": vendor}
-
 def status_badge(s):
     color = {
         "Submitted":"🟦",
@@ -145,21 +114,62 @@ def status_badge(s):
     }.get(s, "⬜")
     return f"{color} {s}"
 
+PAGE_SIZE = 25
+
+def request_grid(key, sql):
+    """Filterable request grid, one keyset page at a time; returns (rows on this page, filters active)."""
+    with st.expander("Filters", expanded=False):
+        f1, f2 = st.columns(2)
+        department = f1.text_input("Department", key=f"{key}_department")
+        requester = f2.text_input("Requester contains", key=f"{key}_requester")
+        f3, f4 = st.columns(2)
+        min_cost = f3.number_input("Min est. cost", min_value=0.0, step=100.0, key=f"{key}_min_cost")
+        max_cost = f4.number_input("Max est. cost (0 = any)", min_value=0.0, step=100.0, key=f"{key}_max_cost")
+    filters = (department.strip(), requester.strip(), min_cost, max_cost)
+
+    # Stack of "request_id < before" cursors; the last one is the page on screen.
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    if st.session_state.get(f"{key}_filters") != filters:
+        st.session_state[f"{key}_filters"] = filters
+        cursors[:] = [None]
+
+    rows = df(sql, queries.page_params(cursors[-1], PAGE_SIZE + 1, *filters))
+    has_next = len(rows) > PAGE_SIZE
+    rows = rows.head(PAGE_SIZE)
+
+    prev_col, info_col, next_col = st.columns([1, 2, 1])
+    if prev_col.button("◀ Newer", key=f"{key}_prev", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    info_col.caption(f"Page {len(cursors)} · {len(rows)} rows")
+    if next_col.button("Older ▶", key=f"{key}_next", disabled=not has_next):
+        cursors.append(int(rows["request_id"].iloc[-1]))
+        st.rerun()
+    return rows, any(filters)
+
+def pick_request(label, page_ids, statuses, key):
+    """Request ID picker over the current page, plus a direct lookup for any ID in ``statuses``."""
+    lookup = st.number_input("Find request ID (0 = pick from this page)", min_value=0, step=1, key=f"{key}_lookup")
+    if lookup:
+        found = df(queries.REQUEST_BY_ID, {"id": int(lookup)})
+        if found.empty or found.iloc[0]["status"] not in statuses:
+            st.warning(f"Request {int(lookup)} is not {' / '.join(statuses)}.")
+        else:
+            return int(lookup)
+    if not page_ids:
+        return None
+    return st.selectbox(label, page_ids, key=f"{key}_select")
+
 # ---------- Sidebar ----------
 st.sidebar.title("BuyIT Hub Demo")
 with st.sidebar.expander("Demo Setup", expanded=False):
     if st.button("Seed sample users & vendors"):
-        seed_data()
+        hub.seed_demo()
+        query_cache.invalidate_tables(["vendors", "users"])
         st.success("Seeded sample data.")
     if st.button("Reset demo database (danger)"):
-        with engine.begin() as conn:
-            conn.execute(text("DROP TABLE IF EXISTS invoices"))
-            conn.execute(text("DROP TABLE IF EXISTS purchase_orders"))
-            conn.execute(text("DROP TABLE IF EXISTS approvals"))
-            conn.execute(text("DROP TABLE IF EXISTS requests"))
-            conn.execute(text("DROP TABLE IF EXISTS vendors"))
-            conn.execute(text("DROP TABLE IF EXISTS users"))
-        init_db()
+        hub.reset()
+        query_cache.clear()
         st.warning("Database reset complete.")
 
 page = st.sidebar.radio("Navigate", [
@@ -167,12 +177,17 @@ page = st.sidebar.radio("Navigate", [
     "2) Approvals",
     "3) Purchase Orders",
     "4) Invoice Processing (Match PO)",
-    "5) Analytics & Audit"
+    "5) Analytics & Audit",
+    "6) Search"
 ])
 
 st.sidebar.markdown("---")
+cache_stats_slot = st.sidebar.empty()
+profiling_slot = st.sidebar.empty()
 st.sidebar.caption("UML mapping: Request → Approval → PO → Invoice Match («include») → Reports")
 
+timer = profiler.timer(page)
+
 # ---------- Page 1 ----------
 if page.startswith("1)"):
     st.header("1) AI Intake: Create Procurement Request")
@@ -187,7 +202,7 @@ if page.startswith("1)"):
         )
 
         if st.button("Extract fields (AI Intake)"):
-            st.session_state["extracted"] = extract_fields(free_text)
+            st.session_state["extracted"] = extract_fields(free_text, vendor_index())
             st.success("Fields extracted. Review and submit below.")
 
         extracted = st.session_state.get("extracted", {"item_desc":"", "quantity":1, "est_cost":0.0, "vendor_name":""})
@@ -202,30 +217,22 @@ if page.startswith("1)"):
         justification = st.text_area("Business justification", height=100, value="Enable team productivity / required tools for delivery.")
 
         if st.button("Submit Request"):
-            exec_sql("""
-                INSERT INTO requests(created_at, requester_name, department, item_desc, quantity, est_cost, justification, vendor_name, status)
-                VALUES (:created_at, :requester_name, :department, :item_desc, :quantity, :est_cost, :justification, :vendor_name, 'Submitted')
-            """, {
-                "created_at": now_iso(),
-                "requester_name": requester,
-                "department": dept,
-                "item_desc": item_desc,
-                "quantity": int(qty),
-                "est_cost": float(est_cost),
-                "justification": justification,
-                "vendor_name": vendor_name.strip() or None
-            })
+            write_tx(lambda conn: workflow.submit_request(conn, requester, dept, item_desc, qty, est_cost, justification,
+                                                          vendor_name, now_iso()),
+                     invalidates=workflow.REQUEST_TABLES)
             st.success("Request submitted ✅")
+    timer.lap("intake form")
 
     with col2:
         st.subheader("Recent requests")
-        r = df("SELECT request_id, created_at, requester_name, department, item_desc, quantity, est_cost, vendor_name, status FROM requests ORDER BY request_id DESC LIMIT 20")
+        r = df(queries.RECENT_REQUESTS)
         if r.empty:
             st.info("No requests yet.")
         else:
             r2 = r.copy()
             r2["status"] = r2["status"].apply(status_badge)
             st.dataframe(r2, use_container_width=True)
+    timer.lap("recent requests")
 
 # ---------- Page 2 ----------
 elif page.startswith("2)"):
@@ -233,28 +240,27 @@ elif page.startswith("2)"):
 
     left, right = st.columns([1.2, 1])
     with left:
-        pending = df("""
-            SELECT request_id, created_at, requester_name, department, item_desc, quantity, est_cost, vendor_name, status
-            FROM requests
-            WHERE status IN ('Submitted','Pending Approval')
-            ORDER BY request_id DESC
-        """)
         st.subheader("Requests awaiting decision")
+        pending, filtered = request_grid("pending", queries.PENDING_REQUESTS_PAGE)
         if pending.empty:
-            st.success("No pending requests.")
+            if filtered:
+                st.info("No requests match these filters.")
+            else:
+                st.success("No pending requests.")
         else:
             p2 = pending.copy()
             p2["status"] = p2["status"].apply(status_badge)
             st.dataframe(p2, use_container_width=True)
+    timer.lap("pending grid")
 
     with right:
         st.subheader("Take action")
-        req_ids = df("SELECT request_id FROM requests WHERE status IN ('Submitted','Pending Approval') ORDER BY request_id DESC")["request_id"].tolist()
-        if not req_ids:
+        req_ids = pending["request_id"].tolist()
+        req_id = pick_request("Select Request ID", req_ids, workflow.PENDING_STATUSES, "pending")
+        if req_id is None:
             st.info("Create a request first.")
         else:
-            req_id = st.selectbox("Select Request ID", req_ids)
-            req = df("SELECT * FROM requests WHERE request_id=:id", {"id": req_id}).iloc[0].to_dict()
+            req = df(queries.REQUEST_BY_ID, {"id": req_id}).iloc[0].to_dict()
 
             st.markdown(f"**Request {req_id}** — {req['item_desc']}")
             st.write(f"Requester: {req['requester_name']} | Dept: {req['department']} | Est Cost: ${req['est_cost']:,.2f}")
@@ -265,22 +271,44 @@ elif page.startswith("2)"):
                                     value=("Looks good." if decision=="Approved" else "Please revise / provide quote."))
 
             if st.button("Submit decision"):
-                if decision == "Rejected" and not comments.strip():
-                    st.error("Comments required for rejection.")
+                try:
+                    done = write_tx(lambda conn: workflow.decide_requests(conn, [req_id], decision, approver, comments),
+                                    invalidates=workflow.DECISION_TABLES)
+                except ValueError as e:
+                    st.error(str(e))
                 else:
-                    exec_sql("""
-                        INSERT INTO approvals(request_id, approver_name, decision, comments, decided_at)
-                        VALUES (:request_id, :approver_name, :decision, :comments, :decided_at)
-                    """, {
-                        "request_id": int(req_id),
-                        "approver_name": approver.strip(),
-                        "decision": decision,
-                        "comments": comments.strip() or None,
-                        "decided_at": now_iso()
-                    })
-                    exec_sql("UPDATE requests SET status=:s WHERE request_id=:id",
-                             {"s": ("Approved" if decision=="Approved" else "Rejected"), "id": int(req_id)})
-                    st.success(f"Request {req_id} updated ✅")
+                    if done:
+                        st.success(f"Request {req_id} updated ✅")
+                    else:
+                        st.warning(f"Request {req_id} is no longer pending.")
+
+            st.markdown("---")
+            st.subheader("Bulk decision")
+            apply_all = st.checkbox("All pending requests matching the filters (every page)")
+            bulk_ids = [] if apply_all else st.multiselect(
+                "Request IDs", req_ids, default=req_ids if st.checkbox("Select all on this page") else [])
+            bulk_decision = st.radio("Bulk decision", ["Approved", "Rejected"], horizontal=True)
+            bulk_comments = st.text_input("Bulk comments (required for rejection)",
+                                          value=("Looks good." if bulk_decision=="Approved" else ""))
+
+            def decide_bulk(conn):
+                # "All matching" IDs are selected in the write transaction, not loaded into the page.
+                ids = bulk_ids
+                if apply_all:
+                    params = queries.page_params(None, PAGE_SIZE, *st.session_state["pending_filters"])
+                    ids = [row[0] for row in conn.execute(text(queries.PENDING_REQUEST_IDS), params)]
+                return len(ids), workflow.decide_requests(conn, ids, bulk_decision, approver, bulk_comments)
+
+            label = "Apply to all matching requests" if apply_all else f"Apply to {len(bulk_ids)} selected"
+            if st.button(label, disabled=not (apply_all or bulk_ids)):
+                try:
+                    selected, done = write_tx(decide_bulk, invalidates=workflow.DECISION_TABLES)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    skipped = selected - len(done)
+                    st.success(f"{len(done)} requests {bulk_decision.lower()} ✅" + (f" ({skipped} no longer pending)" if skipped else ""))
+    timer.lap("decision panel")
 
 # ---------- Page 3 ----------
 elif page.startswith("3)"):
@@ -288,27 +316,24 @@ elif page.startswith("3)"):
 
     col1, col2 = st.columns([1.2, 1])
     with col1:
-        approved = df("""
-            SELECT request_id, created_at, requester_name, department, item_desc, quantity, est_cost, vendor_name, status
-            FROM requests WHERE status='Approved'
-            ORDER BY request_id DESC
-        """)
         st.subheader("Approved requests")
+        approved, filtered = request_grid("approved", queries.APPROVED_REQUESTS_PAGE)
         if approved.empty:
-            st.info("Approve a request first.")
+            st.info("No requests match these filters." if filtered else "Approve a request first.")
         else:
             a2 = approved.copy()
             a2["status"] = a2["status"].apply(status_badge)
             st.dataframe(a2, use_container_width=True)
+    timer.lap("approved grid")
 
     with col2:
         st.subheader("Create / Update PO")
-        ids = df("SELECT request_id FROM requests WHERE status='Approved' ORDER BY request_id DESC")["request_id"].tolist()
-        if not ids:
+        ids = approved["request_id"].tolist()
+        req_id = pick_request("Approved Request ID", ids, ["Approved"], "approved")
+        if req_id is None:
             st.info("No approved requests.")
         else:
-            req_id = st.selectbox("Approved Request ID", ids)
-            req = df("SELECT * FROM requests WHERE request_id=:id", {"id": req_id}).iloc[0].to_dict()
+            req = df(queries.REQUEST_BY_ID, {"id": req_id}).iloc[0].to_dict()
 
             creator = st.text_input("Created by (Procurement)", value="Shalini")
             vendor = st.text_input("Vendor", value=(req.get("vendor_name") or "Amazon Business"))
@@ -318,45 +343,45 @@ elif page.startswith("3)"):
 
             if st.button("Apply PO action"):
                 if action == "Create PO":
-                    if not po_number.strip():
-                        po_number = f"PO-{int(req_id):06d}"
+                    po_number = po_number.strip() or f"PO-{int(req_id):06d}"
+                    order = {"request_id": req_id, "po_number": po_number, "created_by": creator,
+                             "vendor_name": vendor, "total_amount": total}
                     try:
-                        exec_sql("""
-                            INSERT INTO purchase_orders(request_id, po_number, created_at, created_by, vendor_name, total_amount, status)
-                            VALUES (:request_id, :po_number, :created_at, :created_by, :vendor_name, :total_amount, 'Created')
-                        """, {
-                            "request_id": int(req_id),
-                            "po_number": po_number.strip(),
-                            "created_at": now_iso(),
-                            "created_by": creator.strip(),
-                            "vendor_name": vendor.strip(),
-                            "total_amount": float(total)
-                        })
-                        exec_sql("UPDATE requests SET status='PO Created' WHERE request_id=:id", {"id": int(req_id)})
-                        st.success(f"PO created: {po_number} ✅")
+                        done = write_tx(lambda conn: workflow.create_pos(conn, [order]), invalidates=workflow.PO_TABLES)
                     except Exception as e:
                         st.error(f"Could not create PO (maybe exists): {e}")
+                    else:
+                        if done:
+                            st.success(f"PO created: {po_number} ✅")
+                        else:
+                            st.warning(f"Request {req_id} is no longer Approved.")
                 else:
-                    po = df("SELECT * FROM purchase_orders WHERE request_id=:id", {"id": int(req_id)})
+                    po = df(queries.PO_BY_REQUEST, {"id": int(req_id)})
                     if po.empty:
                         st.error("Create PO first.")
                     else:
                         po_num = po.iloc[0]["po_number"]
                         if action == "Mark as Sent":
-                            exec_sql("UPDATE purchase_orders SET status='Sent' WHERE request_id=:id", {"id": int(req_id)})
-                            exec_sql("UPDATE requests SET status='PO Sent' WHERE request_id=:id", {"id": int(req_id)})
-                            st.success(f"PO {po_num} marked Sent ✅")
+                            done = write_tx(lambda conn: workflow.mark_pos_sent(conn, [req_id]), invalidates=workflow.PO_TABLES)
+                            if done:
+                                st.success(f"PO {po_num} marked Sent ✅")
+                            else:
+                                st.warning(f"PO {po_num} is not in Created status.")
                         elif action == "Close PO":
-                            exec_sql("UPDATE purchase_orders SET status='Closed' WHERE request_id=:id", {"id": int(req_id)})
-                            exec_sql("UPDATE requests SET status='Closed' WHERE request_id=:id", {"id": int(req_id)})
-                            st.success(f"PO {po_num} closed ✅")
+                            done = write_tx(lambda conn: workflow.close_pos(conn, [req_id]), invalidates=workflow.PO_TABLES)
+                            if done:
+                                st.success(f"PO {po_num} closed ✅")
+                            else:
+                                st.warning(f"PO {po_num} is already closed.")
+    timer.lap("PO actions")
 
     st.markdown("---")
     st.subheader("Recent Purchase Orders")
-    po_df = df("SELECT po_number, request_id, vendor_name, total_amount, status, created_at, created_by FROM purchase_orders ORDER BY po_id DESC LIMIT 25")
+    po_df = df(queries.RECENT_POS)
     st.dataframe(po_df, use_container_width=True) 
     if not po_df.empty:
         st.dataframe(po_df, use_container_width=True)
+    timer.lap("recent POs")
     
     
 
@@ -366,59 +391,105 @@ elif page.startswith("4)"):
 
     left, right = st.columns([1.2, 1])
     with left:
-        po_numbers = df("SELECT po_number FROM purchase_orders ORDER BY po_id DESC")["po_number"].tolist()
+        po_numbers = df(queries.PO_NUMBERS)["po_number"].tolist()
         if not po_numbers:
             st.info("Create a PO first.")
         else:
             po_number = st.selectbox("PO Number", po_numbers)
-            po = df("SELECT * FROM purchase_orders WHERE po_number=:p", {"p": po_number}).iloc[0].to_dict()
+            po = df(queries.PO_BY_NUMBER, {"p": po_number}).iloc[0].to_dict()
+
+            balance = df(queries.PO_BALANCE, {"p": po_number})
+            if not balance.empty:
+                b = balance.iloc[0]
+                remaining = round(float(b["remaining"]), 2) + 0.0
+                st.caption(f"Invoiced to date: \\${b['invoiced_to_date']:,.2f} of \\${b['total_amount']:,.2f} "
+                           f"({int(b['invoice_count'])} matched invoices) · remaining \\${remaining:,.2f}")
+                default_amount, next_invoice = max(remaining, 0.0), int(b["invoice_count"]) + 1
+            else:
+                default_amount, next_invoice = float(po["total_amount"]), 1
 
             vendor = st.text_input("Vendor", value=po["vendor_name"])
-            invoice_number = st.text_input("Invoice number", value=f"INV-{po['request_id']:06d}-01")
-            invoice_amount = st.number_input("Invoice amount (USD)", min_value=0.0, step=50.0, value=float(po["total_amount"]))
+            invoice_number = st.text_input("Invoice number", value=f"INV-{po['request_id']:06d}-{next_invoice:02d}")
+            invoice_amount = st.number_input("Invoice amount (USD)", min_value=0.0, step=50.0, value=default_amount)
             invoice_date = st.date_input("Invoice date", value=datetime.now().date())
             tolerance = st.number_input("Tolerance (USD)", min_value=0.0, step=10.0, value=50.0)
 
             if st.button("Submit invoice (includes Match Invoice to PO)"):
-                status = "Matched"
-                reason = None
-
-                # «include» Match Invoice to PO (always executed)
-                if vendor.strip().lower() != str(po["vendor_name"]).strip().lower():
-                    status = "Exception"
-                    reason = f"Vendor mismatch: PO={po['vendor_name']} vs Invoice={vendor}"
-                elif abs(float(invoice_amount) - float(po["total_amount"])) > float(tolerance):
-                    status = "Exception"
-                    reason = f"Amount mismatch beyond tolerance: PO=${po['total_amount']:.2f} vs Invoice=${invoice_amount:.2f}, tol=${tolerance:.2f}"
-
-                exec_sql("""
-                    INSERT INTO invoices(po_number, vendor_name, invoice_number, invoice_amount, invoice_date, status, exception_reason, created_at)
-                    VALUES (:po_number, :vendor_name, :invoice_number, :invoice_amount, :invoice_date, :status, :exception_reason, :created_at)
-                """, {
-                    "po_number": po_number,
-                    "vendor_name": vendor.strip(),
-                    "invoice_number": invoice_number.strip(),
-                    "invoice_amount": float(invoice_amount),
-                    "invoice_date": invoice_date.strftime("%Y-%m-%d"),
-                    "status": status,
-                    "exception_reason": reason,
-                    "created_at": now_iso()
-                })
+                # «include» Match Invoice to PO (always executed): same rules as bulk ingestion —
+                # duplicate invoice number, vendor, cumulative amount against the PO ledger.
+                invoice = ingest.invoice_row(po_number, vendor, invoice_number, float(invoice_amount),
+                                             invoice_date.strftime("%Y-%m-%d"))
+                started = time.perf_counter()
+                matched = write_tx(lambda conn: ingest.ingest_chunk(conn, invoice, tolerance, now_iso()),
+                                   invalidates=["invoices"])
+                if profiler.enabled:
+                    profiler.record_query("write_tx", ingest.INSERT_INVOICE.text, time.perf_counter() - started, 1)
+                status, reason = matched.iloc[0]["status"], matched.iloc[0]["exception_reason"]
 
                 if status == "Matched":
                     st.success("Invoice matched ✅ (include: Match Invoice to PO)")
+                elif status == ledger.DUPLICATE:
+                    st.error("Duplicate invoice ⛔ " + reason.replace("$", "\\$"))
                 else:
                     st.warning("Invoice exception ⚠️ (extend: Handle Invoice Exception)")
+                    st.caption(reason.replace("$", "\\$"))
 
     Reason: "{reason}"
+    timer.lap("invoice form")
 
 
     with right:
             st.subheader("Recent invoices")
-            inv = df("SELECT invoice_number, po_number, vendor_name, invoice_amount, invoice_date, status, exception_reason FROM invoices ORDER BY invoice_id DESC LIMIT 25")
+            inv = df(queries.RECENT_INVOICES)
             st.dataframe(inv, use_container_width=True) 
             if not inv.empty:
                 st.dataframe(inv, use_container_width=True)
+    timer.lap("recent invoices")
+
+    st.markdown("---")
+    st.subheader("Bulk invoice ingestion (CSV / Excel)")
+    st.caption("Columns: po_number, vendor_name, invoice_number, invoice_amount, invoice_date")
+    upload = st.file_uploader("Invoice file", type=["csv", "xlsx", "xls"])
+    bulk_tolerance = st.number_input("Bulk tolerance (USD)", min_value=0.0, step=10.0, value=ingest.DEFAULT_TOLERANCE)
+    if upload is not None and st.button("Ingest file (includes Match Invoice to PO)"):
+        progress = st.empty()
+        summary = None
+        try:
+            summary = ingest.ingest_invoices(
+                engine, upload, tolerance=bulk_tolerance, filename=upload.name, write=write_tx,
+                on_chunk=lambda s: progress.info(f"{s['rows']:,} rows · {s['rows_per_sec']:,.0f} rows/sec"),
+            )
+        except ValueError as e:
+            st.error(str(e))
+        finally:
+            query_cache.invalidate_tables(["invoices"])
+        if summary:
+            progress.success(f"Ingested {summary['rows']:,} rows in {summary['seconds']:.2f}s "
+                             f"({summary['rows_per_sec']:,.0f} rows/sec) ✅")
+            st.dataframe(pd.DataFrame(sorted(summary["by_status"].items()), columns=["status", "rows"]),
+                         use_container_width=True)
+    timer.lap("bulk ingestion")
+
+# ---------- Page 6 ----------
+elif page.startswith("6)"):
+    st.header("6) Search requests & invoice exceptions")
+    st.caption("Matches every word, each as a prefix (e.g. \"vend mism dell\").")
+    q = st.text_input("Search", placeholder="e.g. laptops design team, vendor mismatch Dell")
+    c1, c2 = st.columns([1, 3])
+    limit = c1.number_input("Max results", min_value=10, max_value=500, step=10, value=50)
+    order = c2.radio("Order", ["Best match", "Newest first"], horizontal=True,
+                     help="Newest first stays fast for very common words; best match ranks every hit.")
+    if q.strip():
+        hits = df(queries.SEARCH if order == "Best match" else queries.SEARCH_RECENT, search.search_params(q, limit))
+        timer.lap("search query")
+        if hits.empty:
+            st.info("No matches.")
+        else:
+            st.caption(f"{len(hits)} results, {order.lower()}")
+            for hit in hits.itertuples():
+                label = f"Request {hit.ref_id}" if hit.kind == "request" else f"Invoice {hit.ref_id} · {hit.po_number}"
+                st.markdown(f"**{label}** · {hit.status} · {hit.created_at}  \n" + hit.snippet.replace("$", "\\$"))
+    timer.lap("results")
 else:
     st.info("No invoices yet.")
 
@@ -427,62 +498,127 @@ else:
 
     st.header("5) Analytics & Audit")
 
-    k1, k2, k3, k4, k5 = st.columns(5)
-    k1.metric("Requests", int(df("SELECT COUNT(*) c FROM requests").iloc[0]["c"]))
-    # k2.metric("Approved", int(df("SELECT COUNT(*) c FROM requests WHERE status='Approved'").iloc[0]["c"]))
-    k2.metric("Approved (Decisions)", int(df("SELECT COUNT(*) c FROM approvals WHERE decision='Approved'").iloc[0]["c"]))
-    k3.metric("POs", int(df("SELECT COUNT(*) c FROM purchase_orders").iloc[0]["c"]))
-    k4.metric("Invoices Matched", int(df("SELECT COUNT(*) c FROM invoices WHERE status='Matched'").iloc[0]["c"]))
-    k5.metric("Invoice Exceptions", int(df("SELECT COUNT(*) c FROM invoices WHERE status='Exception'").iloc[0]["c"]))
-
-    st.markdown("### Spend by vendor (PO totals)")
-    spend = df("SELECT vendor_name, SUM(total_amount) AS total_spend FROM purchase_orders GROUP BY vendor_name ORDER BY total_spend DESC")
-    if spend.empty:
-        st.info("No spend data yet.")
-    else:
-        st.bar_chart(spend.set_index("vendor_name"))
-
-        st.markdown("---")
-        st.subheader("Audit trail (approvals)")
-        approvals = df("""
-            SELECT a.approval_id, a.request_id, r.requester_name, a.approver_name, a.decision, a.comments, a.decided_at
-            FROM approvals a
-            JOIN requests r ON r.request_id = a.request_id
-            ORDER BY a.approval_id DESC
-            LIMIT 50
-        """)
-        st.dataframe(approvals, use_container_width=True) 
-        if not approvals.empty:
-            st.dataframe(approvals, use_container_width=True)
-
-        st.markdown("---")
-        st.subheader("Traceability (Request → PO → Invoice)")
-        trace = df("""
-            SELECT r.request_id, r.item_desc, r.status AS request_status,
-                po.po_number, po.status AS po_status, po.total_amount,
-                inv.invoice_number, inv.status AS invoice_status, inv.exception_reason
-            FROM requests r
-            LEFT JOIN purchase_orders po ON po.request_id = r.request_id
-            LEFT JOIN invoices inv ON inv.po_number = po.po_number
-            ORDER BY r.request_id DESC
-            LIMIT 50
-        """)
-        st.dataframe(trace, use_container_width=True)
+    # Panels fill in as their queries complete on the read-only pool.
+    slots = {name: st.empty() for name in ("kpis", "spend_by_vendor", "audit_trail", "traceability")}
+    for name, frame in get_dashboard_loader().iter_completed(load=df_readonly):
+        frame = with_archive(name, frame)
+        with slots[name].container():
+            if name == "kpis":
+                k1, k2, k3, k4, k5 = st.columns(5)
+                k1.metric("Requests", rollups.kpi_value(frame, "requests.status"))
+                k2.metric("Approved (Decisions)", rollups.kpi_value(frame, "approvals.decision", "Approved"))
+                k3.metric("POs", rollups.kpi_value(frame, "purchase_orders.status"))
+                k4.metric("Invoices Matched", rollups.kpi_value(frame, "invoices.status", "Matched"))
+                k5.metric("Invoice Exceptions", rollups.kpi_value(frame, "invoices.status", "Exception"))
+            elif name == "spend_by_vendor":
+                st.markdown("### Spend by vendor (PO totals)")
+                if frame.empty:
+                    st.info("No spend data yet.")
+                else:
+                    st.bar_chart(frame.set_index("vendor_name"))
+            elif name == "audit_trail":
+                st.markdown("---")
+                st.subheader("Audit trail (approvals)")
+                st.dataframe(frame, use_container_width=True)
+                if not frame.empty:
+                    st.dataframe(frame, use_container_width=True)
+            elif name == "traceability":
+                st.markdown("---")
+                st.subheader("Traceability (Request → PO → Invoice)")
+                st.dataframe(frame, use_container_width=True)
+    timer.lap("dashboard panels")
 
-st.markdown("### Export Reports")
+    st.markdown("---")
+    st.subheader("Spend and cycle times")
+    with engine.connect() as conn:
+        months = analytics.available_months(conn, get_archive())
+    first_month, last_month = st.select_slider("Months", options=months,
+                                                value=(months[max(0, len(months) - 12)], months[-1]))
+    spend_by = st.radio("Spend by", ["department", "vendor_name"], horizontal=True,
+                        format_func=lambda c: {"department": "Department", "vendor_name": "Vendor"}[c])
+    with engine.connect() as conn:
+        window_spend = analytics.spend(conn, first_month, last_month, get_archive(), read=df)
+        with st.spinner("Computing cycle times for months not cached yet..."):
+            cycles = analytics.cycle_histograms(
+                conn, first_month, last_month, get_archive(), read=df,
+                write=lambda fn: write_tx(fn, invalidates=analytics.ANALYTICS_TABLES),
+            )
+    if window_spend.empty:
+        st.info("No spend in these months.")
+    else:
+        totals = window_spend.groupby(spend_by)["total_spend"].sum().sort_values(ascending=False)
+        # Keep the chart readable: the top 8, everything else as "Other".
+        top = set(totals.index[:8])
+        window_spend[spend_by] = window_spend[spend_by].where(window_spend[spend_by].isin(top), "Other")
+        st.bar_chart(window_spend.pivot_table(index="month", columns=spend_by, values="total_spend", aggfunc="sum"))
+        st.dataframe(window_spend.groupby(spend_by, as_index=False)[["po_count", "total_spend"]].sum()
+                     .sort_values("total_spend", ascending=False).round(2), use_container_width=True)
+    if cycles.empty:
+        st.info("No workflow steps in these months.")
+    else:
+        st.markdown("**Cycle times (days)**")
+        st.dataframe(analytics.cycle_summary(cycles).round(2), use_container_width=True)
+        st.line_chart(analytics.cycle_trend(cycles))
+    timer.lap("spend and cycle times")
 
-if st.button("Download Full Report (Excel)"):
-    output = io.BytesIO()
+    st.markdown("---")
+    st.subheader("Lineage lookup")
+    lineage_key = st.text_input("Request ID, PO number or invoice number").strip()
+    if lineage_key:
+        key_id = int(lineage_key) if lineage_key.isdigit() else None
+        found = df(queries.LINEAGE_LOOKUP, lineage.lookup_params(key_id, lineage_key, lineage_key))
+        with engine.connect() as conn:
+            archived = get_archive().lineage_lookup(conn, key_id, lineage_key, lineage_key)
+        if not archived.empty:
+            found = pd.concat([found, archived], ignore_index=True)
+        if found.empty:
+            st.info(f"No lineage found for {lineage_key!r}.")
+        else:
+            st.dataframe(found, use_container_width=True)
+    timer.lap("lineage lookup")
 
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df("SELECT * FROM requests").to_excel(writer, sheet_name="Requests", index=False)
-        df("SELECT * FROM approvals").to_excel(writer, sheet_name="Approvals", index=False)
-        df("SELECT * FROM purchase_orders").to_excel(writer, sheet_name="POs", index=False)
-        df("SELECT * FROM invoices").to_excel(writer, sheet_name="Invoices", index=False)
+st.markdown("### Export Reports")
 
+export_format = st.selectbox("Report format", list(export.EXPORT_FORMATS),
+                             format_func=lambda f: {"xlsx": "Excel", "csv.gz": "CSV (gzip)", "parquet": "Parquet"}[f])
+if st.button("Download Full Report"):
+    previous = st.session_state.pop("report", None)
+    if previous is not None:
+        previous.remove()
+    path = export.export_report(engine, export_format, store=get_archive())
+    st.session_state["report"] = export.TempReport(path, export_format)
+
+report = st.session_state.get("report")
+if report is not None and report.exists():
+    file_name, mime = export.EXPORT_FORMATS[report.format]
+    # A callable (Streamlit 1.52+) is read only when the button is clicked, not kept in memory on every rerun.
     st.download_button(
-        label="Download Excel File",
-        data=output.getvalue(),
-        file_name="BuyIT_Hub_Report.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        label=f"Download {file_name}",
+        data=report.read_bytes,
+        file_name=file_name,
+        mime=mime
     )
+
+timer.lap("export")
+render_seconds = timer.done()
+
+cache_stats = query_cache.stats()
+cache_stats_slot.caption(
+    f"Query cache: {cache_stats['hits']:,} hits · {cache_stats['misses']:,} misses · "
+    f"{cache_stats['entries']} entries · {cache_stats['bytes'] / 1024:,.0f} KiB"
+)
+if profiler.enabled:
+    with profiling_slot.container():
+        with st.expander(f"Profiling · last render {render_seconds * 1000:,.0f} ms", expanded=False):
+            st.dataframe(pd.DataFrame([(name, round(s * 1000, 1)) for name, s in timer.sections], columns=["section", "ms"]),
+                         use_container_width=True)
+            top = pd.DataFrame(profiler.top_queries(10))
+            if not top.empty:
+                top["total_ms"] = (top["total_s"] * 1000).round(1)
+                top["max_ms"] = (top["max_s"] * 1000).round(1)
+                st.dataframe(top[["kind", "calls", "total_ms", "avg_ms", "max_ms", "rows", "sql"]].round(1),
+                             use_container_width=True)
+            st.caption(f"{profiler.slow} slow events logged · thresholds "
+                       f"{profiler.slow_query_s * 1000:,.0f} ms (query) / {profiler.slow_section_s * 1000:,.0f} ms (section)")
+            if st.button("Reset profiling stats"):
+                profiler.reset()
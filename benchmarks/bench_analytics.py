@@ -0,0 +1,74 @@
+"""Spend and cycle-time analytics over a window of months, cold and cached.
+
+Generates a synthetic database (or reuses ``--db``), clears the closed-month
+cache, then times filling it, reading windows once it is warm, the current
+month (always computed) and the spend window:
+
+    python -m benchmarks.bench_analytics --requests 1000000 --repeat 10
+"""
+import argparse
+import os
+import statistics
+import time
+
+from sqlalchemy import create_engine
+
+from buyit import analytics, datagen, migrations
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="existing database file (default: generate bench_data/bench_<requests>.db)")
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join("bench_data", f"bench_{args.requests}.db")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        print(f"Generating {args.requests:,} requests into {path} ...")
+        datagen.generate(create_engine(f"sqlite:///{path}", future=True), args.requests)
+
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    with engine.begin() as conn:
+        migrations.migrate(conn)
+        analytics.clear(conn)
+        months = analytics.available_months(conn)
+    now, year = months[-1], months[-12:]
+
+    with engine.begin() as conn:
+        started = time.perf_counter()
+        analytics.cycle_histograms(conn, months[0], now)
+        fill = time.perf_counter() - started
+
+    def window(first, last):
+        with engine.connect() as conn:
+            hist = analytics.cycle_histograms(conn, first, last)
+            analytics.cycle_summary(hist)
+            analytics.cycle_trend(hist)
+
+    def spend(first, last):
+        with engine.connect() as conn:
+            analytics.spend(conn, first, last)
+
+    print(f"\nAnalytics on {path} ({len(months)} months, median of {args.repeat})")
+    print(f"  fill every closed month (once)   {fill:8.2f} s")
+    print(f"  current month (live)             {timed(lambda: window(now, now), args.repeat) * 1000:8.1f} ms")
+    print(f"  last 12 closed months (cached)   {timed(lambda: window(year[0], months[-2]), args.repeat) * 1000:8.1f} ms")
+    print(f"  last 12 months incl. current     {timed(lambda: window(year[0], now), args.repeat) * 1000:8.1f} ms")
+    print(f"  all months incl. current         {timed(lambda: window(months[0], now), args.repeat) * 1000:8.1f} ms")
+    print(f"  spend, all months                {timed(lambda: spend(months[0], now), args.repeat) * 1000:8.1f} ms")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Serial vs parallel load time for the Analytics & Audit dashboard.
+
+Generates a synthetic database (or reuses ``--db``), then times loading every
+dashboard panel one after another and through ``DashboardLoader``:
+
+    python -m benchmarks.bench_dashboard --requests 1000000 --repeat 20
+"""
+import argparse
+import os
+import time
+
+from sqlalchemy import create_engine
+
+from buyit import dashboard, datagen
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return sorted(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="existing database file (default: generate bench_data/bench_<requests>.db)")
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join("bench_data", f"bench_{args.requests}.db")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        print(f"Generating {args.requests:,} requests into {path} ...")
+        datagen.generate(create_engine(f"sqlite:///{path}", future=True), args.requests)
+
+    url = f"sqlite:///{path}"
+    serial_engine = create_engine(url, future=True)
+    loader = dashboard.DashboardLoader(dashboard.make_readonly_engine(url, pool_size=args.workers), args.workers)
+    # Warm both pools and the page cache so the comparison is of execution, not first open.
+    dashboard.load_serial(serial_engine)
+    loader.load_all()
+
+    panels = {}
+    for name, (sql, params) in dashboard.dashboard_queries().items():
+        panels[name] = timed(lambda: dashboard.read_frame(serial_engine, sql, params), args.repeat)
+    serial = timed(lambda: dashboard.load_serial(serial_engine), args.repeat)
+    parallel = timed(loader.load_all, args.repeat)
+    loader.close()
+    serial_engine.dispose()
+
+    print(f"\nDashboard load on {path} ({args.repeat} runs, {args.workers} workers)")
+    for name, samples in panels.items():
+        print(f"  panel {name:<18} p50 {percentile(samples, 0.5) * 1000:9.2f} ms")
+    for label, samples in (("serial", serial), ("parallel", parallel)):
+        print(f"  {label:<24} p50 {percentile(samples, 0.5) * 1000:9.2f} ms   "
+              f"p99 {percentile(samples, 0.99) * 1000:9.2f} ms")
+    print(f"  speedup (p50)            {percentile(serial, 0.5) / percentile(parallel, 0.5):9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Microbenchmark: AI intake extraction throughput (texts/sec), before vs after.
+
+"before" is the original per-call implementation (regexes compiled per call,
+one ``re.search`` per vendor name); "after" is ``buyit.intake.extract_fields``
+with the vendor index Page 1 and the batch backfill use, loaded from the
+``vendors`` and ``vendor_aliases`` tables of a freshly migrated database. The
+legacy extractor is given every canonical name and alias, in vendor priority
+order, and its hit is mapped back to the canonical vendor. Both must agree on
+every text before timings are reported.
+
+    python -m benchmarks.bench_intake --texts 50000 --vendors 200
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+
+from buyit import migrations, vendors
+from buyit.intake import extract_fields, extract_many
+
+
+def legacy_extract_fields(free_text, vendors=("Figma", "Microsoft", "Amazon", "Dell", "Adobe", "Google")):
+    t = free_text.strip()
+    qty = None
+    m = re.search(r"\b(\d+)\s*(licenses|license|units|laptops|seats|subscriptions)?\b", t, flags=re.I)
+    if m:
+        qty = int(m.group(1))
+
+    cost = None
+    m = re.search(r"(\$|usd)\s*([\d,]+(\.\d+)?)", t, flags=re.I)
+    if m:
+        cost = float(m.group(2).replace(",", ""))
+    else:
+        m = re.search(r"\b([\d,]+(\.\d+)?)\s*(usd|dollars)\b", t, flags=re.I)
+        if m:
+            cost = float(m.group(1).replace(",", ""))
+
+    vendor = ""
+    for v in vendors:
+        if re.search(rf"\b{re.escape(v)}\b", t, flags=re.I):
+            vendor = "Amazon Business" if v.lower() == "amazon" else v
+            break
+
+    item_desc = t.split(".")[0][:180] if t else "Software/Hardware purchase"
+    return {"item_desc": item_desc, "quantity": qty or 1, "est_cost": cost or 0.0, "vendor_name": vendor}
+
+
+def master_keywords(conn):
+    """Every canonical name and alias -> canonical name, in vendor priority order."""
+    names = conn.execute(text(vendors.VENDOR_ROWS_SQL)).all()
+    aliases = {}
+    for alias, vendor_id in conn.execute(text(vendors.ALIAS_ROWS_SQL)).all():
+        aliases.setdefault(vendor_id, []).append(alias)
+    keywords = {}
+    for vendor_id, name in names:
+        keywords[name] = name
+        for alias in sorted(aliases.get(vendor_id, [])):
+            keywords.setdefault(alias, name)
+    return keywords
+
+
+def legacy_with_master(free_text, keywords):
+    """``legacy_extract_fields`` over a vendor master, reporting the canonical vendor."""
+    fields = legacy_extract_fields(free_text, list(keywords))
+    fields["vendor_name"] = keywords.get(fields["vendor_name"], fields["vendor_name"])
+    return fields
+
+
+TEMPLATES = [
+    "Need {n} {v} licenses for the {d} team, annual plan, budget ${c:,}.",
+    "Please order {n} laptops from {v}. Estimated {c} USD. Required for new hires in {d}.",
+    "Requesting {n} seats of {v} for {d}; approx {c} dollars per year.",
+    "{d} needs a renewal. {v} subscription, {n} units.",
+    "Ergonomic chairs for {d}, {n} units, budget around ${c:,}.",
+]
+
+
+def make_texts(count, vendors, seed=7):
+    rnd = random.Random(seed)
+    depts = ["Design", "Engineering", "Finance", "Sales", "HR"]
+    return [
+        rnd.choice(TEMPLATES).format(n=rnd.randint(1, 500), v=rnd.choice(vendors), d=rnd.choice(depts),
+                                     c=rnd.randint(100, 250000))
+        for _ in range(count)
+    ]
+
+
+def timed(label, fn, texts):
+    started = time.perf_counter()
+    out = fn(texts)
+    seconds = time.perf_counter() - started
+    print(f"{label:<42} {len(texts) / seconds:>12,.0f} texts/sec")
+    return out
+
+
+def add_synthetic_vendors(conn, count):
+    """Grow the seeded master to ``count`` vendors, each with one alias."""
+    seeded = conn.execute(text("SELECT COUNT(*) FROM vendors")).scalar()
+    names = [f"Vendor{i:04d}" for i in range(max(count - seeded, 0))]
+    conn.execute(text("INSERT INTO vendors(vendor_name) VALUES (:v)"), [{"v": v} for v in names])
+    for name in names:
+        vendors.add_alias(conn, name.replace("Vendor", "VND"), name)
+
+
+def compare(engine, count):
+    with engine.connect() as conn:
+        keywords = master_keywords(conn)
+        started = time.perf_counter()
+        index = vendors.VendorIndex.load(conn)
+        load_ms = (time.perf_counter() - started) * 1000
+    texts = make_texts(count, list(keywords))
+    print(f"{len(index.names)} vendors + {len(keywords) - len(index.names)} aliases "
+          f"(index loaded in {load_ms:,.1f} ms), {len(texts):,} texts")
+    before = timed("before: one re.search per name/alias", lambda ts: [legacy_with_master(t, keywords) for t in ts],
+                   texts)
+    after = timed("after: extract_fields + VendorIndex", lambda ts: [extract_fields(t, index) for t in ts], texts)
+    batch = timed("after: extract_many + VendorIndex", lambda ts: list(extract_many(ts, index)), texts)
+    assert before == after == batch, "outputs differ from the legacy implementation"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--texts", type=int, default=50000)
+    parser.add_argument("--vendors", type=int, default=200, help="size of the synthetic vendor master")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'intake.db')}", future=True)
+        with engine.begin() as conn:
+            migrations.migrate(conn)
+        print("Seeded vendor master")
+        compare(engine, args.texts)
+
+        with engine.begin() as conn:
+            add_synthetic_vendors(conn, args.vendors)
+        print("\nSynthetic vendor master")
+        compare(engine, args.texts)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Per-page query benchmark across data volumes.
+
+For each volume, generates (or reuses) a synthetic database and runs every
+query in ``buyit.queries.PAGE_QUERIES`` the way ``df()`` does (through
+pandas, uncached), reporting latency percentiles per query. Results are
+written as JSON so runs can be compared over time:
+
+    python -m benchmarks.bench_pages --volumes 10000 1000000 --repeat 30 --out bench_results
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from buyit import datagen, queries
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+    return {"p50_ms": pick(0.50) * 1000, "p95_ms": pick(0.95) * 1000, "p99_ms": pick(0.99) * 1000,
+            "max_ms": ordered[-1] * 1000, "runs": len(ordered)}
+
+
+def sample_params(conn, rnd, params, id_range, po_range):
+    """Replace the static sample parameters with random existing keys."""
+    out = dict(params)
+    if "id" in out and id_range[1]:
+        out["id"] = rnd.randint(*id_range)
+    if "p" in out and po_range[1]:
+        po_id = rnd.randint(*po_range)
+        out["p"] = conn.execute(text("SELECT po_number FROM purchase_orders WHERE po_id >= :i LIMIT 1"),
+                                {"i": po_id}).scalar() or out["p"]
+    return out
+
+
+def prepare(volume, workdir, exception_rate, reuse):
+    path = os.path.join(workdir, f"bench_{volume}.db")
+    if not (reuse and os.path.exists(path)):
+        if os.path.exists(path):
+            os.remove(path)
+        started = time.perf_counter()
+        datagen.generate(create_engine(f"sqlite:///{path}", future=True), volume, exception_rate)
+        print(f"  generated {volume:,} requests in {time.perf_counter() - started:.1f}s")
+    return path
+
+
+def bench_volume(path, repeat, seed=1):
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    rnd = random.Random(seed)
+    results = {}
+    with engine.connect() as conn:
+        rows = {t: conn.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar()
+                for t in ("requests", "approvals", "purchase_orders", "invoices")}
+        id_range = (1, conn.execute(text("SELECT COALESCE(MAX(request_id), 0) FROM requests")).scalar())
+        po_range = (1, conn.execute(text("SELECT COALESCE(MAX(po_id), 0) FROM purchase_orders")).scalar())
+        for page, named in queries.PAGE_QUERIES.items():
+            for name, (sql, params) in named.items():
+                samples, returned = [], 0
+                for _ in range(repeat):
+                    p = sample_params(conn, rnd, params, id_range, po_range)
+                    started = time.perf_counter()
+                    frame = pd.read_sql(text(sql), conn, params=p)
+                    samples.append(time.perf_counter() - started)
+                    returned = len(frame)
+                key = f"{page} / {name}"
+                results[key] = {**percentiles(samples), "rows_returned": returned}
+                print(f"  {key:<52} p50 {results[key]['p50_ms']:9.2f} ms  p99 {results[key]['p99_ms']:9.2f} ms"
+                      f"  rows {returned:>9,}")
+    engine.dispose()
+    return {"rows": rows, "queries": results}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--volumes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--exception-rate", type=float, default=0.05)
+    parser.add_argument("--workdir", default="bench_data", help="where generated databases are kept")
+    parser.add_argument("--reuse", action="store_true", help="reuse previously generated databases")
+    parser.add_argument("--out", default="bench_results", help="directory for the JSON results")
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    os.makedirs(args.out, exist_ok=True)
+    report = {
+        "benchmark": "pages",
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "repeat": args.repeat,
+        "volumes": {},
+    }
+    for volume in args.volumes:
+        print(f"\nVolume: {volume:,} requests")
+        path = prepare(volume, args.workdir, args.exception_rate, args.reuse)
+        report["volumes"][str(volume)] = bench_volume(path, args.repeat)
+
+    out = os.path.join(args.out, f"pages-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"\nWrote {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""FTS5 search vs the naive LIKE '%term%' scan.
+
+Generates a synthetic database (or reuses ``--db``) and times, per query, the
+two FTS5 searches the Search page runs (best match and newest first) against a
+LIKE query over the same columns (every word must appear in ``item_desc``/``justification`` or in
+``invoices.exception_reason``):
+
+    python -m benchmarks.bench_search --requests 1000000 --repeat 10
+"""
+import argparse
+import os
+import time
+
+from sqlalchemy import create_engine, text
+
+from buyit import datagen, search
+
+QUERIES = ["salesforce headsets", "monitors", "vendor mismatch dell", "amount mismatch", "docking", "okta sub",
+           "quarterly zebra"]
+
+
+def like_sql(words):
+    request_terms = " AND ".join(f"(item_desc LIKE :w{i} OR justification LIKE :w{i})" for i in range(len(words)))
+    invoice_terms = " AND ".join(f"exception_reason LIKE :w{i}" for i in range(len(words)))
+    return (f"SELECT 'request', request_id FROM requests WHERE {request_terms} "
+            f"UNION ALL SELECT 'invoice', invoice_id FROM invoices WHERE {invoice_terms} LIMIT :limit")
+
+
+def timed(conn, sql, params, repeat):
+    samples, rows = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(conn.execute(text(sql), params).all())
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2], rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="existing database file (default: generate bench_data/bench_<requests>.db)")
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("queries", nargs="*", default=QUERIES)
+    args = parser.parse_args(argv)
+
+    path = args.db or os.path.join("bench_data", f"bench_{args.requests}.db")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        print(f"Generating {args.requests:,} requests into {path} ...")
+        datagen.generate(create_engine(f"sqlite:///{path}", future=True), args.requests)
+
+    engine = create_engine(f"sqlite:///{path}", future=True)
+    with engine.begin() as conn:
+        search.install(conn)
+        docs = conn.execute(text("SELECT COUNT(*) FROM search_index")).scalar()
+    print(f"\n{path}: {docs:,} indexed documents, p50 of {args.repeat} runs, LIMIT {args.limit}")
+    print(f"  {'query':<24} {'ranked ms':>10} {'newest ms':>10} {'rows':>6} {'LIKE ms':>10} {'rows':>6} {'speedup':>9}")
+    with engine.connect() as conn:
+        for q in args.queries:
+            fts_s, fts_rows = timed(conn, search.SEARCH_SQL, search.search_params(q, args.limit), args.repeat)
+            recent_s, _ = timed(conn, search.SEARCH_RECENT_SQL, search.search_params(q, args.limit), args.repeat)
+            words = q.split()
+            params = {f"w{i}": f"%{w}%" for i, w in enumerate(words)}
+            params["limit"] = args.limit
+            like_s, like_rows = timed(conn, like_sql(words), params, args.repeat)
+            print(f"  {q:<24} {fts_s * 1000:10.2f} {recent_s * 1000:10.2f} {fts_rows:6} {like_s * 1000:10.2f} "
+                  f"{like_rows:6} {like_s / min(fts_s, recent_s):8.1f}x")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Cold import time and per-rerun overhead of the Streamlit app.
+
+Imports are timed in fresh interpreters (so nothing is already in
+``sys.modules``); the app is then run through Streamlit's ``AppTest`` in a
+temporary directory, once cold and ``--reruns`` times warm:
+
+    python -m benchmarks.bench_startup --repeat 5 --reruns 20
+    python -m benchmarks.bench_startup --db bench_data/bench_10000.db
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from buyit import migrations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = {
+    "buyit.core": "import buyit.core",
+    "buyit (all app modules)": "from buyit import archive, core, dashboard, export, ingest, intake, ledger, lineage, "
+                               "profiling, queries, query_cache, rollups, search, storage, vendors, workflow",
+    "streamlit": "import streamlit",
+}
+
+TIMER = "import time; t = time.perf_counter(); {stmt}; print(time.perf_counter() - t)"
+
+
+def cold_import(stmt, repeat):
+    samples = []
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", TIMER.format(stmt=stmt)], env=env, check=True,
+                             capture_output=True, text=True).stdout
+        samples.append(float(out.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def app_runs(db, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    cwd = os.getcwd()
+    try:
+        if db:
+            shutil.copy(db, os.path.join(workdir, "buyit_hub.db"))
+        os.chdir(workdir)
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=300)
+        started = time.perf_counter()
+        at.run()
+        first = time.perf_counter() - started
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        samples = []
+        for _ in range(reruns):
+            started = time.perf_counter()
+            at.run()
+            samples.append(time.perf_counter() - started)
+
+        # What every rerun paid before the schema was set up once per process.
+        engine = create_engine("sqlite:///buyit_hub.db", future=True)
+        migrate = []
+        for _ in range(reruns):
+            started = time.perf_counter()
+            with engine.begin() as conn:
+                migrations.migrate(conn)
+            migrate.append(time.perf_counter() - started)
+        engine.dispose()
+        return first, sorted(samples), statistics.median(migrate)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="database file to copy in (default: a fresh, empty database)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per import timing")
+    parser.add_argument("--reruns", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    print(f"Cold import (median of {args.repeat} fresh interpreters)")
+    for name, stmt in IMPORTS.items():
+        print(f"  {name:<26} {cold_import(stmt, args.repeat) * 1000:8.1f} ms")
+
+    first, reruns, migrate = app_runs(args.db, args.reruns)
+    print(f"\nApp on {args.db or 'an empty database'} (page 1)")
+    print(f"  first run                  {first * 1000:8.1f} ms")
+    print(f"  rerun p50 / max            {statistics.median(reruns) * 1000:8.1f} / {reruns[-1] * 1000:.1f} ms")
+    print(f"  schema check (now once)    {migrate * 1000:8.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""Load test: N concurrent sessions submitting requests, decisions and invoices.
+
+Runs against a fresh temporary database in the chosen storage mode(s) and
+reports write latency percentiles, throughput and failed writes (e.g.
+"database is locked"). Each write is the call the app makes for that page
+action (``workflow.submit_request``, ``workflow.decide_requests``,
+``ingest.ingest_chunk``), run in its own transaction in demo mode or through
+the ``WriteQueue`` in production mode:
+
+    python -m benchmarks.load_test --sessions 32 --ops 50 --mode demo --mode production
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from buyit import ingest, migrations, storage, workflow
+
+OPS = ["request", "decision", "invoice"]
+PENDING_REQUEST = "SELECT request_id FROM requests WHERE status='Submitted' ORDER BY request_id DESC LIMIT 1"
+
+
+def now_iso():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def submit_request(conn, rnd):
+    return workflow.submit_request(
+        conn, f"user{rnd.randint(1, 500)}", rnd.choice(["Design", "Engineering", "Finance"]), "Load test item",
+        rnd.randint(1, 50), rnd.uniform(100, 10000), "Load test", rnd.choice(["Dell", "Figma", "Microsoft"]),
+    )
+
+
+def submit_decision(conn, rnd):
+    req_id = conn.execute(text(PENDING_REQUEST)).scalar()
+    if req_id is None:
+        return submit_request(conn, rnd)
+    return workflow.decide_requests(conn, [req_id], rnd.choice(["Approved", "Rejected"]), "Isha", "Load test")
+
+
+def submit_invoice(conn, rnd, po_numbers):
+    invoice = ingest.invoice_row(rnd.choice(po_numbers), "Dell", f"INV-{rnd.getrandbits(40):x}", 1000.0, now_iso()[:10])
+    return ingest.ingest_chunk(conn, invoice, ingest.DEFAULT_TOLERANCE, now_iso())
+
+
+def prepare(url, pos=200):
+    engine = storage.make_engine(url, mode="demo")
+    with engine.begin() as conn:
+        migrations.migrate(conn)
+        ids = [workflow.submit_request(conn, "Shalini", "Engineering", "Load test PO", 1, 1_000_000, "Load test", "Dell")
+               for _ in range(pos)]
+        workflow.decide_requests(conn, ids, "Approved", "Isha")
+        workflow.create_pos(conn, [{"request_id": i, "po_number": "", "created_by": "Shalini", "vendor_name": "Dell",
+                                    "total_amount": 1_000_000} for i in ids])
+        workflow.mark_pos_sent(conn, ids)
+    engine.dispose()
+    return [f"PO-{i:06d}" for i in ids]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))]
+
+
+def run(mode, sessions, ops, workdir):
+    path = os.path.join(workdir, f"load_{mode}.db")
+    url = f"sqlite:///{path}"
+    po_numbers = prepare(url)
+    engine = storage.make_engine(url, mode=mode, pool_size=sessions)
+    writer = storage.WriteQueue(storage.make_writer_engine(url)) if mode == "production" else None
+
+    def write(fn):
+        return writer.execute(fn) if writer else storage.run_in_transaction(engine, fn)
+
+    latencies, errors, lock = [], [], threading.Lock()
+    barrier = threading.Barrier(sessions)
+
+    def session(n):
+        rnd = random.Random(n)
+        barrier.wait()
+        for _ in range(ops):
+            op = rnd.choice(OPS)
+            if op == "request":
+                fn = lambda conn: submit_request(conn, rnd)
+            elif op == "decision":
+                fn = lambda conn: submit_decision(conn, rnd)
+            else:
+                fn = lambda conn: submit_invoice(conn, rnd, po_numbers)
+            started = time.perf_counter()
+            try:
+                write(fn)
+            except Exception as e:
+                with lock:
+                    errors.append(type(e).__name__ + ": " + str(e).splitlines()[0])
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"\n[{mode}] {sessions} sessions x {ops} writes in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:,.0f} writes/sec)")
+    print(f"  p50 {percentile(latencies, 0.50) * 1000:8.2f} ms   p99 {percentile(latencies, 0.99) * 1000:8.2f} ms   "
+          f"max {percentile(latencies, 1.0) * 1000:8.2f} ms")
+    print(f"  failed writes: {len(errors)}" + (f" (e.g. {errors[0]})" if errors else ""))
+    if writer:
+        print(f"  group commits: {writer.batches} batches, {writer.jobs / max(writer.batches, 1):.1f} writes/batch")
+        writer.close()
+    engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=50, help="writes per session")
+    parser.add_argument("--mode", action="append", choices=["demo", "production"],
+                        help="storage mode to test (repeatable; default: both)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="buyit_load_")
+    try:
+        for mode in args.mode or ["demo", "production"]:
+            run(mode, args.sessions, args.ops, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Reusable procurement logic behind the BuyIT Hub Streamlit demo."""
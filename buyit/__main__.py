@@ -0,0 +1,51 @@
+"""``python -m buyit <command> [args]``: headless entry point for batch runs.
+
+Each command is a module's own CLI; only that module is imported, so a batch
+job pays for what it runs and never imports Streamlit.
+
+    python -m buyit migrate
+    python -m buyit ingest invoices.csv --tolerance 50
+    python -m buyit workflow close 41 42 43
+"""
+import importlib
+import sys
+
+COMMANDS = {
+    "migrate": ("buyit.migrations", "apply pending schema migrations"),
+    "workflow": ("buyit.workflow", "approve/reject requests, mark POs sent or closed"),
+    "intake": ("buyit.intake", "extract request fields from a file of free text"),
+    "ingest": ("buyit.ingest", "bulk-ingest and match an invoice file"),
+    "export": ("buyit.export", "export the full report (xlsx, csv.gz, parquet)"),
+    "archive": ("buyit.archive", "move Closed POs to the Parquet archive"),
+    "analytics": ("buyit.analytics", "spend and cycle times for a window of months"),
+    "search": ("buyit.search", "full-text search, or rebuild the index"),
+    "vendors": ("buyit.vendors", "resolve vendor names, add aliases"),
+    "ledger": ("buyit.ledger", "verify/rebuild the per-PO invoice ledger"),
+    "lineage": ("buyit.lineage", "verify/rebuild/query traceability lineage"),
+    "rollups": ("buyit.rollups", "verify/rebuild the Analytics rollups"),
+    "plancheck": ("buyit.plancheck", "check page query plans"),
+    "datagen": ("buyit.datagen", "generate synthetic data"),
+}
+
+
+def usage():
+    lines = ["usage: python -m buyit <command> [args]", "", "commands:"]
+    lines += [f"  {name:<10} {help_text}" for name, (_, help_text) in COMMANDS.items()]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    if argv[0] not in COMMANDS:
+        print(f"Unknown command: {argv[0]}\n\n{usage()}", file=sys.stderr)
+        return 2
+    module = importlib.import_module(COMMANDS[argv[0]][0])
+    sys.argv = [f"python -m buyit {argv[0]}"] + argv[1:]
+    return module.main(argv[1:]) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""Time-windowed spend and cycle-time analytics.
+
+Spend by month/department/vendor reads ``spend_rollup``, which the rollup
+triggers already keep bucketed by month, plus the archive's monthly spend.
+
+Cycle times are the days between workflow steps, bucketed by the month the
+later step happened in:
+
+- ``approve``: request created -> approval decision
+- ``po``: (last) approval -> PO created
+- ``invoice``: PO created -> first invoice recorded
+- ``request_to_invoice``: request created -> first invoice recorded
+
+SQLite has no percentile functions, so ``CYCLE_HISTOGRAM_SQL`` pushes the date
+arithmetic and bucketing down instead: it returns one row per (stage, month,
+hour-wide bin) with a count and the exact sum of days, which is a few thousand
+rows however many events there are. Histograms add up, so months, the hot
+tables and the archive merge by summing counts; averages are exact and
+percentiles are read off the merged histogram to within half an hour.
+
+A month before the current one is closed: new workflow steps are stamped with
+the current time, so its histogram cannot change. Closed months are computed
+once and kept in ``cycle_histogram`` (``cycle_months`` lists the months
+stored, including empty ones); only the current month is computed on every
+read. Cached months always include the archive, and archiving does not
+invalidate them, since it moves rows without changing history; a hot-only read
+(no ``store``) of a database with archived batches computes every month
+instead. Backfilling old timestamps (e.g. ``datagen``) calls ``clear``.
+
+    python -m buyit.analytics cycle --from 2025-01 --to 2025-06
+    python -m buyit.analytics spend --from 2025-01 --by department
+"""
+import argparse
+import sys
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+
+from buyit.sqlutil import split_statements
+
+ANALYTICS_TABLES = ["cycle_histogram", "cycle_months"]
+
+ANALYTICS_DDL = """
+CREATE TABLE IF NOT EXISTS cycle_histogram (
+  stage TEXT NOT NULL,
+  month TEXT NOT NULL,
+  bin INTEGER NOT NULL,
+  n INTEGER NOT NULL,
+  total_days REAL NOT NULL,
+  PRIMARY KEY (month, stage, bin)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS cycle_months (
+  month TEXT NOT NULL PRIMARY KEY,
+  computed_at TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_approvals_decided_at ON approvals(decided_at, request_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_orders_created_at ON purchase_orders(created_at, request_id);
+CREATE INDEX IF NOT EXISTS idx_invoices_created_at ON invoices(created_at, po_number, status);
+"""
+
+STAGES = {
+    "approve": "Request → decision",
+    "po": "Approval → PO",
+    "invoice": "PO → first invoice",
+    "request_to_invoice": "Request → first invoice",
+}
+
+BINS_PER_DAY = 24
+
+BIN_SECONDS = 86400 // BINS_PER_DAY
+
+HISTOGRAM_COLUMNS = ["stage", "month", "bin", "n", "total_days"]
+
+APPROVED_AT = ("(SELECT MAX(a.decided_at) FROM approvals a "
+               "WHERE a.request_id = po.request_id AND a.decision = 'Approved')")
+
+
+def _seconds(done, since):
+    return f"CAST(ROUND((julianday({done}) - julianday({since})) * 86400) AS INTEGER)"
+
+
+# Events whose later step falls in [:start, :end), one leg per stage; each leg
+# is a range scan on its (covering) timestamp index plus primary-key/index lookups.
+# Durations are whole seconds, so a bin is an integer division and an event
+# never lands in a different bin through float rounding at its edge.
+CYCLE_HISTOGRAM_SQL = f"""
+WITH first_invoices AS (
+    SELECT i.created_at AS done_at, po.created_at AS po_at, r.created_at AS requested_at
+    FROM invoices i
+    JOIN purchase_orders po ON po.po_number = i.po_number
+    JOIN requests r ON r.request_id = po.request_id
+    WHERE i.created_at >= :start AND i.created_at < :end AND i.status <> 'Duplicate'
+      AND i.invoice_id = (SELECT MIN(f.invoice_id) FROM invoices f WHERE f.po_number = i.po_number AND f.status <> 'Duplicate')
+),
+events AS (
+    SELECT 'approve' AS stage, a.decided_at AS done_at, {_seconds("a.decided_at", "r.created_at")} AS seconds
+    FROM approvals a
+    JOIN requests r ON r.request_id = a.request_id
+    WHERE a.decided_at >= :start AND a.decided_at < :end
+    UNION ALL
+    SELECT 'po', po.created_at, {_seconds("po.created_at", APPROVED_AT)}
+    FROM purchase_orders po
+    WHERE po.created_at >= :start AND po.created_at < :end
+    UNION ALL
+    SELECT 'invoice', done_at, {_seconds("done_at", "po_at")} FROM first_invoices
+    UNION ALL
+    SELECT 'request_to_invoice', done_at, {_seconds("done_at", "requested_at")} FROM first_invoices
+)
+SELECT stage, substr(done_at, 1, 7) AS month, seconds / {BIN_SECONDS} AS bin,
+    COUNT(*) AS n, SUM(seconds) / 86400.0 AS total_days
+FROM events
+WHERE seconds IS NOT NULL
+GROUP BY 1, 2, 3
+"""
+
+CACHED_HISTOGRAM_SQL = """
+SELECT stage, month, bin, n, total_days
+FROM cycle_histogram
+WHERE month >= :first AND month <= :last
+"""
+
+CACHED_MONTHS = text("SELECT month FROM cycle_months WHERE month IN :months").bindparams(
+    bindparam("months", expanding=True)
+)
+
+HAS_ARCHIVE = text("SELECT 1 FROM archive_batches LIMIT 1")
+
+SPEND_WINDOW_SQL = """
+SELECT month, department, vendor_name, SUM(po_count) AS po_count, SUM(total_spend) AS total_spend
+FROM spend_rollup
+WHERE month >= :first AND month <= :last
+GROUP BY month, department, vendor_name
+HAVING SUM(po_count) <> 0
+"""
+
+FIRST_MONTH_SQL = "SELECT MIN(month) FROM spend_rollup WHERE po_count <> 0"
+
+SPEND_COLUMNS = ["month", "department", "vendor_name", "po_count", "total_spend"]
+
+
+def install(conn):
+    """Create the closed-month cache tables and the timestamp indexes the histogram query ranges over."""
+    for stmt in split_statements(ANALYTICS_DDL):
+        conn.execute(text(stmt))
+
+
+def clear(conn):
+    """Forget every cached month (after history has been rewritten)."""
+    conn.execute(text("DELETE FROM cycle_histogram"))
+    conn.execute(text("DELETE FROM cycle_months"))
+
+
+def current_month(today=None):
+    return (today or datetime.now()).strftime("%Y-%m")
+
+
+def _next_month(month):
+    year, mon = int(month[:4]), int(month[5:7])
+    return f"{year + mon // 12:04d}-{mon % 12 + 1:02d}"
+
+
+def months_between(first, last):
+    """``['YYYY-MM', ...]`` from ``first`` to ``last`` inclusive."""
+    months, month = [], first
+    while month <= last:
+        months.append(month)
+        month = _next_month(month)
+    return months
+
+
+def month_params(first, last):
+    """Timestamp bounds ``[:start, :end)`` covering months ``first`` to ``last``."""
+    return {"start": f"{first}-01", "end": f"{_next_month(last)}-01"}
+
+
+def available_months(conn, store=None, today=None):
+    """Months from the first PO (hot or archived) to the current month."""
+    firsts = [conn.execute(text(FIRST_MONTH_SQL)).scalar()]
+    if store is not None:
+        archived = store.spend_by_month(conn)
+        if archived is not None and not archived.empty:
+            firsts.append(archived["month"].min())
+    last = current_month(today)
+    firsts = [m for m in firsts if m]
+    return months_between(min(min(firsts), last) if firsts else last, last)
+
+
+def _sql_reader(conn):
+    return lambda sql, params: pd.read_sql(text(sql), conn, params=params)
+
+
+def _sum_histograms(frames):
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=HISTOGRAM_COLUMNS)
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.groupby(["stage", "month", "bin"], as_index=False, sort=False)[["n", "total_days"]].sum()
+
+
+def frame_histogram(requests, approvals, purchase_orders, invoices):
+    """``CYCLE_HISTOGRAM_SQL`` over DataFrames (used for the archive), for all months."""
+    def stamp(frame, column):
+        return pd.to_datetime(frame[column], format="%Y-%m-%d %H:%M:%S")
+
+    requested = requests.set_index("request_id")["created_at"]
+    decided = approvals.assign(requested_at=approvals["request_id"].map(requested))
+    approved = approvals[approvals["decision"] == "Approved"].groupby("request_id")["decided_at"].max()
+    pos = purchase_orders.assign(approved_at=purchase_orders["request_id"].map(approved),
+                                 requested_at=purchase_orders["request_id"].map(requested))
+    booked = invoices[invoices["status"] != "Duplicate"]
+    first = booked.loc[booked.groupby("po_number")["invoice_id"].idxmin()]
+    first = first.merge(pos[["po_number", "created_at", "requested_at"]].rename(columns={"created_at": "po_at"}),
+                        on="po_number", how="inner")
+
+    legs = [
+        ("approve", decided, "decided_at", "requested_at"),
+        ("po", pos, "created_at", "approved_at"),
+        ("invoice", first, "created_at", "po_at"),
+        ("request_to_invoice", first, "created_at", "requested_at"),
+    ]
+    parts = []
+    for stage, frame, done, since in legs:
+        frame = frame.dropna(subset=[since])
+        if frame.empty:
+            continue
+        seconds = (stamp(frame, done) - stamp(frame, since)).dt.total_seconds().round().astype("int64")
+        parts.append(pd.DataFrame({
+            "stage": stage, "month": frame[done].str[:7].values,
+            # SQLite's integer division truncates toward zero (clock skew can make a duration negative).
+            "bin": (seconds.abs() // BIN_SECONDS * seconds.clip(-1, 1)).values,
+            "n": 1, "total_days": (seconds / 86400).values,
+        }))
+    return _sum_histograms(parts)
+
+
+def _archived(store, conn, months):
+    if store is None:
+        return None
+    cold = store.cycle_histogram(conn)
+    if cold is None or cold.empty:
+        return None
+    return cold[cold["month"].isin(months)]
+
+
+def _save_months(conn, months, hist):
+    conn.execute(text("DELETE FROM cycle_histogram WHERE month IN :months").bindparams(
+        bindparam("months", expanding=True)), {"months": months})
+    if not hist.empty:
+        conn.execute(text(
+            "INSERT INTO cycle_histogram(stage, month, bin, n, total_days) VALUES (:stage, :month, :bin, :n, :total_days)"
+        ), hist[HISTOGRAM_COLUMNS].to_dict("records"))
+    computed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute(text("INSERT OR REPLACE INTO cycle_months(month, computed_at) VALUES (:m, :at)"),
+                 [{"m": m, "at": computed_at} for m in months])
+
+
+def cycle_histograms(conn, first, last, store=None, write=None, read=None, today=None):
+    """Merged (hot + archived) cycle-time histograms for months ``first``..``last``.
+
+    Closed months come from the cache, computing (and storing, through
+    ``write(fn)``) any not cached yet; the current month is always computed,
+    and so is every month of a hot-only read once anything is archived.
+    ``read(sql, params)`` fetches a DataFrame (default: on ``conn``); pass a
+    cached reader from the app.
+    """
+    read = read or _sql_reader(conn)
+    write = write or (lambda fn: fn(conn))
+    now = current_month(today)
+    months = months_between(first, last)
+    cacheable = store is not None or conn.execute(HAS_ARCHIVE).first() is None
+    closed = [m for m in months if m < now] if cacheable else []
+    live = [m for m in months if m not in closed]
+
+    frames = []
+    if closed:
+        cached = {r[0] for r in conn.execute(CACHED_MONTHS, {"months": closed})}
+        missing = [m for m in closed if m not in cached]
+        if cached:
+            frames.append(read(CACHED_HISTOGRAM_SQL, {"first": closed[0], "last": closed[-1]}))
+        if missing:
+            hot = read(CYCLE_HISTOGRAM_SQL, month_params(missing[0], missing[-1]))
+            fresh = _sum_histograms([hot[hot["month"].isin(missing)], _archived(store, conn, missing)])
+            write(lambda c: _save_months(c, missing, fresh))
+            frames.append(fresh)
+    if live:
+        frames.append(read(CYCLE_HISTOGRAM_SQL, month_params(live[0], live[-1])))
+        frames.append(_archived(store, conn, live))
+    hist = _sum_histograms(frames)
+    return hist[hist["month"].isin(months)].reset_index(drop=True)
+
+
+def percentile_days(hist, keys, pct):
+    """Nearest-rank ``pct`` percentile (in days, mid-bin) per ``keys`` group of a histogram."""
+    hist = hist.groupby(keys + ["bin"], as_index=False)["n"].sum().sort_values(keys + ["bin"])
+    total = hist.groupby(keys)["n"].transform("sum")
+    # Integer ceil(pct% of total): no float rounding pushes a rank past its bin.
+    rank = (-(-total * pct // 100)).clip(lower=1)
+    reached = hist[hist.groupby(keys)["n"].cumsum() >= rank].groupby(keys).head(1)
+    return reached.set_index(keys)["bin"].add(0.5).div(BINS_PER_DAY)
+
+
+def cycle_summary(hist):
+    """Events, average, median and p90 days per stage over the whole window."""
+    columns = ["stage", "events", "avg_days", "p50_days", "p90_days"]
+    if hist.empty:
+        return pd.DataFrame(columns=columns)
+    summary = hist.groupby("stage")[["n", "total_days"]].sum()
+    summary["events"] = summary["n"].astype("int64")
+    summary["avg_days"] = summary["total_days"] / summary["n"]
+    summary["p50_days"] = percentile_days(hist, ["stage"], 50)
+    summary["p90_days"] = percentile_days(hist, ["stage"], 90)
+    summary = summary.reindex([s for s in STAGES if s in summary.index]).rename(index=STAGES)
+    return summary.rename_axis("stage").reset_index()[columns]
+
+
+def cycle_trend(hist, pct=50):
+    """``pct`` percentile days per month (rows) and stage (columns)."""
+    if hist.empty:
+        return pd.DataFrame()
+    trend = percentile_days(hist, ["month", "stage"], pct).unstack("stage")
+    return trend[[s for s in STAGES if s in trend.columns]].rename(columns=STAGES)
+
+
+def spend(conn, first, last, store=None, read=None):
+    """PO spend per month, department and vendor for months ``first``..``last`` (hot + archived)."""
+    read = read or _sql_reader(conn)
+    hot = read(SPEND_WINDOW_SQL, {"first": first, "last": last})
+    cold = store.spend_by_month(conn) if store is not None else None
+    if cold is None or cold.empty:
+        return hot[SPEND_COLUMNS]
+    cold = cold[(cold["month"] >= first) & (cold["month"] <= last)]
+    merged = pd.concat([hot[SPEND_COLUMNS], cold[SPEND_COLUMNS]], ignore_index=True)
+    return merged.groupby(["month", "department", "vendor_name"], as_index=False)[["po_count", "total_spend"]].sum()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Spend and cycle-time analytics for a window of months.")
+    parser.add_argument("command", choices=["cycle", "spend", "warm", "clear"])
+    parser.add_argument("--from", dest="first", help="first month, YYYY-MM (default: 11 months before --to)")
+    parser.add_argument("--to", dest="last", help="last month, YYYY-MM (default: current month)")
+    parser.add_argument("--by", choices=["month", "department", "vendor_name"], default="month")
+    parser.add_argument("--trend", action="store_true", help="cycle: median days per month instead of a summary")
+    parser.add_argument("--hot-only", action="store_true", help="leave out the cold archive")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    args = parser.parse_args(argv)
+
+    from buyit import archive
+
+    last = args.last or current_month()
+    first = args.first or months_between(f"{int(last[:4]) - 1:04d}{last[4:]}", last)[1]
+    engine = create_engine(args.db, future=True)
+    store = None if args.hot_only else archive.ArchiveStore(archive.default_root(args.db))
+    with pd.option_context("display.width", 160, "display.max_rows", 200, "display.max_columns", None), engine.begin() as conn:
+        install(conn)
+        if args.command == "clear":
+            clear(conn)
+            print("Cleared the cached cycle-time months.")
+        elif args.command == "warm":
+            months = available_months(conn, store)
+            cycle_histograms(conn, args.first or months[0], last, store)
+            cached = conn.execute(text("SELECT COUNT(*) FROM cycle_months")).scalar()
+            print(f"{cached} closed months cached.")
+        elif args.command == "cycle":
+            hist = cycle_histograms(conn, first, last, store)
+            print(cycle_trend(hist).round(2) if args.trend else cycle_summary(hist).round(2).to_string(index=False))
+        else:
+            by = spend(conn, first, last, store).groupby(args.by)[["po_count", "total_spend"]].sum()
+            print(by.sort_values("total_spend", ascending=False).round(2) if args.by != "month" else by.round(2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""Hot/cold tiering: move closed POs and their history to month-partitioned Parquet.
+
+A ``Closed`` purchase order is never edited again, so ``archive_closed`` moves
+it, its request, approvals, invoices and lineage rows out of SQLite into
+``<root>/<table>/month=YYYY-MM/batch-NNNNNN-*.parquet`` (month of the PO). Each
+batch writes its files, deletes the rows and records itself in
+``archive_batches`` in one transaction; readers only see files of committed
+batches, so a run that fails half way leaves nothing visible twice, and its
+orphan files are swept by the next run. The delete triggers keep the rollups,
+lineage and search index describing the hot rows only.
+
+``ArchiveStore`` is the read side: the union of hot SQLite rows and the archive
+for the export (``iter_rows``), the Analytics panels (``merge_panel``) and
+lineage lookups. Archive aggregates only change when a batch is committed, so
+they are computed once per archive version.
+
+    python -m buyit.archive run --before 2025-01-01 --vacuum
+    python -m buyit.archive status
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import threading
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from buyit import analytics, lineage, rollups, sqlutil
+
+ARCHIVE_DDL = """
+CREATE TABLE IF NOT EXISTS archive_batches (
+  batch_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  archived_at TEXT NOT NULL,
+  before TEXT,
+  po_count INTEGER NOT NULL DEFAULT 0,
+  row_count INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+ARCHIVE_TABLES = ["archive_batches"]
+
+# table -> how its rows join the batch's picked POs (``p``)
+ARCHIVED = {
+    "requests": "t.request_id = p.request_id",
+    "approvals": "t.request_id = p.request_id",
+    "purchase_orders": "t.request_id = p.request_id",
+    "invoices": "t.po_number = p.po_number",
+    "lineage": "t.request_id = p.request_id",
+}
+
+# Children first; purchase_orders before requests so the spend rollup trigger
+# can still look up the request's department. Lineage rows go with their request.
+DELETE_ORDER = ["invoices", "approvals", "purchase_orders", "requests"]
+
+PICK_DDL = """
+CREATE TEMP TABLE IF NOT EXISTS archive_pick (
+  request_id INTEGER PRIMARY KEY,
+  po_number TEXT NOT NULL,
+  month TEXT NOT NULL
+)
+"""
+
+PICK_SQL = """
+INSERT INTO archive_pick(request_id, po_number, month)
+SELECT request_id, po_number, substr(created_at, 1, 7)
+FROM purchase_orders
+WHERE status = 'Closed' AND po_id > :after AND (:before IS NULL OR created_at < :before)
+ORDER BY po_id
+LIMIT :limit
+"""
+
+FILE_RE = re.compile(r"^batch-(\d+)-\d+\.parquet$")
+
+DEFAULT_BATCH_SIZE = 20000
+
+
+def default_root(db_url):
+    """``BUYIT_ARCHIVE_DIR``, or an ``archive`` directory next to the SQLite file."""
+    configured = os.environ.get("BUYIT_ARCHIVE_DIR", "").strip()
+    if configured:
+        return configured
+    database = make_url(db_url).database
+    if database in (None, "", ":memory:"):
+        return "archive"
+    return os.path.join(os.path.dirname(os.path.abspath(database)), "archive")
+
+
+def arrow_type(declared):
+    """Arrow type for a SQLite declared column type."""
+    import pyarrow as pa
+
+    if "INT" in declared:
+        return pa.int64()
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB", "NUM")):
+        return pa.float64()
+    return pa.string()
+
+
+def table_schema(conn, table):
+    import pyarrow as pa
+
+    columns = conn.execute(text(f"PRAGMA table_info({table})")).all()
+    return pa.schema([(row[1], arrow_type((row[2] or "").upper())) for row in columns])
+
+
+def _partitioning():
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+
+
+def committed_batches(conn):
+    if not conn.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='archive_batches'")).first():
+        return set()
+    return {row[0] for row in conn.execute(text("SELECT batch_id FROM archive_batches"))}
+
+
+def _batch_files(root, table):
+    """``[(batch_id, path), ...]`` for every archive file of ``table``, committed or not."""
+    found = []
+    for dirpath, _, filenames in os.walk(os.path.join(root, table)):
+        for name in filenames:
+            m = FILE_RE.match(name)
+            if m:
+                found.append((int(m.group(1)), os.path.join(dirpath, name)))
+    return sorted(found)
+
+
+def sweep_orphans(root, committed):
+    """Delete archive files written by batches that never committed; return how many."""
+    removed = 0
+    for table in ARCHIVED:
+        for batch_id, path in _batch_files(root, table):
+            if batch_id not in committed:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+def _write_batch(conn, root, batch_id):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    rows = 0
+    for table, join in ARCHIVED.items():
+        schema = table_schema(conn, table).append(pa.field("month", pa.string()))
+        result = conn.execute(text(f"SELECT t.*, p.month FROM {table} t JOIN archive_pick p ON {join}")).all()
+        if not result:
+            continue
+        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*result), schema)]
+        ds.write_dataset(
+            pa.Table.from_arrays(arrays, schema=schema), os.path.join(root, table), format="parquet",
+            partitioning=_partitioning(), basename_template=f"batch-{batch_id:06d}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            file_options=ds.ParquetFileFormat().make_write_options(compression="zstd"),
+        )
+        if table != "lineage":
+            rows += len(result)
+    return rows
+
+
+def archive_batch(conn, root, before=None, limit=DEFAULT_BATCH_SIZE, after=0):
+    """Archive up to ``limit`` Closed POs (created before ``before``) on ``conn``'s transaction.
+
+    Returns ``(po_count, row_count, last_po_id)``; ``po_count == 0`` means
+    nothing was left to archive. Rolling back the transaction undoes the
+    batch: its files are never read and are swept by the next run.
+    """
+    conn.execute(text(PICK_DDL))
+    conn.execute(text("DELETE FROM archive_pick"))
+    conn.execute(text(PICK_SQL), {"after": after, "before": before, "limit": int(limit)})
+    picked, last_po_id = conn.execute(text(
+        "SELECT COUNT(*), MAX(po.po_id) FROM archive_pick p JOIN purchase_orders po ON po.request_id = p.request_id"
+    )).one()
+    if not picked:
+        return 0, 0, after
+    batch_id = conn.execute(text(
+        "INSERT INTO archive_batches(archived_at, before, po_count) VALUES (:at, :before, :n) RETURNING batch_id"
+    ), {"at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "before": before, "n": picked}).scalar()
+    sweep_orphans(root, committed_batches(conn) - {batch_id})
+    try:
+        rows = _write_batch(conn, root, batch_id)
+        for table in DELETE_ORDER:
+            conn.execute(text(f"DELETE FROM {table} WHERE rowid IN (SELECT t.rowid FROM {table} t "
+                              f"JOIN archive_pick p ON {ARCHIVED[table]})"))
+        conn.execute(text("UPDATE archive_batches SET row_count = :rows WHERE batch_id = :b"),
+                     {"rows": rows, "b": batch_id})
+    except Exception:
+        for table in ARCHIVED:
+            for file_batch, path in _batch_files(root, table):
+                if file_batch == batch_id:
+                    os.remove(path)
+        raise
+    return picked, rows, last_po_id
+
+
+def archive_closed(engine, root, before=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Archive every Closed PO created before ``before``, one transaction per batch."""
+    total_pos = total_rows = 0
+    after = 0
+    while True:
+        with engine.begin() as conn:
+            pos, rows, after = archive_batch(conn, root, before, batch_size, after)
+        if not pos:
+            return total_pos, total_rows
+        total_pos += pos
+        total_rows += rows
+        if progress:
+            progress(total_pos, total_rows)
+
+
+def install(conn):
+    """Create the batch manifest table."""
+    for stmt in sqlutil.split_statements(ARCHIVE_DDL):
+        conn.execute(text(stmt))
+
+
+def clear(root):
+    """Remove the whole archive directory (used by the demo reset)."""
+    shutil.rmtree(root, ignore_errors=True)
+
+
+def _merge_counts(hot, cold, keys, value_columns, sort_by=None, ascending=True, limit=None):
+    if cold is None or cold.empty:
+        return hot
+    merged = pd.concat([hot, cold], ignore_index=True)
+    if keys:
+        merged = merged.groupby(keys, as_index=False, sort=False)[value_columns].sum()
+    if sort_by is not None:
+        merged = merged.sort_values(sort_by, ascending=ascending, kind="stable")
+    if limit is not None:
+        merged = merged.head(limit)
+    return merged.reset_index(drop=True)
+
+
+class ArchiveStore:
+    """Read side of the archive: pyarrow dataset scans over committed batches."""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._summaries = {}  # (version, name) -> DataFrame
+
+    def version(self, conn):
+        """Changes whenever a batch is committed (or the manifest is reset)."""
+        if not conn.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='archive_batches'")).first():
+            return (0, 0)
+        return tuple(conn.execute(text("SELECT COUNT(*), COALESCE(MAX(batch_id), 0) FROM archive_batches")).one())
+
+    def dataset(self, conn, table, committed=None):
+        """pyarrow dataset over ``table``'s committed files (with a ``month`` partition column), or None."""
+        import pyarrow.dataset as ds
+
+        committed = committed_batches(conn) if committed is None else committed
+        files = [path for batch_id, path in _batch_files(self.root, table) if batch_id in committed]
+        if not files:
+            return None
+        return ds.dataset(files, format="parquet", partitioning=_partitioning(),
+                          partition_base_dir=os.path.join(self.root, table))
+
+    def scan(self, conn, table, columns=None, filter=None):
+        """Archived rows of ``table`` as a DataFrame (empty if nothing is archived)."""
+        data = self.dataset(conn, table)
+        if data is None:
+            return pd.DataFrame(columns=columns or [])
+        return data.to_table(columns=columns, filter=filter).to_pandas()
+
+    def iter_rows(self, conn, table, columns, chunksize):
+        """Yield lists of archived row tuples of ``table`` in ``columns`` order."""
+        data = self.dataset(conn, table)
+        if data is None:
+            return
+        for batch in data.to_batches(columns=columns, batch_size=chunksize):
+            if batch.num_rows:
+                yield list(zip(*(batch.column(i).to_pylist() for i in range(batch.num_columns))))
+
+    def _summary(self, conn, name, build):
+        key = (self.version(conn), name)
+        with self._lock:
+            if key in self._summaries:
+                return self._summaries[key]
+        frame = build() if key[0][0] else None
+        with self._lock:
+            self._summaries = {k: v for k, v in self._summaries.items() if k[0] == key[0]}
+            self._summaries[key] = frame
+        return frame
+
+    def kpi_counts(self, conn):
+        """Archived rows per ``rollups.COUNT_METRICS`` bucket, shaped like ``KPI_SQL``."""
+        def build():
+            parts = []
+            for metric, (table, column) in rollups.COUNT_METRICS.items():
+                counts = self.scan(conn, table, [column]).groupby(column).size()
+                parts.append(pd.DataFrame({"metric": metric, "bucket": counts.index.astype(str), "n": counts.values}))
+            return pd.concat(parts, ignore_index=True)
+        return self._summary(conn, "kpis", build)
+
+    def spend_by_vendor(self, conn):
+        def build():
+            pos = self.scan(conn, "purchase_orders", ["vendor_name", "total_amount"])
+            return (pos.groupby("vendor_name", as_index=False)["total_amount"].sum()
+                    .rename(columns={"total_amount": "total_spend"}))
+        return self._summary(conn, "spend_by_vendor", build)
+
+    def spend_by_month(self, conn):
+        """Archived PO spend per month, department and vendor, shaped like ``analytics.SPEND_WINDOW_SQL``."""
+        def build():
+            pos = self.scan(conn, "purchase_orders", ["request_id", "vendor_name", "total_amount", "created_at"])
+            departments = self.scan(conn, "requests", ["request_id", "department"])
+            pos = pos.merge(departments, on="request_id", how="left").fillna({"department": ""})
+            pos["month"] = pos["created_at"].str[:7]
+            spend = pos.groupby(["month", "department", "vendor_name"], as_index=False).agg(
+                po_count=("total_amount", "size"), total_spend=("total_amount", "sum"))
+            return spend[analytics.SPEND_COLUMNS]
+        return self._summary(conn, "spend_by_month", build)
+
+    def cycle_histogram(self, conn):
+        """Cycle-time histograms of the archived workflows, every month (see ``analytics``)."""
+        def build():
+            return analytics.frame_histogram(
+                self.scan(conn, "requests", ["request_id", "created_at"]),
+                self.scan(conn, "approvals", ["request_id", "decision", "decided_at"]),
+                self.scan(conn, "purchase_orders", ["request_id", "po_number", "created_at"]),
+                self.scan(conn, "invoices", ["invoice_id", "po_number", "status", "created_at"]),
+            )
+        return self._summary(conn, "cycle_histogram", build)
+
+    def audit_trail(self, conn, limit=50):
+        def build():
+            approvals = self.scan(conn, "approvals").sort_values("approval_id", ascending=False).head(limit)
+            requests = self.scan(conn, "requests", ["request_id", "requester_name"])
+            trail = approvals.merge(requests, on="request_id", how="inner")
+            return trail[["approval_id", "request_id", "requester_name", "approver_name", "decision",
+                          "comments", "decided_at"]]
+        return self._summary(conn, "audit_trail", build)
+
+    def traceability(self, conn, limit=50):
+        def build():
+            rows = self.scan(conn, "lineage").sort_values(["request_id", "invoice_id"], ascending=[False, True])
+            return rows.head(limit)
+        return self._summary(conn, "traceability", build)
+
+    def merge_panel(self, conn, name, hot):
+        """Add the archive to a dashboard panel frame read from the hot tables."""
+        if name == "kpis":
+            return _merge_counts(hot, self.kpi_counts(conn), ["metric", "bucket"], ["n"])
+        if name == "spend_by_vendor":
+            return _merge_counts(hot, self.spend_by_vendor(conn), ["vendor_name"], ["total_spend"],
+                                 sort_by="total_spend", ascending=False)
+        if name == "audit_trail":
+            return _merge_counts(hot, self.audit_trail(conn), [], [], sort_by="approval_id", ascending=False, limit=50)
+        if name == "traceability":
+            # A request is either hot or archived, so a stable sort on request_id keeps each one's invoice order.
+            cold = self.traceability(conn)
+            cold = None if cold is None else cold[hot.columns]
+            return _merge_counts(hot, cold, [], [], sort_by="request_id", ascending=False, limit=50)
+        return hot
+
+    def lineage_lookup(self, conn, request_id=None, po_number=None, invoice_number=None):
+        """Archived lineage of the requests matching any key, shaped like ``lineage.LOOKUP_SQL``."""
+        import pyarrow.dataset as ds
+
+        data = self.dataset(conn, "lineage")
+        columns = [c.strip() for c in lineage.COLUMNS.split(",") if c.strip() != "invoice_id"]
+        if data is None:
+            return pd.DataFrame(columns=columns)
+        keys = [ds.field("request_id") == request_id if request_id is not None else None,
+                ds.field("po_number") == po_number if po_number else None,
+                ds.field("invoice_number") == invoice_number if invoice_number else None]
+        keys = [k for k in keys if k is not None]
+        if not keys:
+            return pd.DataFrame(columns=columns)
+        match = keys[0]
+        for k in keys[1:]:
+            match = match | k
+        ids = data.to_table(columns=["request_id"], filter=match).column("request_id").to_pylist()
+        if not ids:
+            return pd.DataFrame(columns=columns)
+        rows = data.to_table(filter=ds.field("request_id").isin(sorted(set(ids)))).to_pandas()
+        rows = rows.sort_values(["request_id", "invoice_id"], ascending=[False, True])
+        return rows[columns].reset_index(drop=True)
+
+
+def _size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive Closed POs to month-partitioned Parquet.")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    parser.add_argument("--root", help="archive directory (default: BUYIT_ARCHIVE_DIR or ./archive next to the DB)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run")
+    run.add_argument("--before", help="only POs created before this date (YYYY-MM-DD)")
+    run.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    run.add_argument("--vacuum", action="store_true", help="VACUUM the database afterwards to return the space")
+    sub.add_parser("status")
+    args = parser.parse_args(argv)
+
+    root = args.root or default_root(args.db)
+    engine = create_engine(args.db, future=True)
+    db_file = make_url(args.db).database or ""
+    with engine.begin() as conn:
+        install(conn)
+    if args.command == "status":
+        with engine.connect() as conn:
+            batches = conn.execute(text(
+                "SELECT COUNT(*), COALESCE(SUM(po_count), 0), COALESCE(SUM(row_count), 0) FROM archive_batches"
+            )).one()
+            files = sum(len(_batch_files(root, table)) for table in ARCHIVED)
+        print(f"{root}: {batches[0]} batches, {batches[1]:,} POs, {batches[2]:,} rows in {files} files")
+        return 0
+
+    size_before = _size(db_file)
+    pos, rows = archive_closed(engine, root, args.before, args.batch_size,
+                               progress=lambda p, r: print(f"  archived {p:,} POs ({r:,} rows)"))
+    print(f"Archived {pos:,} Closed POs ({rows:,} rows) to {root}")
+    if args.vacuum and pos:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        print(f"{db_file}: {size_before / 1e6:,.1f} MB -> {_size(db_file) / 1e6:,.1f} MB")
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Headless BuyIT Hub: lazily opened storage and a once-per-process schema.
+
+``Hub`` is what the Streamlit app, the CLI and batch jobs share. Creating one
+does no I/O: the engine (and, in production mode, the ``WriteQueue``) are
+built on first use, and ``ensure_schema`` applies pending migrations once per
+``Hub`` rather than on every page render. Nothing here imports Streamlit, and
+the migration and archive modules (which pull in pandas) are imported on first
+use, so ``import buyit.core`` stays cheap for batch jobs.
+
+    from buyit.core import Hub
+    hub = Hub("sqlite:///buyit_hub.db")
+    hub.write(lambda conn: workflow.close_pos(conn, [42]))
+"""
+import threading
+
+from sqlalchemy import text
+
+from buyit import storage
+
+DEMO_USERS = [
+    ("Rohan", "Employee/Requester"),
+    ("Isha", "Approver"),
+    ("Shalini", "Procurement Specialist"),
+    ("Asha", "AP Analyst"),
+    ("Neel", "Compliance Auditor"),
+]
+
+DEMO_VENDORS = ["Figma", "Microsoft", "Amazon Business", "Dell", "T"]
+
+CORE_TABLES = ["invoices", "purchase_orders", "approvals", "requests", "vendors", "vendor_aliases",
+               "vendor_master_version", "users"]
+
+
+
+def derived_tables():
+    """Tables maintained from the core tables (rollups, lineage, search, ledger, archive batches, analytics cache)."""
+    from buyit import analytics, archive, ledger, lineage, rollups, search
+
+    return (rollups.ROLLUP_TABLES + lineage.LINEAGE_TABLES + search.SEARCH_TABLES + ledger.LEDGER_TABLES
+            + archive.ARCHIVE_TABLES + analytics.ANALYTICS_TABLES)
+
+
+def seed_demo_data(conn):
+    """Add the demo users and vendors (vendors already present are skipped)."""
+    conn.execute(text("INSERT OR IGNORE INTO vendors(vendor_name) VALUES (:v)"), [{"v": v} for v in DEMO_VENDORS])
+    conn.execute(text("INSERT INTO users(name, role) VALUES (:n, :r)"), [{"n": n, "r": r} for n, r in DEMO_USERS])
+
+
+def drop_all(conn):
+    """Drop every BuyIT Hub table, derived table and the migration history."""
+    for table in CORE_TABLES + derived_tables() + ["schema_version"]:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+
+
+class Hub:
+    """One database's storage, opened on first use.
+
+    ``attach(engine)`` is applied to every engine created (e.g.
+    ``profiling.Profiler.attach``); ``mode`` defaults to ``BUYIT_STORAGE``.
+    """
+
+    def __init__(self, url=storage.DEFAULT_DB_URL, mode=None, attach=None):
+        self.url = url
+        self.mode = mode or storage.storage_mode()
+        self._attach = attach or (lambda engine: engine)
+        self._engine = None
+        self._writer = None
+        self._schema_ready = False
+        self._lock = threading.RLock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._attach(storage.make_engine(self.url, self.mode))
+        return self._engine
+
+    @property
+    def writer(self):
+        """The ``WriteQueue`` in production mode, else None."""
+        if self.mode != "production":
+            return None
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = storage.WriteQueue(self._attach(storage.make_writer_engine(self.url)))
+        return self._writer
+
+    def write(self, fn):
+        """Run ``fn(conn)`` in a write transaction (through the writer queue in production mode)."""
+        writer = self.writer
+        if writer is not None:
+            return writer.execute(fn)
+        return storage.run_in_transaction(self.engine, fn)
+
+    def ensure_schema(self):
+        """Apply pending migrations, once per ``Hub``; returns the versions applied by this call."""
+        if self._schema_ready:
+            return []
+        with self._lock:
+            if self._schema_ready:
+                return []
+            from buyit import migrations
+
+            applied = self.write(migrations.migrate)
+            self._schema_ready = True
+        return applied
+
+    def archive_root(self):
+        from buyit import archive
+
+        return archive.default_root(self.url)
+
+    def seed_demo(self):
+        self.write(seed_demo_data)
+
+    def reset(self):
+        """Drop every table and the cold archive, then recreate the schema."""
+        from buyit import archive, vendors
+
+        with self._lock:
+            self.write(drop_all)
+            archive.clear(self.archive_root())
+            vendors.REGISTRY.clear()
+            self._schema_ready = False
+            self.ensure_schema()
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            if self._engine is not None:
+                self._engine.dispose()
+                self._engine = None
@@ -0,0 +1,83 @@
+"""Parallel loader for the Analytics & Audit dashboard.
+
+The dashboard's panels (KPI counts, spend by vendor, approvals audit trail,
+traceability) are independent reads. ``DashboardLoader`` submits them to a
+thread pool over a read-only connection pool and hands results back as they
+complete, so a page can fill each panel as soon as its data arrives and the
+load takes as long as the slowest query rather than the sum of all of them.
+SQLite releases the GIL while a statement runs, so the queries do overlap.
+"""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from buyit import queries
+
+DASHBOARD_PAGE = "5) Analytics & Audit"
+DASHBOARD_PANELS = ("kpis", "spend_by_vendor", "audit_trail", "traceability")
+
+
+def dashboard_queries():
+    """``{panel name: (sql, params)}`` for the dashboard panels, as listed in ``queries.PAGE_QUERIES``."""
+    page = queries.PAGE_QUERIES[DASHBOARD_PAGE]
+    return {name: page[name] for name in DASHBOARD_PANELS}
+
+
+def make_readonly_engine(url, pool_size=4):
+    """Engine whose connections open the SQLite file read-only (``mode=ro``).
+
+    Anything other than a file database (e.g. ``:memory:``) is returned as a
+    plain engine, since a second connection would not see the same data.
+    """
+    parsed = make_url(url)
+    if not parsed.drivername.startswith("sqlite") or parsed.database in (None, "", ":memory:"):
+        return create_engine(url, future=True)
+    ro_url = parsed.set(database=f"file:{parsed.database}?mode=ro", query={"uri": "true"})
+    return create_engine(
+        ro_url, future=True, pool_size=pool_size, max_overflow=0, pool_timeout=30,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+
+
+def read_frame(engine, sql, params=None):
+    with engine.connect() as conn:
+        return pd.read_sql(text(sql), conn, params=params or {})
+
+
+class DashboardLoader:
+    """Runs named read queries concurrently on a read-only engine."""
+
+    def __init__(self, engine, max_workers=4):
+        self.engine = engine
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="buyit-dashboard")
+
+    def submit(self, named=None, load=None):
+        """Start every ``{name: (sql, params)}`` query; return ``{future: name}``.
+
+        ``load(sql, params)`` fetches one frame (default: ``read_frame`` on
+        this loader's engine); pass a wrapper to go through a result cache.
+        """
+        named = dashboard_queries() if named is None else named
+        load = load or (lambda sql, params: read_frame(self.engine, sql, params))
+        return {self._pool.submit(load, sql, params): name for name, (sql, params) in named.items()}
+
+    def iter_completed(self, named=None, load=None):
+        """Yield ``(name, frame)`` in completion order."""
+        futures = self.submit(named, load)
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+    def load_all(self, named=None, load=None):
+        return dict(self.iter_completed(named, load))
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self.engine.dispose()
+
+
+def load_serial(engine, named=None):
+    """The pre-loader behaviour: run the dashboard queries one after another."""
+    named = dashboard_queries() if named is None else named
+    return {name: read_frame(engine, sql, params) for name, (sql, params) in named.items()}
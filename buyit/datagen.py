@@ -0,0 +1,185 @@
+"""Synthetic data generator for scale testing.
+
+Fills ``requests``, ``approvals``, ``purchase_orders`` and ``invoices`` with
+referentially consistent rows: every approval points at a request, every PO
+at an approved request, every invoice at a PO, and request statuses agree with
+what happened downstream. Rows are produced in batches and written with
+``executemany``; the trigger-maintained tables (Analytics rollups, lineage,
+search index) are rebuilt once at the end instead of being maintained row by
+row.
+
+    python -m buyit.datagen --db sqlite:///bench_1m.db --requests 1000000 --exception-rate 0.08
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from buyit import analytics, ledger, lineage, migrations, rollups, search
+
+DEPARTMENTS = ["Design", "Engineering", "Finance", "Sales", "Marketing", "HR", "IT", "Legal", "Operations", "Support"]
+VENDORS = ["Figma", "Microsoft", "Amazon Business", "Dell", "Adobe", "Google", "Atlassian", "Slack", "Zoom",
+           "Lenovo", "HP", "Apple", "Salesforce", "Okta", "GitHub"]
+ITEMS = ["licenses", "laptops", "monitors", "seats", "subscriptions", "docking stations", "headsets", "units"]
+REQUESTERS = [f"Employee {i:04d}" for i in range(1, 2001)]
+APPROVERS = ["Isha", "Priya", "Marcus", "Elena", "Kenji"]
+
+INSERT_REQUEST = text("""
+    INSERT INTO requests(request_id, created_at, requester_name, department, item_desc, quantity, est_cost, justification, vendor_name, status)
+    VALUES (:request_id, :created_at, :requester_name, :department, :item_desc, :quantity, :est_cost, :justification, :vendor_name, :status)
+""")
+INSERT_APPROVAL = text("""
+    INSERT INTO approvals(request_id, approver_name, decision, comments, decided_at)
+    VALUES (:request_id, :approver_name, :decision, :comments, :decided_at)
+""")
+INSERT_PO = text("""
+    INSERT INTO purchase_orders(request_id, po_number, created_at, created_by, vendor_name, total_amount, status)
+    VALUES (:request_id, :po_number, :created_at, :created_by, :vendor_name, :total_amount, :status)
+""")
+INSERT_INVOICE = text("""
+    INSERT INTO invoices(po_number, vendor_name, invoice_number, invoice_amount, invoice_date, status, exception_reason, created_at)
+    VALUES (:po_number, :vendor_name, :invoice_number, :invoice_amount, :invoice_date, :status, :exception_reason, :created_at)
+""")
+
+# Share of requests that end in each lifecycle stage.
+LIFECYCLE = [
+    ("Submitted", 0.08),
+    ("Rejected", 0.07),
+    ("Approved", 0.05),
+    ("PO Created", 0.05),
+    ("PO Sent", 0.15),
+    ("Closed", 0.60),
+]
+
+# Trigger-maintained derived tables: (trigger name prefix, module with install/rebuild)
+DERIVED = [("trg_rollup_", rollups), ("trg_lineage_", lineage), ("trg_search_", search), ("trg_ledger_", ledger)]
+
+
+def _ts(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def generate_batch(rnd, first_id, count, start, span_days, exception_rate):
+    """Build one batch of rows (as executemany parameter lists) for ``count`` requests."""
+    reqs, apprs, pos, invs = [], [], [], []
+    stages, weights = zip(*LIFECYCLE)
+    for request_id in range(first_id, first_id + count):
+        created = start + timedelta(seconds=rnd.randrange(span_days * 86400))
+        vendor = rnd.choice(VENDORS)
+        qty = rnd.randint(1, 200)
+        cost = round(qty * rnd.uniform(20, 1500), 2)
+        status = rnd.choices(stages, weights)[0]
+        reqs.append({
+            "request_id": request_id, "created_at": _ts(created), "requester_name": rnd.choice(REQUESTERS),
+            "department": rnd.choice(DEPARTMENTS), "item_desc": f"{qty} {vendor} {rnd.choice(ITEMS)}",
+            "quantity": qty, "est_cost": cost, "justification": "Required for team delivery.",
+            "vendor_name": vendor, "status": status,
+        })
+        if status == "Submitted":
+            continue
+        decided = created + timedelta(hours=rnd.uniform(1, 120))
+        decision = "Rejected" if status == "Rejected" else "Approved"
+        apprs.append({
+            "request_id": request_id, "approver_name": rnd.choice(APPROVERS), "decision": decision,
+            "comments": "Please revise / provide quote." if decision == "Rejected" else "Looks good.",
+            "decided_at": _ts(decided),
+        })
+        if status in ("Rejected", "Approved"):
+            continue
+        po_created = decided + timedelta(hours=rnd.uniform(1, 72))
+        po_number = f"PO-{request_id:08d}"
+        total = round(cost * rnd.uniform(0.95, 1.05), 2)
+        po_status = {"PO Created": "Created", "PO Sent": "Sent", "Closed": "Closed"}[status]
+        pos.append({
+            "request_id": request_id, "po_number": po_number, "created_at": _ts(po_created),
+            "created_by": "Shalini", "vendor_name": vendor, "total_amount": total, "status": po_status,
+        })
+        if po_status == "Created":
+            continue
+        # 15% of POs are billed in two partial invoices.
+        first_share = round(total * rnd.uniform(0.3, 0.7), 2)
+        shares = [first_share, round(total - first_share, 2)] if rnd.random() < 0.15 else [total]
+        billed = 0.0
+        for n, share in enumerate(shares, start=1):
+            invoiced = po_created + timedelta(days=rnd.uniform(3, 45))
+            amount, inv_vendor, reason = share, vendor, None
+            if rnd.random() < exception_rate:
+                if rnd.random() < 0.5:
+                    inv_vendor = rnd.choice([v for v in VENDORS if v != vendor])
+                    reason = f"Vendor mismatch: PO={vendor} vs Invoice={inv_vendor}"
+                else:
+                    amount = round(share + total * rnd.uniform(0.1, 0.5), 2)
+                    reason = (f"Cumulative over-billing: PO=${total:.2f}, invoiced before=${billed:.2f} "
+                              f"+ Invoice=${amount:.2f} exceeds PO by ${billed + amount - total:.2f}, tol=$50.00")
+            if reason is None:
+                billed += amount
+            invs.append({
+                "po_number": po_number, "vendor_name": inv_vendor, "invoice_number": f"INV-{request_id:08d}-{n:02d}",
+                "invoice_amount": amount, "invoice_date": invoiced.strftime("%Y-%m-%d"),
+                "status": "Exception" if reason else "Matched", "exception_reason": reason,
+                "created_at": _ts(invoiced),
+            })
+    return reqs, apprs, pos, invs
+
+
+def _drop_derived_triggers(conn):
+    prefixes = tuple(prefix for prefix, _ in DERIVED)
+    names = [r[0] for r in conn.execute(text("SELECT name FROM sqlite_master WHERE type='trigger'"))
+             if r[0].startswith(prefixes)]
+    for name in names:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def generate(engine, requests=10_000, exception_rate=0.05, batch_size=20_000, seed=42, years=3, progress=None):
+    """Append ``requests`` synthetic requests (and their downstream rows); return row counts."""
+    rnd = random.Random(seed)
+    start = datetime.now() - timedelta(days=365 * years)
+    counts = {"requests": 0, "approvals": 0, "purchase_orders": 0, "invoices": 0}
+    with engine.begin() as conn:
+        # Must run before the first write opens the transaction.
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        migrations.migrate(conn)
+        first_id = conn.execute(text("SELECT COALESCE(MAX(request_id), 0) + 1 FROM requests")).scalar()
+        # Per-row trigger maintenance is the dominant cost at millions of rows;
+        # drop the triggers, bulk load, then reinstall and rebuild once.
+        _drop_derived_triggers(conn)
+        for offset in range(0, requests, batch_size):
+            n = min(batch_size, requests - offset)
+            reqs, apprs, pos, invs = generate_batch(rnd, first_id + offset, n, start, 365 * years, exception_rate)
+            for stmt, rows, key in ((INSERT_REQUEST, reqs, "requests"), (INSERT_APPROVAL, apprs, "approvals"),
+                                    (INSERT_PO, pos, "purchase_orders"), (INSERT_INVOICE, invs, "invoices")):
+                if rows:
+                    conn.execute(stmt, rows)
+                counts[key] += len(rows)
+            if progress:
+                progress(counts)
+        for _, module in DERIVED:
+            module.install(conn)
+            module.rebuild(conn)
+        # Backdated rows change closed months.
+        analytics.clear(conn)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic procurement data.")
+    parser.add_argument("--db", default="sqlite:///buyit_bench.db")
+    parser.add_argument("--requests", type=int, default=10_000, help="number of requests (e.g. 10000, 1000000)")
+    parser.add_argument("--exception-rate", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    counts = generate(
+        create_engine(args.db, future=True), args.requests, args.exception_rate, args.batch_size, args.seed,
+        progress=lambda c: print(f"  {c['requests']:>12,} requests  {time.perf_counter() - started:8.1f}s"),
+    )
+    print(f"Generated in {time.perf_counter() - started:.1f}s: "
+          + ", ".join(f"{k}={v:,}" for k, v in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""Streaming report export: Excel, gzipped CSV or Parquet with flat memory use.
+
+Each table is read from SQLite in fixed-size chunks and written row by row to
+a file on disk (xlsxwriter ``constant_memory`` mode for Excel), so peak memory
+depends on the chunk size rather than on how many rows the tables hold.
+Archived rows (``buyit.archive``) are streamed after the hot ones, batch by
+batch from the Parquet files.
+"""
+import argparse
+import csv
+import gzip
+import os
+import tempfile
+import time
+import weakref
+import zipfile
+
+from sqlalchemy import create_engine, text
+
+from buyit import archive
+
+REPORT_TABLES = [
+    ("Requests", "requests"),
+    ("Approvals", "approvals"),
+    ("POs", "purchase_orders"),
+    ("Invoices", "invoices"),
+]
+DEFAULT_CHUNKSIZE = 10000
+EXCEL_MAX_ROWS = 1_048_576  # rows per worksheet, header included
+
+EXPORT_FORMATS = {
+    "xlsx": ("BuyIT_Hub_Report.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv.gz": ("BuyIT_Hub_Report_csv.zip", "application/zip"),
+    "parquet": ("BuyIT_Hub_Report_parquet.zip", "application/zip"),
+}
+
+
+def table_columns(conn, table):
+    """Return ``[(name, declared_type), ...]`` for a report table."""
+    return [(row[1], (row[2] or "").upper()) for row in conn.execute(text(f"PRAGMA table_info({table})"))]
+
+
+def iter_table_chunks(conn, table, chunksize=DEFAULT_CHUNKSIZE, store=None):
+    """Yield lists of at most ``chunksize`` row tuples: hot rows in rowid order, then ``store``'s archived rows."""
+    result = conn.execution_options(stream_results=True).execute(text(f"SELECT * FROM {table}"))
+    for rows in result.partitions(chunksize):
+        yield [tuple(r) for r in rows]
+    if store is not None:
+        yield from store.iter_rows(conn, table, [name for name, _ in table_columns(conn, table)], chunksize)
+
+
+def write_xlsx(engine, path, chunksize=DEFAULT_CHUNKSIZE, store=None):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "tmpdir": os.path.dirname(path) or None})
+    try:
+        with engine.connect() as conn:
+            for sheet, table in REPORT_TABLES:
+                header = [name for name, _ in table_columns(conn, table)]
+                part, ws, row_no = 1, workbook.add_worksheet(sheet), 1
+                ws.write_row(0, 0, header)
+                for rows in iter_table_chunks(conn, table, chunksize, store):
+                    for row in rows:
+                        if row_no == EXCEL_MAX_ROWS:
+                            part += 1
+                            ws, row_no = workbook.add_worksheet(f"{sheet} ({part})"), 1
+                            ws.write_row(0, 0, header)
+                        ws.write_row(row_no, 0, row)
+                        row_no += 1
+    finally:
+        workbook.close()
+
+
+def _write_csv_gz(conn, table, path, chunksize, store=None):
+    with gzip.open(path, "wt", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow([name for name, _ in table_columns(conn, table)])
+        for rows in iter_table_chunks(conn, table, chunksize, store):
+            writer.writerows(rows)
+
+
+def _write_parquet(conn, table, path, chunksize, store=None):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    columns = table_columns(conn, table)
+    schema = pa.schema([(name, archive.arrow_type(declared)) for name, declared in columns])
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in iter_table_chunks(conn, table, chunksize, store):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def _write_zip(engine, path, suffix, write_table, chunksize, store=None):
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(path) or None) as workdir:
+        with engine.connect() as conn, zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for _, table in REPORT_TABLES:
+                member = os.path.join(workdir, f"{table}{suffix}")
+                write_table(conn, table, member, chunksize, store)
+                zf.write(member, arcname=f"{table}{suffix}")
+                os.remove(member)
+
+
+REPORT_PREFIX = "buyit_report_"
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class TempReport:
+    """An exported report file that is deleted with this object.
+
+    The app keeps one in ``st.session_state``: when the session ends and its
+    state is dropped, or the process exits, the file goes with it.
+    """
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.format = fmt
+        self._finalizer = weakref.finalize(self, _remove, path)
+
+    def exists(self):
+        return self._finalizer.alive and os.path.exists(self.path)
+
+    def read_bytes(self):
+        with open(self.path, "rb") as fh:
+            return fh.read()
+
+    def remove(self):
+        self._finalizer()
+
+
+def sweep_reports(max_age=24 * 3600, directory=None):
+    """Delete temp reports older than ``max_age`` seconds (left by a killed process); returns the count."""
+    directory = directory or tempfile.gettempdir()
+    cutoff = time.time() - max_age
+    removed = 0
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(REPORT_PREFIX) and os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+            _remove(path)
+            removed += 1
+    return removed
+
+
+def export_report(engine, fmt="xlsx", path=None, chunksize=DEFAULT_CHUNKSIZE, store=None):
+    """Write the full report in ``fmt`` and return the file path.
+
+    ``csv.gz`` and ``parquet`` produce a zip with one file per table. Without
+    ``path`` the report goes to a new temp file, which the caller removes.
+    With an ``archive.ArchiveStore`` each table also includes its archived rows.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix=REPORT_PREFIX, suffix=os.path.splitext(EXPORT_FORMATS[fmt][0])[1])
+        os.close(fd)
+    if fmt == "xlsx":
+        write_xlsx(engine, path, chunksize, store)
+    elif fmt == "csv.gz":
+        _write_zip(engine, path, ".csv.gz", _write_csv_gz, chunksize, store)
+    else:
+        _write_zip(engine, path, ".parquet", _write_parquet, chunksize, store)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the full BuyIT Hub report without loading tables into memory.")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="xlsx")
+    parser.add_argument("--out", help="output file (default: file name used by the app)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--archive", help="archive directory to include (default: the database's archive)")
+    parser.add_argument("--hot-only", action="store_true", help="leave archived rows out")
+    args = parser.parse_args(argv)
+
+    out = args.out or EXPORT_FORMATS[args.format][0]
+    store = None if args.hot_only else archive.ArchiveStore(args.archive or archive.default_root(args.db))
+    export_report(create_engine(args.db, future=True), args.format, out, args.chunksize, store)
+    print(f"Wrote {out} ({os.path.getsize(out):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
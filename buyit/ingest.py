@@ -0,0 +1,281 @@
+"""Bulk invoice ingestion: chunked file reads, vectorized PO matching, bulk inserts.
+
+Vendor-portal exports arrive as files with thousands of rows, so each chunk
+is matched against ``purchase_orders`` and the ``po_ledger`` balances with
+one query and one merge, and written back with one ``executemany`` per
+chunk. The single-invoice form on Page 4 goes through the same path as a
+one-row chunk, so both apply identical rules: duplicate invoice numbers,
+vendor mismatch and cumulative over-billing against the PO's running
+balance.
+"""
+import argparse
+import time
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+from sqlalchemy.exc import IntegrityError
+
+from buyit import ledger, vendors
+from buyit.storage import run_in_transaction, savepoint
+
+REQUIRED_COLUMNS = ["po_number", "vendor_name", "invoice_number", "invoice_amount", "invoice_date"]
+DEFAULT_CHUNKSIZE = 5000
+DEFAULT_TOLERANCE = 50.0
+# Keys per IN-list lookup, as for ledger.booked_invoices.
+LOOKUP_BATCH = ledger.LOOKUP_BATCH
+
+PO_LOOKUP = text(
+    "SELECT po.po_number, po.vendor_name AS po_vendor_name, po.total_amount, "
+    "COALESCE(l.invoiced_to_date, 0) AS invoiced_to_date "
+    "FROM purchase_orders po LEFT JOIN po_ledger l ON l.po_number = po.po_number "
+    "WHERE po.po_number IN :po_numbers"
+).bindparams(bindparam("po_numbers", expanding=True))
+
+PO_COLUMNS = ["po_number", "po_vendor_name", "total_amount", "invoiced_to_date"]
+
+INSERT_INVOICE = text("""
+    INSERT INTO invoices(po_number, vendor_name, invoice_number, invoice_amount, invoice_date, status, exception_reason, created_at)
+    VALUES (:po_number, :vendor_name, :invoice_number, :invoice_amount, :invoice_date, :status, :exception_reason, :created_at)
+""")
+
+
+def _normalize_columns(chunk):
+    chunk = chunk.rename(columns=lambda c: str(c).strip().lower().replace(" ", "_"))
+    missing = [c for c in REQUIRED_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Invoice file is missing columns: {', '.join(missing)}")
+    return chunk[REQUIRED_COLUMNS]
+
+
+def read_invoice_chunks(source, chunksize=DEFAULT_CHUNKSIZE, filename=None):
+    """Yield normalized DataFrames of at most ``chunksize`` invoice rows.
+
+    ``source`` is a path or file-like object (e.g. a Streamlit upload). CSV
+    (optionally compressed) is streamed; Excel has no chunked reader in
+    pandas, so the sheet is read once and sliced.
+    """
+    name = str(filename or getattr(source, "name", source)).lower()
+    dtypes = {"po_number": str, "invoice_number": str, "vendor_name": str}
+    if name.endswith((".xlsx", ".xls")):
+        frame = pd.read_excel(source, dtype=dtypes)
+        for start in range(0, len(frame), chunksize):
+            yield _normalize_columns(frame.iloc[start:start + chunksize])
+    else:
+        for chunk in pd.read_csv(source, chunksize=chunksize, dtype=dtypes):
+            yield _normalize_columns(chunk)
+
+
+def clean_chunk(chunk):
+    """Coerce types and split a chunk into (valid rows, rejected row count)."""
+    chunk = chunk.copy()
+    for col in ("po_number", "vendor_name", "invoice_number"):
+        chunk[col] = chunk[col].astype("string").str.strip()
+    chunk["invoice_amount"] = pd.to_numeric(chunk["invoice_amount"], errors="coerce")
+    chunk["invoice_date"] = pd.to_datetime(chunk["invoice_date"], errors="coerce").dt.strftime("%Y-%m-%d")
+    valid = chunk.notna().all(axis=1) & (chunk["po_number"] != "") & (chunk["invoice_number"] != "")
+    return chunk[valid], int((~valid).sum())
+
+
+def _money(values):
+    return values.map("{:.2f}".format).astype("string")
+
+
+def match_invoices(chunk, pos, tolerance=DEFAULT_TOLERANCE, vendor_index=None, booked=None):
+    """Apply the Page 4 Matched/Exception/Duplicate rules column-wise.
+
+    ``pos`` has ``po_number``, ``po_vendor_name``, ``total_amount`` and
+    optionally ``invoiced_to_date`` (the PO's ledger balance before this
+    chunk). Rows are taken in file order, so several partial invoices for one
+    PO are Matched until their running total would pass the PO amount plus
+    ``tolerance``. ``booked`` (``ledger.booked_invoices``) lists invoices
+    already recorded under the chunk's invoice numbers; a repeat of one of
+    those, or of an earlier row in the chunk, by the same vendor is a
+    ``Duplicate``. With a ``vendors.VendorIndex``, vendors are compared by
+    canonical name (so an alias is neither a mismatch nor a new invoice
+    number), resolving each distinct name once per chunk; without one, by
+    case-insensitive name. Returns ``chunk`` with ``status`` and
+    ``exception_reason`` columns.
+    """
+    merged = chunk.merge(pos, on="po_number", how="left")
+    merged["total_amount"] = pd.to_numeric(merged["total_amount"], errors="coerce")
+    if "invoiced_to_date" not in merged:
+        merged["invoiced_to_date"] = 0.0
+    merged["invoiced_to_date"] = pd.to_numeric(merged["invoiced_to_date"], errors="coerce").fillna(0.0)
+    if booked is None:
+        booked = pd.DataFrame(columns=["invoice_number", "booked_vendor_name", "booked_invoice_id"])
+    merged["status"] = "Matched"
+    merged["exception_reason"] = None
+
+    if vendor_index is None:
+        def vendor_key(values):
+            return values.astype("string").str.strip().str.lower()
+    else:
+        names = pd.concat([merged["vendor_name"], merged["po_vendor_name"].astype("string"),
+                           booked["booked_vendor_name"].astype("string")]).dropna().unique()
+        keys = {name: vendor_index.key(name) for name in names}
+
+        def vendor_key(values):
+            return values.astype("string").map(keys)
+    invoice_key = vendor_key(merged["vendor_name"])
+
+    number_key = merged["invoice_number"].astype("string") + "\x1f" + invoice_key.astype("string")
+    booked_ids = dict(zip(booked["invoice_number"].astype("string") + "\x1f"
+                          + vendor_key(booked["booked_vendor_name"]).astype("string"), booked["booked_invoice_id"]))
+    earlier_id = number_key.map(booked_ids)
+    repeated = number_key.duplicated(keep="first")
+    duplicate = earlier_id.notna() | repeated
+
+    po_key = vendor_key(merged["po_vendor_name"])
+    vendor_off = (invoice_key != po_key).fillna(True)
+    unknown = merged["total_amount"].isna()
+
+    # Running balance per PO, in file order: an invoice that would pass the PO
+    # total is an Exception and is not booked, so later partials still fit.
+    # Only POs with several candidate rows in the chunk need the ordered walk.
+    candidate = ~(duplicate | vendor_off | unknown)
+    invoiced_before = merged["invoiced_to_date"].copy()
+    several = candidate & merged["po_number"].where(candidate).duplicated(keep=False)
+    for rows in merged[several].groupby("po_number", sort=False).groups.values():
+        running = merged.at[rows[0], "invoiced_to_date"]
+        for i in rows:
+            invoiced_before.at[i] = running
+            if running + merged.at[i, "invoice_amount"] - merged.at[i, "total_amount"] <= float(tolerance):
+                running += merged.at[i, "invoice_amount"]
+    excess = invoiced_before + merged["invoice_amount"] - merged["total_amount"]
+    over = candidate & (excess > float(tolerance))
+    merged.loc[over, "status"] = "Exception"
+    merged.loc[over, "exception_reason"] = (
+        "Cumulative over-billing: PO=$" + _money(merged.loc[over, "total_amount"])
+        + ", invoiced before=$" + _money(invoiced_before[over])
+        + " + Invoice=$" + _money(merged.loc[over, "invoice_amount"])
+        + " exceeds PO by $" + _money(excess[over])
+        + f", tol=${float(tolerance):.2f}"
+    )
+
+    merged.loc[vendor_off, "status"] = "Exception"
+    merged.loc[vendor_off, "exception_reason"] = (
+        "Vendor mismatch: PO=" + merged.loc[vendor_off, "po_vendor_name"].astype("string")
+        + " vs Invoice=" + merged.loc[vendor_off, "vendor_name"]
+    )
+    if vendor_index is not None and vendor_off.any():
+        # Token candidates are only a hint for AP, never a match.
+        similar = merged[vendor_off].apply(
+            lambda r: pd.notna(r["po_vendor_name"]) and r["po_vendor_name"] in vendor_index.candidates(r["vendor_name"]),
+            axis=1,
+        )
+        hinted = similar[similar].index
+        merged.loc[hinted, "exception_reason"] += " (similar name; add an alias if it is the same vendor)"
+
+    merged.loc[unknown, "status"] = "Exception"
+    merged.loc[unknown, "exception_reason"] = "PO not found: " + merged.loc[unknown, "po_number"]
+
+    merged.loc[duplicate, "status"] = ledger.DUPLICATE
+    merged.loc[duplicate, "exception_reason"] = (
+        "Duplicate invoice number: " + merged.loc[duplicate, "invoice_number"]
+        + earlier_id[duplicate].map(lambda i: f" already booked as invoice {int(i)}" if pd.notna(i)
+                                    else " repeated in the same batch").astype("string")
+    )
+
+    return merged.drop(columns=["po_vendor_name", "total_amount", "invoiced_to_date"])
+
+
+def _match_chunk(conn, chunk, tolerance):
+    po_numbers = chunk["po_number"].unique().tolist()
+    pos = pd.DataFrame([
+        row for start in range(0, len(po_numbers), LOOKUP_BATCH)
+        for row in conn.execute(PO_LOOKUP, {"po_numbers": po_numbers[start:start + LOOKUP_BATCH]})
+    ], columns=PO_COLUMNS)
+    booked = ledger.booked_invoices(conn, chunk["invoice_number"].tolist())
+    return match_invoices(chunk, pos, tolerance, vendors.current(conn), booked)
+
+
+def _insert_matched(conn, matched, created_at):
+    matched["created_at"] = created_at
+    records = matched.astype(object).where(matched.notna(), None).to_dict("records")
+    if records:
+        with savepoint(conn):
+            conn.execute(INSERT_INVOICE, records)
+    return matched
+
+
+def ingest_chunk(conn, chunk, tolerance=DEFAULT_TOLERANCE, created_at=None):
+    """Match and insert one cleaned chunk on ``conn`` (the caller owns the transaction).
+
+    Vendors are resolved through the database's vendor master index; PO
+    balances and earlier invoices are index lookups for the chunk's keys, in
+    batches of ``LOOKUP_BATCH`` so any chunk size stays under SQLite's limit on
+    bound variables. If another session books one of the chunk's invoice
+    numbers between those lookups and the insert, the unique index refuses the
+    insert; it is rolled back to its savepoint and the chunk is matched once
+    more, so that invoice comes out as a ``Duplicate``.
+    """
+    created_at = created_at or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        return _insert_matched(conn, _match_chunk(conn, chunk, tolerance), created_at)
+    except IntegrityError as e:
+        if "UNIQUE" not in str(e.orig):
+            raise
+    return _insert_matched(conn, _match_chunk(conn, chunk, tolerance), created_at)
+
+
+def invoice_row(po_number, vendor_name, invoice_number, invoice_amount, invoice_date):
+    """One invoice (e.g. from the Page 4 form) as a cleaned chunk for ``ingest_chunk``."""
+    chunk, _ = clean_chunk(pd.DataFrame([{
+        "po_number": po_number, "vendor_name": vendor_name, "invoice_number": invoice_number,
+        "invoice_amount": invoice_amount, "invoice_date": invoice_date,
+    }]))
+    return chunk
+
+
+def ingest_invoices(engine, source, tolerance=DEFAULT_TOLERANCE, chunksize=DEFAULT_CHUNKSIZE,
+                    filename=None, on_chunk=None, write=None):
+    """Ingest an invoice file chunk by chunk, one transaction per chunk.
+
+    ``write(fn)`` runs ``fn(conn)`` in a transaction and returns its result;
+    pass ``WriteQueue.execute`` to route chunks through the production writer.
+    ``on_chunk(summary)`` is called after every committed chunk with the
+    running summary, so a UI can show progress. Returns the final summary:
+    ``rows``, ``seconds``, ``rows_per_sec`` and ``by_status`` (which also
+    counts ``Rejected`` rows that were missing required values).
+    """
+    write = write or (lambda fn: run_in_transaction(engine, fn))
+    started = time.perf_counter()
+    summary = {"rows": 0, "seconds": 0.0, "rows_per_sec": 0.0, "by_status": {}}
+    by_status = summary["by_status"]
+    for raw in read_invoice_chunks(source, chunksize=chunksize, filename=filename):
+        chunk, rejected = clean_chunk(raw)
+        if rejected:
+            by_status["Rejected"] = by_status.get("Rejected", 0) + rejected
+        if not chunk.empty:
+            matched = write(lambda conn, chunk=chunk: ingest_chunk(conn, chunk, tolerance))
+            for status, n in matched["status"].value_counts().items():
+                by_status[status] = by_status.get(status, 0) + int(n)
+        summary["rows"] += len(raw)
+        summary["seconds"] = time.perf_counter() - started
+        summary["rows_per_sec"] = summary["rows"] / summary["seconds"] if summary["seconds"] else 0.0
+        if on_chunk:
+            on_chunk(summary)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-ingest an invoice CSV/Excel file and match it to POs.")
+    parser.add_argument("path")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db, future=True)
+    summary = ingest_invoices(
+        engine, args.path, tolerance=args.tolerance, chunksize=args.chunksize,
+        on_chunk=lambda s: print(f"{s['rows']:>10,} rows  {s['rows_per_sec']:>10,.0f} rows/sec"),
+    )
+    print(f"Done: {summary['rows']:,} rows in {summary['seconds']:.2f}s ({summary['rows_per_sec']:,.0f} rows/sec)")
+    for status, n in sorted(summary["by_status"].items()):
+        print(f"  {status:<10} {n:>10,}")
+
+
+if __name__ == "__main__":
+    main()
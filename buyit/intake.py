@@ -0,0 +1,122 @@
+"""AI intake: turn free-text procurement requests into structured fields.
+
+``extract_fields`` serves the single text box on Page 1. ``extract_many`` and
+``extract_frame`` run the same extraction over large batches (e.g. a backfill
+of emailed requests) with patterns compiled once. Vendor detection takes any
+object with a ``match(text)`` method: the built-in keyword matcher, or the
+vendor master index (``buyit.vendors``), which also knows the aliases.
+"""
+import argparse
+import re
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from buyit import vendors
+
+QTY_RE = re.compile(r"\b(\d+)\s*(licenses|license|units|laptops|seats|subscriptions)?\b", re.I)
+COST_PREFIX_RE = re.compile(r"(\$|usd)\s*([\d,]+(\.\d+)?)", re.I)
+COST_SUFFIX_RE = re.compile(r"\b([\d,]+(\.\d+)?)\s*(usd|dollars)\b", re.I)
+
+# Keyword -> vendor name, in priority order (first listed wins when several match).
+DEFAULT_VENDOR_KEYWORDS = {
+    "Figma": "Figma",
+    "Microsoft": "Microsoft",
+    "Amazon": "Amazon Business",
+    "Dell": "Dell",
+    "Adobe": "Adobe",
+    "Google": "Google",
+}
+
+EMPTY_FIELDS = {"item_desc": "", "quantity": 1, "est_cost": 0.0, "vendor_name": ""}
+
+
+class VendorMatcher:
+    """Finds the highest-priority vendor keyword in a text with one regex scan.
+
+    All keywords are folded into a single alternation (longest first, so
+    "Amazon Business" wins over "Amazon" at the same position) instead of one
+    ``re.search`` per vendor.
+    """
+
+    def __init__(self, keywords):
+        self._lookup = {}
+        for priority, (keyword, vendor) in enumerate(keywords.items()):
+            self._lookup.setdefault(keyword.lower(), (priority, vendor))
+        alternation = "|".join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+        self._pattern = re.compile(rf"\b(?:{alternation})\b", re.I) if keywords else None
+
+    def match(self, t):
+        if self._pattern is None:
+            return ""
+        best = None
+        for m in self._pattern.finditer(t):
+            hit = self._lookup[m.group(0).lower()]
+            if best is None or hit[0] < best[0]:
+                best = hit
+                if hit[0] == 0:
+                    break
+        return best[1] if best else ""
+
+
+DEFAULT_MATCHER = VendorMatcher(DEFAULT_VENDOR_KEYWORDS)
+
+
+def extract_fields(free_text: str, matcher=None):
+    t = free_text.strip()
+    qty = None
+    m = QTY_RE.search(t)
+    if m:
+        qty = int(m.group(1))
+
+    cost = None
+    m = COST_PREFIX_RE.search(t)
+    if m:
+        cost = float(m.group(2).replace(",", ""))
+    else:
+        m = COST_SUFFIX_RE.search(t)
+        if m:
+            cost = float(m.group(1).replace(",", ""))
+
+    vendor = (matcher or DEFAULT_MATCHER).match(t)
+
+    item_desc = t.split(".")[0][:180] if t else "Software/Hardware purchase"
+    return {"item_desc": item_desc, "quantity": qty or 1, "est_cost": cost or 0.0, "vendor_name": vendor}
+
+
+def extract_many(texts, matcher=None):
+    """Yield one field dict per text; missing values (None/NaN) count as empty text."""
+    matcher = matcher or DEFAULT_MATCHER
+    for t in texts:
+        yield extract_fields(t if isinstance(t, str) else "", matcher)
+
+
+def extract_frame(texts, matcher=None):
+    """Extract a Series (or any iterable) of texts into a DataFrame.
+
+    A Series keeps its index, so the result can be joined back to the source.
+    """
+    index = texts.index if isinstance(texts, pd.Series) else None
+    return pd.DataFrame(list(extract_many(texts, matcher)), index=index, columns=list(EMPTY_FIELDS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill structured fields from a CSV of free-text requests.")
+    parser.add_argument("path")
+    parser.add_argument("--column", default="text", help="column holding the free text")
+    parser.add_argument("--out", required=True, help="CSV file to write")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db", help="resolve vendors with this database's vendor master")
+    parser.add_argument("--chunksize", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    with create_engine(args.db, future=True).connect() as conn:
+        matcher = vendors.current(conn)
+    header = True
+    for chunk in pd.read_csv(args.path, chunksize=args.chunksize, usecols=[args.column]):
+        extract_frame(chunk[args.column], matcher).to_csv(args.out, mode="w" if header else "a",
+                                                          header=header, index=False)
+        header = False
+
+
+if __name__ == "__main__":
+    main()
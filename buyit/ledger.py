@@ -0,0 +1,194 @@
+"""Running invoiced balance per PO and duplicate invoice detection.
+
+``po_ledger`` holds, per PO, its total and the sum and count of its
+``Matched`` invoices. Triggers on ``purchase_orders`` and ``invoices`` keep it
+current (including when an Exception is later resolved to Matched), so
+invoice matching reads a PO's remaining balance with one primary key lookup
+instead of summing its invoices.
+
+A unique partial index on ``(invoice_number, vendor_name COLLATE NOCASE)``
+over every invoice not marked ``Duplicate`` lets matching find an earlier
+invoice with the same number through the index, and guarantees the same
+vendor spelling can never record one invoice number twice. The migration that
+installs this marks existing repeats (all but the first) as ``Duplicate``.
+
+    python -m buyit.ledger verify
+    python -m buyit.ledger balance PO-00000001
+"""
+import argparse
+import sys
+
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+
+from buyit.sqlutil import split_statements, trigger
+
+LEDGER_TABLES = ["po_ledger"]
+
+SOURCE_TABLES = ["purchase_orders", "invoices"]
+
+DUPLICATE = "Duplicate"
+
+# Invoice numbers per BOOKED_NUMBERS query (SQLite's default cap is 32766 bound variables).
+LOOKUP_BATCH = 10000
+
+LEDGER_DDL = """
+CREATE TABLE IF NOT EXISTS po_ledger (
+  po_number TEXT NOT NULL PRIMARY KEY,
+  total_amount REAL NOT NULL,
+  invoiced_to_date REAL NOT NULL DEFAULT 0,
+  invoice_count INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+
+UNIQUE_INVOICE_DDL = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_invoices_number_vendor
+ON invoices(invoice_number, vendor_name COLLATE NOCASE) WHERE status <> 'Duplicate';
+"""
+
+# Keep the first booked invoice of each (number, vendor) and mark later repeats.
+MARK_DUPLICATES_SQL = """
+UPDATE invoices
+SET status = 'Duplicate',
+    exception_reason = 'Duplicate invoice number: ' || invoices.invoice_number || ' already booked as invoice ' || d.first_id
+FROM (
+    SELECT invoice_id,
+        FIRST_VALUE(invoice_id) OVER w AS first_id,
+        ROW_NUMBER() OVER w AS n
+    FROM invoices
+    WHERE status <> 'Duplicate'
+    WINDOW w AS (PARTITION BY invoice_number, vendor_name COLLATE NOCASE ORDER BY invoice_id)
+) d
+WHERE invoices.invoice_id = d.invoice_id AND d.n > 1
+"""
+
+EXPECTED_SQL = """
+SELECT po.po_number, po.total_amount,
+    COALESCE(SUM(i.invoice_amount), 0) AS invoiced_to_date, COUNT(i.invoice_id) AS invoice_count
+FROM purchase_orders po
+LEFT JOIN invoices i ON i.po_number = po.po_number AND i.status = 'Matched'
+GROUP BY po.po_number
+"""
+
+BALANCE_SQL = """
+SELECT po_number, total_amount, invoiced_to_date, total_amount - invoiced_to_date AS remaining, invoice_count
+FROM po_ledger
+WHERE po_number = :p
+"""
+
+# Recorded (non-duplicate) invoices carrying any of the given numbers (served by the unique index).
+BOOKED_NUMBERS = text(
+    "SELECT invoice_number, vendor_name, invoice_id, po_number FROM invoices "
+    "WHERE invoice_number IN :numbers AND status <> 'Duplicate'"
+).bindparams(bindparam("numbers", expanding=True))
+
+
+def _book(row, sign):
+    return (f"UPDATE po_ledger SET invoiced_to_date = invoiced_to_date {sign} {row}.invoice_amount, "
+            f"invoice_count = invoice_count {sign} 1 WHERE po_number = {row}.po_number;")
+
+
+def trigger_sql():
+    """CREATE TRIGGER statements that keep ``po_ledger`` current."""
+    booked_old, booked_new = "OLD.status = 'Matched'", "NEW.status = 'Matched'"
+    return [
+        trigger("trg_ledger_pos_ins", "INSERT", "purchase_orders", [
+            "INSERT INTO po_ledger(po_number, total_amount, invoiced_to_date, invoice_count) "
+            "SELECT NEW.po_number, NEW.total_amount, COALESCE(SUM(invoice_amount), 0), COUNT(*) "
+            "FROM invoices WHERE po_number = NEW.po_number AND status = 'Matched' "
+            "ON CONFLICT(po_number) DO UPDATE SET total_amount = excluded.total_amount, "
+            "invoiced_to_date = excluded.invoiced_to_date, invoice_count = excluded.invoice_count;",
+        ]),
+        trigger("trg_ledger_pos_upd", "UPDATE OF total_amount", "purchase_orders", [
+            "UPDATE po_ledger SET total_amount = NEW.total_amount WHERE po_number = NEW.po_number;",
+        ]),
+        trigger("trg_ledger_pos_rekey", "UPDATE OF po_number", "purchase_orders", [
+            "DELETE FROM po_ledger WHERE po_number = OLD.po_number;",
+            "INSERT INTO po_ledger(po_number, total_amount, invoiced_to_date, invoice_count) "
+            "SELECT NEW.po_number, NEW.total_amount, COALESCE(SUM(invoice_amount), 0), COUNT(*) "
+            "FROM invoices WHERE po_number = NEW.po_number AND status = 'Matched';",
+        ], when="OLD.po_number IS NOT NEW.po_number"),
+        trigger("trg_ledger_pos_del", "DELETE", "purchase_orders",
+                ["DELETE FROM po_ledger WHERE po_number = OLD.po_number;"]),
+
+        trigger("trg_ledger_invoices_ins", "INSERT", "invoices", [_book("NEW", "+")], when=booked_new),
+        trigger("trg_ledger_invoices_upd", "UPDATE OF po_number, invoice_amount, status", "invoices", [
+            f"{_book('OLD', '-')[:-1]} AND {booked_old};",
+            f"{_book('NEW', '+')[:-1]} AND {booked_new};",
+        ]),
+        trigger("trg_ledger_invoices_del", "DELETE", "invoices", [_book("OLD", "-")], when=booked_old),
+    ]
+
+
+def install(conn):
+    """Mark repeated invoices, add the unique index, ledger table and triggers; backfill the ledger if new."""
+    existed = conn.execute(text("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='po_ledger'")).scalar()
+    if not existed:
+        conn.execute(text(MARK_DUPLICATES_SQL))
+    for stmt in split_statements(LEDGER_DDL + UNIQUE_INVOICE_DDL) + trigger_sql():
+        conn.execute(text(stmt))
+    if not existed:
+        rebuild(conn)
+
+
+def rebuild(conn):
+    """Recompute ``po_ledger`` from the POs and their Matched invoices."""
+    conn.execute(text("DELETE FROM po_ledger"))
+    conn.execute(text(f"INSERT INTO po_ledger(po_number, total_amount, invoiced_to_date, invoice_count) {EXPECTED_SQL}"))
+
+
+def verify(conn, tolerance=0.005):
+    """Compare the ledger with a from-scratch aggregate; return a list of mismatches."""
+    expected = {r[0]: (r[1], r[2], r[3]) for r in conn.execute(text(EXPECTED_SQL))}
+    actual = {r[0]: (r[1], r[2], r[3]) for r in conn.execute(text(
+        "SELECT po_number, total_amount, invoiced_to_date, invoice_count FROM po_ledger"
+    ))}
+    problems = []
+    for po in sorted(expected.keys() | actual.keys()):
+        exp, act = expected.get(po), actual.get(po)
+        if exp is None or act is None or exp[2] != act[2] or any(abs(e - a) > tolerance for e, a in zip(exp[:2], act[:2])):
+            problems.append(f"po_ledger[{po}]: expected {exp}, found {act}")
+    return problems
+
+
+def balance(conn, po_number):
+    """``{total_amount, invoiced_to_date, remaining, invoice_count}`` for a PO, or None if unknown."""
+    row = conn.execute(text(BALANCE_SQL), {"p": po_number}).mappings().first()
+    return dict(row) if row else None
+
+
+def booked_invoices(conn, invoice_numbers):
+    """Non-duplicate invoices with any of ``invoice_numbers`` as a DataFrame (for duplicate checks)."""
+    numbers = sorted(set(invoice_numbers))
+    rows = [row for start in range(0, len(numbers), LOOKUP_BATCH)
+            for row in conn.execute(BOOKED_NUMBERS, {"numbers": numbers[start:start + LOOKUP_BATCH]})]
+    return pd.DataFrame(rows, columns=["invoice_number", "booked_vendor_name", "booked_invoice_id", "booked_po_number"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild, verify or query the per-PO invoice ledger.")
+    parser.add_argument("command", choices=["rebuild", "verify", "balance"])
+    parser.add_argument("po_number", nargs="?")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db, future=True)
+    with engine.begin() as conn:
+        install(conn)
+        if args.command == "balance":
+            found = balance(conn, args.po_number)
+            print(found if found else f"Unknown PO: {args.po_number}")
+            return 0 if found else 1
+        drift = verify(conn)
+        for line in drift[:20]:
+            print(line)
+        if args.command == "verify":
+            print("Ledger matches the invoices." if not drift else f"{len(drift)} ledger mismatches; run rebuild.")
+            return 1 if drift else 0
+        rebuild(conn)
+        print(f"Rebuilt ledger ({len(drift)} mismatches corrected).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Denormalized Request → PO → Invoice lineage.
+
+``lineage`` holds one row per (request, invoice) pair, which is exactly what
+the traceability LEFT JOIN produces: a request without a PO, or a PO without
+invoices, has one row with ``invoice_id = 0``. Triggers on ``requests``,
+``purchase_orders`` and ``invoices`` keep it current: status and amount
+changes update rows in place, a new invoice replaces the placeholder row of its
+request, and anything that re-keys the join recomputes the affected request's
+rows. Every trigger touches only the rows of one request, reached through an
+index, so writes stay O(log n).
+
+``lookup`` returns the full lineage of the requests matching a request ID,
+PO number or invoice number through the table's indexes, so audit drill-downs
+do not depend on history size. ``rebuild`` backfills the table from scratch:
+
+    python -m buyit.lineage rebuild
+    python -m buyit.lineage lookup --po PO-000001
+"""
+import argparse
+import sys
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from buyit.sqlutil import split_statements, trigger
+
+LINEAGE_TABLES = ["lineage"]
+
+SOURCE_TABLES = ["requests", "purchase_orders", "invoices"]
+
+LINEAGE_DDL = """
+CREATE TABLE IF NOT EXISTS lineage (
+  request_id INTEGER NOT NULL,
+  invoice_id INTEGER NOT NULL DEFAULT 0,
+  item_desc TEXT,
+  request_status TEXT,
+  po_number TEXT,
+  po_status TEXT,
+  total_amount REAL,
+  invoice_number TEXT,
+  invoice_status TEXT,
+  exception_reason TEXT,
+  PRIMARY KEY (request_id DESC, invoice_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_lineage_po_number ON lineage(po_number);
+CREATE INDEX IF NOT EXISTS idx_lineage_invoice_number ON lineage(invoice_number);
+"""
+
+COLUMNS = ("request_id, invoice_id, item_desc, request_status, po_number, po_status, total_amount, "
+           "invoice_number, invoice_status, exception_reason")
+
+EXPECTED_SQL = """
+SELECT r.request_id, COALESCE(inv.invoice_id, 0), r.item_desc, r.status,
+    po.po_number, po.status, po.total_amount,
+    inv.invoice_number, inv.status, inv.exception_reason
+FROM requests r
+LEFT JOIN purchase_orders po ON po.request_id = r.request_id
+LEFT JOIN invoices inv ON inv.po_number = po.po_number
+"""
+
+TRACEABILITY_SQL = """
+SELECT request_id, item_desc, request_status, po_number, po_status, total_amount,
+    invoice_number, invoice_status, exception_reason
+FROM lineage
+ORDER BY request_id DESC, invoice_id
+LIMIT 50
+"""
+
+# Every request reachable from any of the three keys; a NULL key matches nothing.
+LOOKUP_SQL = """
+SELECT request_id, item_desc, request_status, po_number, po_status, total_amount,
+    invoice_number, invoice_status, exception_reason
+FROM lineage
+WHERE request_id IN (
+    SELECT request_id FROM lineage WHERE request_id = :request_id
+    UNION SELECT request_id FROM lineage WHERE po_number = :po_number
+    UNION SELECT request_id FROM lineage WHERE invoice_number = :invoice_number
+)
+ORDER BY request_id DESC, invoice_id
+"""
+
+
+def _po_request(row):
+    return f"(SELECT request_id FROM purchase_orders WHERE po_number = {row}.po_number)"
+
+
+def _refresh(request_id):
+    """Recompute every lineage row of one request."""
+    return [
+        f"DELETE FROM lineage WHERE request_id = {request_id};",
+        f"INSERT INTO lineage({COLUMNS}) {EXPECTED_SQL.strip()} WHERE r.request_id = {request_id};",
+    ]
+
+
+def trigger_sql():
+    """CREATE TRIGGER statements that keep ``lineage`` current."""
+    return [
+        trigger("trg_lineage_requests_ins", "INSERT", "requests", _refresh("NEW.request_id")),
+        trigger("trg_lineage_requests_upd", "UPDATE OF item_desc, status", "requests", [
+            "UPDATE lineage SET item_desc = NEW.item_desc, request_status = NEW.status "
+            "WHERE request_id = NEW.request_id;",
+        ]),
+        trigger("trg_lineage_requests_rekey", "UPDATE OF request_id", "requests",
+                _refresh("OLD.request_id") + _refresh("NEW.request_id"),
+                when="OLD.request_id IS NOT NEW.request_id"),
+        trigger("trg_lineage_requests_del", "DELETE", "requests",
+                ["DELETE FROM lineage WHERE request_id = OLD.request_id;"]),
+
+        trigger("trg_lineage_pos_ins", "INSERT", "purchase_orders", _refresh("NEW.request_id")),
+        trigger("trg_lineage_pos_upd", "UPDATE OF status, total_amount", "purchase_orders", [
+            "UPDATE lineage SET po_status = NEW.status, total_amount = NEW.total_amount "
+            "WHERE request_id = NEW.request_id;",
+        ]),
+        trigger("trg_lineage_pos_rekey", "UPDATE OF po_number, request_id", "purchase_orders",
+                _refresh("OLD.request_id") + _refresh("NEW.request_id"),
+                when="OLD.po_number IS NOT NEW.po_number OR OLD.request_id IS NOT NEW.request_id"),
+        trigger("trg_lineage_pos_del", "DELETE", "purchase_orders", _refresh("OLD.request_id")),
+
+        trigger("trg_lineage_invoices_ins", "INSERT", "invoices", [
+            f"DELETE FROM lineage WHERE request_id = {_po_request('NEW')} AND invoice_id = 0;",
+            f"INSERT INTO lineage({COLUMNS}) "
+            "SELECT po.request_id, NEW.invoice_id, r.item_desc, r.status, po.po_number, po.status, po.total_amount, "
+            "NEW.invoice_number, NEW.status, NEW.exception_reason "
+            "FROM purchase_orders po JOIN requests r ON r.request_id = po.request_id "
+            "WHERE po.po_number = NEW.po_number;",
+        ]),
+        trigger("trg_lineage_invoices_upd", "UPDATE OF invoice_number, status, exception_reason", "invoices", [
+            "UPDATE lineage SET invoice_number = NEW.invoice_number, invoice_status = NEW.status, "
+            "exception_reason = NEW.exception_reason "
+            f"WHERE request_id = {_po_request('NEW')} AND invoice_id = NEW.invoice_id;",
+        ]),
+        trigger("trg_lineage_invoices_rekey", "UPDATE OF po_number, invoice_id", "invoices",
+                _refresh(_po_request("OLD")) + _refresh(_po_request("NEW")),
+                when="OLD.po_number IS NOT NEW.po_number OR OLD.invoice_id IS NOT NEW.invoice_id"),
+        trigger("trg_lineage_invoices_del", "DELETE", "invoices", _refresh(_po_request("OLD"))),
+    ]
+
+
+def install(conn):
+    """Create the lineage table, indexes and triggers; backfill the table if it is new."""
+    existed = conn.execute(text("SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='lineage'")).scalar()
+    for stmt in split_statements(LINEAGE_DDL) + trigger_sql():
+        conn.execute(text(stmt))
+    if not existed:
+        rebuild(conn)
+
+
+def rebuild(conn):
+    """Recompute ``lineage`` from the fact tables."""
+    conn.execute(text("DELETE FROM lineage"))
+    conn.execute(text(f"INSERT INTO lineage({COLUMNS}) {EXPECTED_SQL}"))
+
+
+def verify(conn):
+    """Rows missing from or unexpected in ``lineage``, as a list of messages."""
+    missing = conn.execute(text(f"SELECT COUNT(*) FROM ({EXPECTED_SQL} EXCEPT SELECT {COLUMNS} FROM lineage)")).scalar()
+    extra = conn.execute(text(f"SELECT COUNT(*) FROM (SELECT {COLUMNS} FROM lineage EXCEPT {EXPECTED_SQL})")).scalar()
+    problems = []
+    if missing:
+        problems.append(f"lineage: {missing} expected rows missing or stale")
+    if extra:
+        problems.append(f"lineage: {extra} rows that the fact tables do not produce")
+    return problems
+
+
+def lookup_params(request_id=None, po_number=None, invoice_number=None):
+    return {"request_id": request_id, "po_number": po_number, "invoice_number": invoice_number}
+
+
+def lookup(conn, request_id=None, po_number=None, invoice_number=None):
+    """Full lineage (DataFrame) of every request matching any of the given keys."""
+    return pd.read_sql(text(LOOKUP_SQL), conn, params=lookup_params(request_id, po_number, invoice_number))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild, verify or query the traceability lineage table.")
+    parser.add_argument("command", choices=["rebuild", "verify", "lookup"])
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    parser.add_argument("--request-id", type=int)
+    parser.add_argument("--po")
+    parser.add_argument("--invoice")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db, future=True)
+    with engine.begin() as conn:
+        install(conn)
+        if args.command == "lookup":
+            print(lookup(conn, args.request_id, args.po, args.invoice).to_string(index=False))
+            return 0
+        drift = verify(conn)
+        for line in drift:
+            print(line)
+        if args.command == "verify":
+            print("Lineage matches the fact tables." if not drift else "Lineage has drifted; run rebuild.")
+            return 1 if drift else 0
+        rebuild(conn)
+        print(f"Rebuilt lineage ({conn.execute(text('SELECT COUNT(*) FROM lineage')).scalar():,} rows).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""Versioned schema migrations.
+
+``schema_version`` records every migration that has been applied. ``migrate``
+applies the pending ones in order, each in the same transaction as its
+version row, so a migration runs exactly once per database and an app rerun
+costs one indexed lookup instead of re-running the DDL. Databases created
+before versioning existed are picked up by migration 1, whose DDL is
+idempotent.
+
+To change the schema, append a new ``(version, name, step)`` entry; never
+edit one that has shipped. ``step`` is a SQL script or a ``fn(conn)``.
+"""
+import argparse
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from buyit import analytics, archive, ledger, lineage, rollups, schema, search, sqlutil, vendors
+
+INDEXES_V3 = """
+CREATE INDEX IF NOT EXISTS idx_invoices_po_number ON invoices(po_number);
+CREATE INDEX IF NOT EXISTS idx_approvals_request_id ON approvals(request_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_orders_vendor_amount ON purchase_orders(vendor_name, total_amount);
+CREATE INDEX IF NOT EXISTS idx_invoices_status_id ON invoices(status, invoice_id DESC);
+CREATE INDEX IF NOT EXISTS idx_requests_status_id ON requests(status, request_id DESC);
+DROP INDEX IF EXISTS idx_requests_status;
+DROP INDEX IF EXISTS idx_invoices_status;
+"""
+
+MIGRATIONS = [
+    (1, "core tables", schema.DDL),
+    (2, "analytics rollups", rollups.install),
+    (3, "indexes for hot joins and paged lists", INDEXES_V3),
+    (4, "traceability lineage", lineage.install),
+    (5, "vendor master aliases", vendors.install),
+    (6, "full-text search index", search.install),
+    (7, "cold archive batch manifest", archive.install),
+    (8, "per-PO invoice ledger and unique invoice numbers", ledger.install),
+    (9, "cycle-time month cache and timestamp indexes", analytics.install),
+    # Spend reads spend_rollup, so nothing reads purchase_orders by (vendor_name, total_amount).
+    (10, "drop unused vendor/amount index", "DROP INDEX IF EXISTS idx_purchase_orders_vendor_amount;"),
+]
+
+VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+  version INTEGER PRIMARY KEY,
+  name TEXT NOT NULL,
+  applied_at TEXT NOT NULL
+)
+"""
+
+
+def current_version(conn):
+    conn.execute(text(VERSION_DDL))
+    return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def _apply(conn, step):
+    if callable(step):
+        step(conn)
+    else:
+        for stmt in sqlutil.split_statements(step):
+            conn.execute(text(stmt))
+
+
+def migrate(conn, target=None):
+    """Apply pending migrations up to ``target`` (default: latest); return the versions applied."""
+    version = current_version(conn)
+    applied = []
+    for number, name, step in MIGRATIONS:
+        if number <= version or (target is not None and number > target):
+            continue
+        _apply(conn, step)
+        conn.execute(
+            text("INSERT OR IGNORE INTO schema_version(version, name, applied_at) VALUES (:v, :n, :at)"),
+            {"v": number, "n": name, "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")},
+        )
+        applied.append(number)
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations.")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    parser.add_argument("--target", type=int)
+    args = parser.parse_args(argv)
+
+    with create_engine(args.db, future=True).begin() as conn:
+        applied = migrate(conn, args.target)
+        print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
+        print(f"Schema version: {current_version(conn)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Query-plan guard for the page queries.
+
+Runs ``EXPLAIN QUERY PLAN`` for every query in ``queries.PAGE_QUERIES`` on a
+freshly migrated database and checks it against ``PLAN_RULES``: steps that
+must appear (the index a join or lookup relies on) and steps that must not
+(full-table automatic indexes, sorts the index order should have avoided).
+Exits non-zero on any violation, so CI catches a dropped or unused index:
+
+    python -m buyit.plancheck
+"""
+import argparse
+import sys
+import tempfile
+
+from sqlalchemy import create_engine, text
+
+from buyit import migrations, queries
+
+ALWAYS_FORBID = ["AUTOMATIC"]
+
+# (page, query name) -> {"require": [...], "forbid": [...]} plan fragments
+PLAN_RULES = {
+    ("1) Create Request", "recent_requests"): {"forbid": ["TEMP B-TREE"]},
+    ("2) Approvals", "pending_requests"): {
+        "require": ["MERGE (UNION ALL)", "USING INDEX idx_requests_status_id (status=? AND request_id<?)"],
+        "forbid": ["TEMP B-TREE"],
+    },
+    ("2) Approvals", "request_by_id"): {"require": ["INTEGER PRIMARY KEY (rowid=?)"]},
+    ("2) Approvals", "pending_request_ids"): {
+        "require": ["USING INDEX idx_requests_status_id (status=? AND request_id<?)"], "forbid": ["SCAN requests"],
+    },
+    ("3) Purchase Orders", "approved_requests"): {
+        "require": ["USING INDEX idx_requests_status_id (status=? AND request_id<?)"], "forbid": ["TEMP B-TREE"],
+    },
+    ("3) Purchase Orders", "request_by_id"): {"require": ["INTEGER PRIMARY KEY (rowid=?)"]},
+    ("3) Purchase Orders", "po_by_request"): {"require": ["(request_id=?)"]},
+    ("3) Purchase Orders", "recent_pos"): {"forbid": ["TEMP B-TREE"]},
+    ("4) Invoice Processing", "po_numbers"): {"forbid": ["TEMP B-TREE"]},
+    ("4) Invoice Processing", "po_by_number"): {"require": ["(po_number=?)"]},
+    ("4) Invoice Processing", "po_balance"): {"require": ["SEARCH po_ledger USING PRIMARY KEY (po_number=?)"]},
+    ("4) Invoice Processing", "recent_invoices"): {"forbid": ["TEMP B-TREE"]},
+    ("5) Analytics & Audit", "kpis"): {"require": ["kpi_counts"]},
+    ("5) Analytics & Audit", "spend_by_vendor"): {"require": ["spend_rollup"], "forbid": ["purchase_orders"]},
+    ("5) Analytics & Audit", "audit_trail"): {
+        "require": ["SEARCH r USING INTEGER PRIMARY KEY"], "forbid": ["TEMP B-TREE"],
+    },
+    ("5) Analytics & Audit", "traceability"): {"require": ["SCAN lineage"], "forbid": ["TEMP B-TREE"]},
+    ("5) Analytics & Audit", "lineage_lookup"): {
+        "require": ["USING PRIMARY KEY (request_id=?)", "idx_lineage_po_number (po_number=?)",
+                    "idx_lineage_invoice_number (invoice_number=?)"],
+        "forbid": ["SCAN lineage"],
+    },
+    ("5) Analytics & Audit", "spend_window"): {"require": ["spend_rollup"], "forbid": ["purchase_orders"]},
+    ("5) Analytics & Audit", "cycle_histogram"): {
+        "require": ["idx_approvals_decided_at (decided_at>? AND decided_at<?)",
+                    "idx_purchase_orders_created_at (created_at>? AND created_at<?)",
+                    "idx_invoices_created_at (created_at>? AND created_at<?)", "idx_invoices_po_number (po_number=?)"],
+        "forbid": ["SCAN a", "SCAN po", "SCAN i"],
+    },
+    ("5) Analytics & Audit", "cycle_cached"): {"require": ["SEARCH cycle_histogram USING PRIMARY KEY (month>? AND month<?)"]},
+    ("6) Search", "search"): {
+        "require": ["VIRTUAL TABLE INDEX", "SEARCH r USING INTEGER PRIMARY KEY", "SEARCH i USING INTEGER PRIMARY KEY",
+                    "(po_number=?)"],
+    },
+    ("6) Search", "search_recent"): {
+        "require": ["VIRTUAL TABLE INDEX", "SEARCH r USING INTEGER PRIMARY KEY", "SEARCH i USING INTEGER PRIMARY KEY",
+                    "(po_number=?)"],
+    },
+}
+
+
+def explain(conn, sql, params=None):
+    """The ``detail`` column of ``EXPLAIN QUERY PLAN`` for ``sql``."""
+    return [row[3] for row in conn.execute(text("EXPLAIN QUERY PLAN " + sql), params or {})]
+
+
+def check_plans(conn, page_queries=None, rules=None):
+    """Return ``[(page, name, problem, plan), ...]`` for every rule a plan breaks."""
+    page_queries = page_queries or queries.PAGE_QUERIES
+    rules = PLAN_RULES if rules is None else rules
+    failures = []
+    for page, named in page_queries.items():
+        for name, (sql, params) in named.items():
+            plan = explain(conn, sql, params)
+            joined = "\n".join(plan)
+            rule = rules.get((page, name))
+            if rule is None:
+                failures.append((page, name, "no plan rule for this query", plan))
+                continue
+            for fragment in rule.get("require", []):
+                if fragment not in joined:
+                    failures.append((page, name, f"missing '{fragment}'", plan))
+            for fragment in ALWAYS_FORBID + rule.get("forbid", []):
+                if fragment in joined:
+                    failures.append((page, name, f"unexpected '{fragment}'", plan))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check page query plans against the expected indexes.")
+    parser.add_argument("--db", help="database to check (default: a freshly migrated temp database)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(args.db or f"sqlite:///{tmp}/plancheck.db", future=True)
+        with engine.begin() as conn:
+            migrations.migrate(conn)
+            failures = check_plans(conn)
+        engine.dispose()
+
+    for page, name, problem, plan in failures:
+        print(f"FAIL {page} / {name}: {problem}")
+        for step in plan:
+            print(f"       {step}")
+    total = sum(len(named) for named in queries.PAGE_QUERIES.values())
+    print(f"{total - len({(p, n) for p, n, _, _ in failures})}/{total} page query plans OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""Query and render instrumentation.
+
+When enabled, ``Profiler.attach`` hooks the engine's cursor events so every
+statement (including writes issued by the workflow helpers and migrations) is
+timed and grouped by SQL fingerprint: literals become ``?`` and whitespace is
+collapsed, so the same query with different values aggregates into one line.
+``df`` (and the Page 4 invoice submit, as ``write_tx``) record their own calls
+with the wall time and row count the page actually paid, and ``timer`` splits a page run into named sections.
+
+Anything slower than the thresholds is written as one JSON object per line to
+a rotating log file that a log shipper can tail. Configuration comes from the
+environment:
+
+    BUYIT_PROFILE=1                  enable instrumentation (default off)
+    BUYIT_SLOW_QUERY_MS=200          slow statement / call threshold
+    BUYIT_SLOW_SECTION_MS=1000       slow page-section threshold
+    BUYIT_SLOW_LOG=logs/slow_queries.log
+    BUYIT_SLOW_LOG_BYTES=10485760    rotate after this many bytes
+    BUYIT_SLOW_LOG_BACKUPS=5         rotated files to keep
+
+Disabled, no listeners are attached and ``timer`` returns a shared no-op, so
+the cost is an attribute check per ``df`` call.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler
+
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_RE = re.compile(r"(?<![\w:])-?\d+(?:\.\d+)?\b")
+IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+WHITESPACE_RE = re.compile(r"\s+")
+
+SLOW_LOGGER = "buyit.slow"
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """``(id, normalized sql)`` with literals replaced so query shapes group together."""
+    normalized = STRING_LITERAL_RE.sub("?", sql)
+    normalized = NUMBER_LITERAL_RE.sub("?", normalized)
+    normalized = IN_LIST_RE.sub("(?, ...)", normalized)
+    normalized = WHITESPACE_RE.sub(" ", normalized).strip()
+    return hashlib.md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+
+def slow_logger(path, max_bytes=10 * 1024 * 1024, backups=5):
+    """The ``buyit.slow`` logger writing to a rotating file at ``path`` (configured once per path)."""
+    logger = logging.getLogger(SLOW_LOGGER)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    target = os.path.abspath(path)
+    if not any(getattr(h, "baseFilename", None) == target for h in logger.handlers):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        handler = RotatingFileHandler(target, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    return logger
+
+
+class _NullTimer:
+    sections = ()
+
+    def lap(self, name):
+        pass
+
+    def done(self):
+        return 0.0
+
+
+NULL_TIMER = _NullTimer()
+
+
+class RenderTimer:
+    """Splits one page run into consecutive named sections."""
+
+    def __init__(self, profiler, page):
+        self.profiler = profiler
+        self.page = page
+        self.started = self._last = time.perf_counter()
+        self.sections = []
+
+    def lap(self, name):
+        """Close the section that ran since the previous lap (or the start) as ``name``."""
+        now = time.perf_counter()
+        self.sections.append((name, now - self._last))
+        self.profiler.record_section(f"{self.page} / {name}", now - self._last)
+        self._last = now
+
+    def done(self):
+        """Record the total render time for the page and return it in seconds."""
+        total = time.perf_counter() - self.started
+        self.sections.append(("total", total))
+        self.profiler.record_section(f"{self.page} / total", total)
+        return total
+
+
+class Profiler:
+    """Thread-safe per-fingerprint query stats, section timings and a slow log."""
+
+    def __init__(self, enabled=False, slow_query_ms=200.0, slow_section_ms=1000.0, log_path=None,
+                 max_bytes=10 * 1024 * 1024, backups=5):
+        self.enabled = enabled
+        self.slow_query_s = slow_query_ms / 1000.0
+        self.slow_section_s = slow_section_ms / 1000.0
+        self.log = slow_logger(log_path, max_bytes, backups) if enabled and log_path else None
+        self._queries = {}   # (kind, fingerprint id) -> stats dict
+        self._sections = {}  # name -> stats dict
+        self._lock = threading.Lock()
+        self.slow = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            enabled=os.environ.get("BUYIT_PROFILE", "").strip().lower() in ("1", "true", "yes", "on"),
+            slow_query_ms=_env_float("BUYIT_SLOW_QUERY_MS", 200),
+            slow_section_ms=_env_float("BUYIT_SLOW_SECTION_MS", 1000),
+            log_path=os.environ.get("BUYIT_SLOW_LOG", os.path.join("logs", "slow_queries.log")),
+            max_bytes=int(_env_float("BUYIT_SLOW_LOG_BYTES", 10 * 1024 * 1024)),
+            backups=int(_env_float("BUYIT_SLOW_LOG_BACKUPS", 5)),
+        )
+
+    def attach(self, engine):
+        """Time every cursor execution on ``engine`` (no-op when disabled)."""
+        if not self.enabled:
+            return engine
+        from sqlalchemy import event
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def _before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("buyit_query_start", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _after(conn, cursor, statement, parameters, context, executemany):
+            seconds = time.perf_counter() - conn.info["buyit_query_start"].pop()
+            rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+            self.record_query("sql", statement, seconds, rows)
+
+        return engine
+
+    def record_query(self, kind, sql, seconds, rows=None):
+        fp, normalized = fingerprint(sql)
+        with self._lock:
+            stats = self._queries.get((kind, fp))
+            if stats is None:
+                stats = self._queries[(kind, fp)] = {
+                    "kind": kind, "fingerprint": fp, "sql": normalized,
+                    "calls": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0,
+                }
+            stats["calls"] += 1
+            stats["total_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds)
+            stats["rows"] += rows or 0
+        if seconds >= self.slow_query_s:
+            self._log_slow({"kind": kind, "ms": round(seconds * 1000, 2), "rows": rows,
+                            "fingerprint": fp, "sql": normalized[:2000]})
+
+    def record_section(self, name, seconds):
+        with self._lock:
+            stats = self._sections.setdefault(name, {"section": name, "runs": 0, "total_s": 0.0,
+                                                     "max_s": 0.0, "last_s": 0.0})
+            stats["runs"] += 1
+            stats["total_s"] += seconds
+            stats["max_s"] = max(stats["max_s"], seconds)
+            stats["last_s"] = seconds
+        if seconds >= self.slow_section_s:
+            self._log_slow({"kind": "section", "ms": round(seconds * 1000, 2), "section": name})
+
+    def _log_slow(self, record):
+        with self._lock:
+            self.slow += 1
+        if self.log is not None:
+            self.log.info(json.dumps({"ts": datetime.now().isoformat(timespec="milliseconds"), **record}))
+
+    def timer(self, page):
+        return RenderTimer(self, page) if self.enabled else NULL_TIMER
+
+    def top_queries(self, n=10, by="total_s"):
+        with self._lock:
+            rows = [dict(s) for s in self._queries.values()]
+        rows.sort(key=lambda s: s[by], reverse=True)
+        for s in rows:
+            s["avg_ms"] = s["total_s"] * 1000 / s["calls"]
+        return rows[:n]
+
+    def sections(self):
+        with self._lock:
+            return sorted((dict(s) for s in self._sections.values()), key=lambda s: s["section"])
+
+    def reset(self):
+        with self._lock:
+            self._queries.clear()
+            self._sections.clear()
+            self.slow = 0
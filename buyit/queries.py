@@ -0,0 +1,139 @@
+"""Read queries issued by each page of the app.
+
+Keeping them here, rather than inline in ``app.py``, lets the query-plan
+check and benchmarks run exactly the SQL the pages run.
+"""
+from buyit import analytics, ledger, lineage, rollups, search, workflow
+
+RECENT_REQUESTS = """
+SELECT request_id, created_at, requester_name, department, item_desc, quantity, est_cost, vendor_name, status
+FROM requests
+ORDER BY request_id DESC
+LIMIT 20
+"""
+
+# Keyset-paginated request grids: newest first, ``request_id < :before``,
+# ``:limit`` rows. Filters are optional (NULL disables one) so every page and
+# filter combination runs the same statement and plan. Each status is its own
+# index range; UNION ALL under the ORDER BY lets SQLite merge the ranges in
+# order and stop after LIMIT rows instead of sorting the whole backlog.
+REQUEST_PAGE_COLUMNS = "request_id, created_at, requester_name, department, item_desc, quantity, est_cost, vendor_name, status"
+
+REQUEST_FILTERS = """
+  AND request_id < :before
+  AND (:department IS NULL OR department = :department COLLATE NOCASE)
+  AND (:requester IS NULL OR requester_name LIKE '%' || :requester || '%')
+  AND (:min_cost IS NULL OR est_cost >= :min_cost)
+  AND (:max_cost IS NULL OR est_cost <= :max_cost)
+"""
+
+FIRST_PAGE = 2 ** 63 - 1
+
+
+def request_page_sql(statuses):
+    legs = [f"SELECT {REQUEST_PAGE_COLUMNS} FROM requests WHERE status='{status}'{REQUEST_FILTERS}"
+            for status in statuses]
+    return "UNION ALL\n".join(legs) + "ORDER BY request_id DESC\nLIMIT :limit\n"
+
+
+def request_ids_sql(statuses):
+    """Every request ID in ``statuses`` the grid filters match, across all pages (for "apply to all")."""
+    return "UNION ALL\n".join(f"SELECT request_id FROM requests WHERE status='{status}'{REQUEST_FILTERS}"
+                               for status in statuses)
+
+
+PENDING_REQUESTS_PAGE = request_page_sql(workflow.PENDING_STATUSES)
+
+PENDING_REQUEST_IDS = request_ids_sql(workflow.PENDING_STATUSES)
+
+REQUEST_BY_ID = "SELECT * FROM requests WHERE request_id=:id"
+
+APPROVED_REQUESTS_PAGE = request_page_sql(["Approved"])
+
+PO_BY_REQUEST = "SELECT * FROM purchase_orders WHERE request_id=:id"
+
+RECENT_POS = """
+SELECT po_number, request_id, vendor_name, total_amount, status, created_at, created_by
+FROM purchase_orders
+ORDER BY po_id DESC
+LIMIT 25
+"""
+
+PO_NUMBERS = "SELECT po_number FROM purchase_orders ORDER BY po_id DESC"
+
+PO_BY_NUMBER = "SELECT * FROM purchase_orders WHERE po_number=:p"
+
+PO_BALANCE = ledger.BALANCE_SQL
+
+RECENT_INVOICES = """
+SELECT invoice_number, po_number, vendor_name, invoice_amount, invoice_date, status, exception_reason
+FROM invoices
+ORDER BY invoice_id DESC
+LIMIT 25
+"""
+
+AUDIT_TRAIL = """
+SELECT a.approval_id, a.request_id, r.requester_name, a.approver_name, a.decision, a.comments, a.decided_at
+FROM approvals a
+JOIN requests r ON r.request_id = a.request_id
+ORDER BY a.approval_id DESC
+LIMIT 50
+"""
+
+TRACEABILITY = lineage.TRACEABILITY_SQL
+
+LINEAGE_LOOKUP = lineage.LOOKUP_SQL
+
+SEARCH = search.SEARCH_SQL
+
+SEARCH_RECENT = search.SEARCH_RECENT_SQL
+
+
+def page_params(before=None, limit=25, department=None, requester=None, min_cost=None, max_cost=None):
+    """Bind parameters for the ``*_REQUESTS_PAGE`` queries; empty filters are disabled."""
+    return {
+        "before": FIRST_PAGE if before is None else int(before),
+        "limit": int(limit),
+        "department": (department or "").strip() or None,
+        "requester": (requester or "").strip() or None,
+        "min_cost": min_cost or None,
+        "max_cost": max_cost or None,
+    }
+
+# page -> {query name: (sql, sample params)}
+PAGE_QUERIES = {
+    "1) Create Request": {
+        "recent_requests": (RECENT_REQUESTS, {}),
+    },
+    "2) Approvals": {
+        "pending_requests": (PENDING_REQUESTS_PAGE, page_params()),
+        "pending_request_ids": (PENDING_REQUEST_IDS, page_params()),
+        "request_by_id": (REQUEST_BY_ID, {"id": 1}),
+    },
+    "3) Purchase Orders": {
+        "approved_requests": (APPROVED_REQUESTS_PAGE, page_params()),
+        "request_by_id": (REQUEST_BY_ID, {"id": 1}),
+        "po_by_request": (PO_BY_REQUEST, {"id": 1}),
+        "recent_pos": (RECENT_POS, {}),
+    },
+    "4) Invoice Processing": {
+        "po_numbers": (PO_NUMBERS, {}),
+        "po_by_number": (PO_BY_NUMBER, {"p": "PO-000001"}),
+        "po_balance": (PO_BALANCE, {"p": "PO-000001"}),
+        "recent_invoices": (RECENT_INVOICES, {}),
+    },
+    "5) Analytics & Audit": {
+        "kpis": (rollups.KPI_SQL, {}),
+        "spend_by_vendor": (rollups.SPEND_BY_VENDOR_SQL, {}),
+        "audit_trail": (AUDIT_TRAIL, {}),
+        "traceability": (TRACEABILITY, {}),
+        "lineage_lookup": (LINEAGE_LOOKUP, lineage.lookup_params(1, "PO-000001", "INV-1")),
+        "spend_window": (analytics.SPEND_WINDOW_SQL, {"first": "2025-01", "last": "2025-12"}),
+        "cycle_histogram": (analytics.CYCLE_HISTOGRAM_SQL, analytics.month_params("2025-06", "2025-06")),
+        "cycle_cached": (analytics.CACHED_HISTOGRAM_SQL, {"first": "2025-01", "last": "2025-12"}),
+    },
+    "6) Search": {
+        "search": (SEARCH, search.search_params("monitor")),
+        "search_recent": (SEARCH_RECENT, search.search_params("monitor")),
+    },
+}
@@ -0,0 +1,105 @@
+"""Table-aware result cache for read queries.
+
+Results are keyed by SQL text and parameters and evicted by LRU order, TTL and
+a total memory bound. Each entry remembers which tables its query reads, so a
+write only drops the entries that depend on the written table (plus any
+tables that triggers derive from it, registered with ``add_dependents``).
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+READ_TABLES_RE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_][A-Za-z0-9_]*)", re.I)
+
+
+def read_tables(sql):
+    return {t.lower() for t in READ_TABLES_RE.findall(sql)}
+
+
+def _frame_bytes(frame):
+    try:
+        return int(frame.memory_usage(index=True, deep=True).sum())
+    except AttributeError:
+        return 0
+
+
+class QueryCache:
+    """Thread-safe LRU/TTL cache of query results with per-table invalidation."""
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (frame, nbytes, expires_at, tables)
+        self._dependents = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def add_dependents(self, table, derived):
+        """Declare that writes to ``table`` also change ``derived`` tables (e.g. via triggers)."""
+        self._dependents.setdefault(table.lower(), set()).update(t.lower() for t in derived)
+
+    @staticmethod
+    def key(sql, params=None):
+        items = ((k, tuple(v) if isinstance(v, list) else v) for k, v in (params or {}).items())
+        return " ".join(sql.split()), tuple(sorted(items))
+
+    def get_or_load(self, sql, params, load):
+        """Return a copy of the cached result for ``sql``/``params``, calling ``load()`` on a miss."""
+        key = self.key(sql, params)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+            generation = self._generation
+
+        frame = load()
+        nbytes = _frame_bytes(frame)
+        if nbytes <= self.max_bytes:
+            with self._lock:
+                if generation != self._generation:
+                    # A write landed while loading; the result may already be stale.
+                    return frame
+                if key in self._entries:
+                    self._drop(key)
+                self._entries[key] = (frame.copy(), nbytes, now + self.ttl, read_tables(sql))
+                self.bytes += nbytes
+                while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+                    self._drop(next(iter(self._entries)))
+                    self.evictions += 1
+        return frame
+
+    def invalidate_tables(self, tables):
+        """Drop every entry that reads one of ``tables`` or a table derived from them."""
+        affected = {t.lower() for t in tables}
+        for t in list(affected):
+            affected |= self._dependents.get(t, set())
+        with self._lock:
+            self._generation += 1
+            for key in [k for k, e in self._entries.items() if e[3] & affected]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self.bytes = 0
+
+    def _drop(self, key):
+        self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self.bytes}
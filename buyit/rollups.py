@@ -0,0 +1,203 @@
+"""Incrementally maintained KPI and spend rollups for the Analytics page.
+
+``kpi_counts`` holds row counts per status/decision and ``spend_rollup`` holds
+PO spend per vendor/department/month. SQLite triggers keep both current on
+every INSERT/UPDATE/DELETE of the fact tables, whichever code path writes
+them, so the KPI strip and spend chart read O(#groups) rows instead of
+scanning ``requests``/``approvals``/``purchase_orders``/``invoices``.
+"""
+import argparse
+import sys
+
+from sqlalchemy import create_engine, text
+
+from buyit.sqlutil import split_statements, trigger
+
+ROLLUP_TABLES = ["kpi_counts", "spend_rollup"]
+
+ROLLUP_DDL = """
+CREATE TABLE IF NOT EXISTS kpi_counts (
+  metric TEXT NOT NULL,
+  bucket TEXT NOT NULL,
+  n INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (metric, bucket)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS spend_rollup (
+  vendor_name TEXT NOT NULL,
+  department TEXT NOT NULL,
+  month TEXT NOT NULL,
+  po_count INTEGER NOT NULL DEFAULT 0,
+  total_spend REAL NOT NULL DEFAULT 0,
+  PRIMARY KEY (vendor_name, department, month)
+) WITHOUT ROWID;
+"""
+
+# metric name -> (fact table, grouped column)
+COUNT_METRICS = {
+    "requests.status": ("requests", "status"),
+    "approvals.decision": ("approvals", "decision"),
+    "purchase_orders.status": ("purchase_orders", "status"),
+    "invoices.status": ("invoices", "status"),
+}
+
+SOURCE_TABLES = sorted({table for table, _ in COUNT_METRICS.values()})
+
+KPI_SQL = "SELECT metric, bucket, n FROM kpi_counts WHERE n <> 0"
+
+SPEND_BY_VENDOR_SQL = """
+SELECT vendor_name, SUM(total_spend) AS total_spend
+FROM spend_rollup
+GROUP BY vendor_name
+HAVING SUM(po_count) > 0
+ORDER BY total_spend DESC
+"""
+
+
+def _bump(metric, value, delta):
+    return (f"INSERT INTO kpi_counts(metric, bucket, n) VALUES ('{metric}', {value}, {delta}) "
+            "ON CONFLICT(metric, bucket) DO UPDATE SET n = n + excluded.n;")
+
+
+def _spend(po, department, sign):
+    return (
+        "INSERT INTO spend_rollup(vendor_name, department, month, po_count, total_spend) VALUES ("
+        f"{po}.vendor_name, {department}, substr({po}.created_at, 1, 7), {sign}1, {sign}{po}.total_amount) "
+        "ON CONFLICT(vendor_name, department, month) DO UPDATE SET "
+        "po_count = po_count + excluded.po_count, total_spend = total_spend + excluded.total_spend;"
+    )
+
+
+def _request_department(po):
+    return f"COALESCE((SELECT department FROM requests WHERE request_id = {po}.request_id), '')"
+
+
+def trigger_sql():
+    """CREATE TRIGGER statements that keep the rollups current."""
+    stmts = []
+    for metric, (table, column) in COUNT_METRICS.items():
+        prefix = f"trg_rollup_{table}_{column}"
+        stmts.append(trigger(f"{prefix}_ins", "INSERT", table, [_bump(metric, f"NEW.{column}", 1)]))
+        stmts.append(trigger(f"{prefix}_del", "DELETE", table, [_bump(metric, f"OLD.{column}", -1)]))
+        stmts.append(trigger(
+            f"{prefix}_upd", f"UPDATE OF {column}", table,
+            [_bump(metric, f"OLD.{column}", -1), _bump(metric, f"NEW.{column}", 1)],
+            when=f"OLD.{column} IS NOT NEW.{column}",
+        ))
+
+    stmts.append(trigger("trg_rollup_spend_ins", "INSERT", "purchase_orders",
+                         [_spend("NEW", _request_department("NEW"), "+")]))
+    stmts.append(trigger("trg_rollup_spend_del", "DELETE", "purchase_orders",
+                         [_spend("OLD", _request_department("OLD"), "-")]))
+    stmts.append(trigger(
+        "trg_rollup_spend_upd", "UPDATE OF vendor_name, total_amount, created_at, request_id", "purchase_orders",
+        [_spend("OLD", _request_department("OLD"), "-"), _spend("NEW", _request_department("NEW"), "+")],
+    ))
+    stmts.append(trigger(
+        "trg_rollup_spend_dept", "UPDATE OF department", "requests",
+        [
+            "INSERT INTO spend_rollup(vendor_name, department, month, po_count, total_spend) "
+            "SELECT vendor_name, OLD.department, substr(created_at, 1, 7), -1, -total_amount "
+            "FROM purchase_orders WHERE request_id = NEW.request_id "
+            "ON CONFLICT(vendor_name, department, month) DO UPDATE SET "
+            "po_count = po_count + excluded.po_count, total_spend = total_spend + excluded.total_spend;",
+            "INSERT INTO spend_rollup(vendor_name, department, month, po_count, total_spend) "
+            "SELECT vendor_name, NEW.department, substr(created_at, 1, 7), 1, total_amount "
+            "FROM purchase_orders WHERE request_id = NEW.request_id "
+            "ON CONFLICT(vendor_name, department, month) DO UPDATE SET "
+            "po_count = po_count + excluded.po_count, total_spend = total_spend + excluded.total_spend;",
+        ],
+        when="OLD.department IS NOT NEW.department",
+    ))
+    return stmts
+
+
+EXPECTED_COUNTS_SQL = " UNION ALL ".join(
+    f"SELECT '{metric}' AS metric, {column} AS bucket, COUNT(*) AS n FROM {table} GROUP BY {column}"
+    for metric, (table, column) in COUNT_METRICS.items()
+)
+
+EXPECTED_SPEND_SQL = """
+SELECT po.vendor_name, COALESCE(r.department, '') AS department, substr(po.created_at, 1, 7) AS month,
+       COUNT(*) AS po_count, SUM(po.total_amount) AS total_spend
+FROM purchase_orders po
+LEFT JOIN requests r ON r.request_id = po.request_id
+GROUP BY 1, 2, 3
+"""
+
+
+def install(conn):
+    """Create rollup tables and triggers; backfill them if they are new."""
+    existing = conn.execute(text(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name IN ('kpi_counts', 'spend_rollup')"
+    )).scalar()
+    for stmt in split_statements(ROLLUP_DDL) + trigger_sql():
+        conn.execute(text(stmt))
+    if existing < len(ROLLUP_TABLES):
+        rebuild(conn)
+
+
+def rebuild(conn):
+    """Recompute both rollups from the fact tables."""
+    conn.execute(text("DELETE FROM kpi_counts"))
+    conn.execute(text("DELETE FROM spend_rollup"))
+    conn.execute(text(f"INSERT INTO kpi_counts(metric, bucket, n) {EXPECTED_COUNTS_SQL}"))
+    conn.execute(text(
+        f"INSERT INTO spend_rollup(vendor_name, department, month, po_count, total_spend) {EXPECTED_SPEND_SQL}"
+    ))
+
+
+def verify(conn, tolerance=0.005):
+    """Compare the rollups with a from-scratch aggregate; return a list of mismatches."""
+    problems = []
+    expected = {(m, b): n for m, b, n in conn.execute(text(EXPECTED_COUNTS_SQL))}
+    actual = {(m, b): n for m, b, n in conn.execute(text("SELECT metric, bucket, n FROM kpi_counts WHERE n <> 0"))}
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        if expected.get(key, 0) != actual.get(key, 0):
+            problems.append(f"kpi_counts{key}: expected {expected.get(key, 0)}, found {actual.get(key, 0)}")
+
+    expected = {tuple(r[:3]): (r[3], r[4]) for r in conn.execute(text(EXPECTED_SPEND_SQL))}
+    actual = {tuple(r[:3]): (r[3], r[4]) for r in conn.execute(text(
+        "SELECT vendor_name, department, month, po_count, total_spend FROM spend_rollup WHERE po_count <> 0"
+    ))}
+    for key in sorted(expected.keys() | actual.keys(), key=str):
+        exp, act = expected.get(key, (0, 0.0)), actual.get(key, (0, 0.0))
+        if exp[0] != act[0] or abs(exp[1] - act[1]) > tolerance:
+            problems.append(f"spend_rollup{key}: expected {exp}, found {act}")
+    return problems
+
+
+def kpi_value(kpis, metric, bucket=None):
+    """Read a count from a ``KPI_SQL`` result; without ``bucket``, the metric total."""
+    rows = kpis[kpis["metric"] == metric]
+    if bucket is not None:
+        rows = rows[rows["bucket"] == bucket]
+    return int(rows["n"].sum())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild or verify the Analytics rollup tables.")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.db, future=True)
+    with engine.begin() as conn:
+        install(conn)
+        drift = verify(conn)
+        for line in drift:
+            print(line)
+        if args.command == "verify":
+            print("Rollups match the fact tables." if not drift else f"{len(drift)} rollup mismatches.")
+            return 1 if drift else 0
+        rebuild(conn)
+        remaining = verify(conn)
+        if remaining:
+            print(f"Rebuild left {len(remaining)} mismatches.")
+            return 1
+        print(f"Rebuilt rollups ({len(drift)} mismatches corrected); verified against the fact tables.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
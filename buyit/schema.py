@@ -0,0 +1,65 @@
+"""Core BuyIT Hub tables (schema version 1; later changes live in ``buyit.migrations``)."""
+
+DDL = """
+CREATE TABLE IF NOT EXISTS users (
+  user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  name TEXT NOT NULL,
+  role TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS vendors (
+  vendor_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  vendor_name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS requests (
+  request_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  created_at TEXT NOT NULL,
+  requester_name TEXT NOT NULL,
+  department TEXT NOT NULL,
+  item_desc TEXT NOT NULL,
+  quantity INTEGER NOT NULL,
+  est_cost REAL NOT NULL,
+  justification TEXT NOT NULL,
+  vendor_name TEXT,
+  status TEXT NOT NULL DEFAULT 'Submitted'
+);
+
+CREATE TABLE IF NOT EXISTS approvals (
+  approval_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  request_id INTEGER NOT NULL,
+  approver_name TEXT NOT NULL,
+  decision TEXT NOT NULL,
+  comments TEXT,
+  decided_at TEXT NOT NULL,
+  FOREIGN KEY(request_id) REFERENCES requests(request_id)
+);
+
+CREATE TABLE IF NOT EXISTS purchase_orders (
+  po_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  request_id INTEGER NOT NULL UNIQUE,
+  po_number TEXT NOT NULL UNIQUE,
+  created_at TEXT NOT NULL,
+  created_by TEXT NOT NULL,
+  vendor_name TEXT NOT NULL,
+  total_amount REAL NOT NULL,
+  status TEXT NOT NULL DEFAULT 'Created',
+  FOREIGN KEY(request_id) REFERENCES requests(request_id)
+);
+
+CREATE TABLE IF NOT EXISTS invoices (
+  invoice_id INTEGER PRIMARY KEY AUTOINCREMENT,
+  po_number TEXT NOT NULL,
+  vendor_name TEXT NOT NULL,
+  invoice_number TEXT NOT NULL,
+  invoice_amount REAL NOT NULL,
+  invoice_date TEXT NOT NULL,
+  status TEXT NOT NULL,
+  exception_reason TEXT,
+  created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_requests_status ON requests(status);
+CREATE INDEX IF NOT EXISTS idx_invoices_status ON invoices(status);
+"""
+
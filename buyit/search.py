@@ -0,0 +1,177 @@
+"""Full-text search over request descriptions, justifications and invoice exceptions.
+
+``search_index`` is an FTS5 table with one row per request (``item_desc``,
+``justification``) and one per invoice that has an ``exception_reason``.
+Row ids are derived from the source keys (``2 * request_id`` and
+``2 * invoice_id + 1``), so the triggers that keep it in sync update or
+delete a document by rowid instead of searching for it. Results are ranked by
+bm25 (description matches weigh most) or listed newest first, and carry a
+highlighted snippet; prefix queries use FTS5's prefix indexes.
+
+    python -m buyit.search query "vendor mism"
+    python -m buyit.search reindex
+"""
+import argparse
+import re
+import sys
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from buyit.sqlutil import split_statements, trigger
+
+SEARCH_TABLES = ["search_index"]
+
+SOURCE_TABLES = ["requests", "invoices"]
+
+# bm25 weights per column: kind, ref_id (unindexed), item_desc, justification, exception_reason
+RANK = "bm25(0.0, 0.0, 10.0, 3.0, 5.0)"
+
+SEARCH_DDL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+  kind UNINDEXED,
+  ref_id UNINDEXED,
+  item_desc,
+  justification,
+  exception_reason,
+  tokenize = 'unicode61 remove_diacritics 2',
+  prefix = '2 3 4'
+);
+
+INSERT INTO search_index(search_index, rank) VALUES ('rank', '{RANK}');
+"""
+
+REQUEST_DOC = ("{row}.request_id * 2, 'request', {row}.request_id, {row}.item_desc, {row}.justification, NULL")
+INVOICE_DOC = ("{row}.invoice_id * 2 + 1, 'invoice', {row}.invoice_id, NULL, NULL, {row}.exception_reason")
+INSERT_DOC = "INSERT INTO search_index(rowid, kind, ref_id, item_desc, justification, exception_reason)"
+
+SEARCH_TEMPLATE = """
+SELECT s.kind, s.ref_id,
+    COALESCE(r.request_id, po.request_id) AS request_id,
+    i.po_number, COALESCE(r.status, i.status) AS status,
+    COALESCE(r.created_at, i.created_at) AS created_at,
+    s.snippet, s.score
+FROM (
+    SELECT rowid, kind, ref_id, snippet(search_index, -1, :open, :close, '…', 12) AS snippet, rank AS score
+    FROM search_index
+    WHERE search_index MATCH :match
+    ORDER BY {inner_order}
+    LIMIT :limit
+) s
+LEFT JOIN requests r ON s.kind = 'request' AND r.request_id = s.ref_id
+LEFT JOIN invoices i ON s.kind = 'invoice' AND i.invoice_id = s.ref_id
+LEFT JOIN purchase_orders po ON po.po_number = i.po_number
+ORDER BY {outer_order}
+"""
+
+# Best bm25 score first. Ranking scores every matching document, so a very
+# common term costs a few hundred ms at a million requests.
+SEARCH_SQL = SEARCH_TEMPLATE.format(inner_order="rank", outer_order="s.score")
+
+# Newest first: FTS5 walks its doclists backwards by rowid and stops at the
+# limit, so this stays in the millisecond range however common the term is.
+SEARCH_RECENT_SQL = SEARCH_TEMPLATE.format(inner_order="rowid DESC", outer_order="s.rowid DESC")
+
+ORDERS = {"relevance": SEARCH_SQL, "newest": SEARCH_RECENT_SQL}
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def match_query(user_text, prefix=True):
+    """Turn free text into a safe FTS5 query: every word must match, as a prefix when ``prefix``.
+
+    Words are quoted, so punctuation and FTS5 operators in the input are
+    treated as plain text. Returns "" when there is nothing to search for.
+    """
+    words = WORD_RE.findall(user_text or "")
+    if not words:
+        return ""
+    star = "*" if prefix else ""
+    return " ".join(f'"{w}"{star}' for w in words)
+
+
+def search_params(user_text, limit=50, prefix=True, raw=False, open_mark="**", close_mark="**"):
+    """Bind parameters for ``SEARCH_SQL``; ``raw=True`` passes FTS5 syntax (OR, NEAR, "phrases") through."""
+    return {"match": user_text if raw else match_query(user_text, prefix), "limit": int(limit),
+            "open": open_mark, "close": close_mark}
+
+
+def search(conn, user_text, limit=50, prefix=True, raw=False, order="relevance"):
+    """Matches as a DataFrame, best first (``order="relevance"``) or newest first; empty for an empty query."""
+    params = search_params(user_text, limit, prefix, raw)
+    if not params["match"]:
+        return pd.DataFrame(columns=["kind", "ref_id", "request_id", "po_number", "status", "created_at",
+                                     "snippet", "score"])
+    return pd.read_sql(text(ORDERS[order]), conn, params=params)
+
+
+def trigger_sql():
+    """CREATE TRIGGER statements that keep ``search_index`` in sync."""
+    return [
+        trigger("trg_search_requests_ins", "INSERT", "requests",
+                [f"{INSERT_DOC} VALUES ({REQUEST_DOC.format(row='NEW')});"]),
+        trigger("trg_search_requests_upd", "UPDATE OF request_id, item_desc, justification", "requests", [
+            "DELETE FROM search_index WHERE rowid = OLD.request_id * 2;",
+            f"{INSERT_DOC} VALUES ({REQUEST_DOC.format(row='NEW')});",
+        ]),
+        trigger("trg_search_requests_del", "DELETE", "requests",
+                ["DELETE FROM search_index WHERE rowid = OLD.request_id * 2;"]),
+        trigger("trg_search_invoices_ins", "INSERT", "invoices",
+                [f"{INSERT_DOC} VALUES ({INVOICE_DOC.format(row='NEW')});"],
+                when="NEW.exception_reason IS NOT NULL"),
+        trigger("trg_search_invoices_upd", "UPDATE OF invoice_id, exception_reason", "invoices", [
+            "DELETE FROM search_index WHERE rowid = OLD.invoice_id * 2 + 1;",
+            f"{INSERT_DOC} SELECT {INVOICE_DOC.format(row='NEW')} WHERE NEW.exception_reason IS NOT NULL;",
+        ]),
+        trigger("trg_search_invoices_del", "DELETE", "invoices",
+                ["DELETE FROM search_index WHERE rowid = OLD.invoice_id * 2 + 1;"],
+                when="OLD.exception_reason IS NOT NULL"),
+    ]
+
+
+def install(conn):
+    """Create the FTS5 index and its triggers; build the index if it is new."""
+    existed = conn.execute(text(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND name='search_index'"
+    )).scalar()
+    for stmt in split_statements(SEARCH_DDL) + trigger_sql():
+        conn.execute(text(stmt))
+    if not existed:
+        rebuild(conn)
+
+
+def rebuild(conn):
+    """Re-index every request and exception invoice, then merge the index segments."""
+    conn.execute(text("DELETE FROM search_index"))
+    conn.execute(text(f"{INSERT_DOC} SELECT {REQUEST_DOC.format(row='r')} FROM requests r"))
+    conn.execute(text(
+        f"{INSERT_DOC} SELECT {INVOICE_DOC.format(row='i')} FROM invoices i WHERE i.exception_reason IS NOT NULL"
+    ))
+    conn.execute(text("INSERT INTO search_index(search_index) VALUES ('optimize')"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search requests and invoice exceptions, or rebuild the index.")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("reindex")
+    query = sub.add_parser("query")
+    query.add_argument("text")
+    query.add_argument("--limit", type=int, default=20)
+    query.add_argument("--raw", action="store_true", help="pass FTS5 query syntax through unchanged")
+    query.add_argument("--order", choices=sorted(ORDERS), default="relevance")
+    args = parser.parse_args(argv)
+
+    with create_engine(args.db, future=True).begin() as conn:
+        install(conn)
+        if args.command == "reindex":
+            rebuild(conn)
+            print(f"Indexed {conn.execute(text('SELECT COUNT(*) FROM search_index')).scalar():,} documents.")
+            return 0
+        results = search(conn, args.text, args.limit, raw=args.raw, order=args.order)
+        print(results.to_string(index=False) if not results.empty else "No matches.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+"""SQL script helpers shared by the modules that install tables and triggers."""
+import sqlite3
+
+
+def trigger(name, event, table, body, when=None):
+    """``CREATE TRIGGER IF NOT EXISTS`` running the ``body`` statements AFTER ``event`` on ``table``."""
+    when_sql = f" WHEN {when}" if when else ""
+    return f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}{when_sql} BEGIN {' '.join(body)} END;"
+
+
+def split_statements(script):
+    """Split a SQL script on statement boundaries, keeping trigger bodies whole."""
+    stmts, buf = [], ""
+    for line in script.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            stmts.append(buf.strip())
+            buf = ""
+    if buf.strip():
+        stmts.append(buf.strip())
+    return stmts
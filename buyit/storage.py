@@ -0,0 +1,176 @@
+"""Storage modes for the SQLite database.
+
+``demo`` (the default) is a plain engine where every write is its own
+transaction, as the single-user demo always ran. ``production`` turns on WAL
+journaling and tuned pragmas, bounds the connection pool, and funnels every
+mutation through one ``WriteQueue`` thread that group-commits whatever writes
+are waiting, so concurrent sessions stop fighting over the write lock.
+
+Select the mode with ``BUYIT_STORAGE=production``.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from sqlalchemy import create_engine, event
+
+DEFAULT_DB_URL = "sqlite:///buyit_hub.db"
+
+PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 10000,
+    "cache_size": -65536,  # KiB, i.e. 64 MiB of page cache per connection
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,
+}
+
+
+def storage_mode():
+    return os.environ.get("BUYIT_STORAGE", "demo").strip().lower()
+
+
+def _apply_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    for name, value in PRODUCTION_PRAGMAS.items():
+        cur.execute(f"PRAGMA {name}={value}")
+    cur.close()
+
+
+def _use_begin_immediate(engine):
+    # pysqlite's own transaction handling defers BEGIN and breaks SAVEPOINT;
+    # take over so the writer holds the lock from the start of each batch.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_conn, _record):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def make_engine(url=DEFAULT_DB_URL, mode=None, pool_size=8, max_overflow=4):
+    """Engine for reads (and for writes in ``demo`` mode)."""
+    mode = mode or storage_mode()
+    if mode != "production":
+        return create_engine(url, future=True)
+    engine = create_engine(
+        url, future=True, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=30,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    event.listen(engine, "connect", _apply_pragmas)
+    return engine
+
+
+def make_writer_engine(url=DEFAULT_DB_URL):
+    """Single-connection engine used by the ``WriteQueue`` thread."""
+    engine = create_engine(
+        url, future=True, pool_size=1, max_overflow=0,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    event.listen(engine, "connect", _apply_pragmas)
+    _use_begin_immediate(engine)
+    return engine
+
+
+class WriteQueue:
+    """Serializes all mutations through one thread and group-commits them.
+
+    ``submit(fn)`` enqueues ``fn(conn)`` and returns a Future. The writer takes
+    every job that is waiting (up to ``max_batch``), runs each inside its own
+    SAVEPOINT of a single transaction, commits once, and only then resolves
+    the Futures, so a result means the write is durable. A job that raises is
+    rolled back to its savepoint without affecting the rest of the batch.
+    """
+
+    def __init__(self, engine, max_batch=128):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.batches = 0
+        self.jobs = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="buyit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn):
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def execute(self, fn, timeout=None):
+        """Run ``fn(conn)`` on the writer and return its result (or raise its error)."""
+        return self.submit(fn).result(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self.engine.dispose()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch):
+        outcomes = []
+        started = []
+        try:
+            with self.engine.begin() as conn:
+                for fn, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    started.append(future)
+                    savepoint = conn.begin_nested()
+                    try:
+                        result = fn(conn)
+                    except Exception as e:
+                        savepoint.rollback()
+                        outcomes.append((future, None, e))
+                    else:
+                        savepoint.commit()
+                        outcomes.append((future, result, None))
+        except Exception as e:
+            for future in started:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.jobs += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def savepoint(conn):
+    """``conn.begin_nested()`` that stays inside the caller's transaction.
+
+    In ``demo`` mode pysqlite has not sent BEGIN before the first write, so a
+    bare SAVEPOINT would open the transaction itself and its RELEASE would
+    commit it; send the BEGIN first.
+    """
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql("BEGIN")
+    return conn.begin_nested()
+
+
+def run_in_transaction(engine, fn):
+    """``demo``-mode counterpart of ``WriteQueue.execute``."""
+    with engine.begin() as conn:
+        return fn(conn)
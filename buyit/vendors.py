@@ -0,0 +1,266 @@
+"""Vendor master: canonical vendors, aliases and an in-memory resolution index.
+
+``vendors`` holds canonical names and ``vendor_aliases`` maps other spellings
+("MSFT", "Microsoft Ireland") to them. ``VendorIndex`` normalizes every name
+once (case, punctuation, legal suffixes such as "Corp" or "Inc.") into a dict,
+so resolving a name is one normalization plus an O(1) lookup. Names that miss
+fall back to token candidates: vendors whose every name token appears in the
+input ("Amazon Business EU" -> "Amazon Business"), found through a
+token -> vendors map in O(k) for k input tokens. Those are suggestions only:
+comparing two vendors (``key``, as invoice matching does) uses exact names
+and aliases.
+
+Triggers bump ``vendor_master_version`` on any change to either table;
+``current(conn)`` rebuilds a database's index only when that counter moves,
+so callers can ask for it on every use.
+"""
+import argparse
+import re
+import sys
+import threading
+
+from sqlalchemy import create_engine, text
+
+from buyit.sqlutil import split_statements
+
+VENDOR_DDL = """
+CREATE TABLE IF NOT EXISTS vendor_aliases (
+  alias TEXT NOT NULL PRIMARY KEY COLLATE NOCASE,
+  vendor_id INTEGER NOT NULL REFERENCES vendors(vendor_id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_vendor_aliases_vendor_id ON vendor_aliases(vendor_id);
+
+CREATE TABLE IF NOT EXISTS vendor_master_version (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  version INTEGER NOT NULL
+);
+
+INSERT OR IGNORE INTO vendor_master_version(id, version) VALUES (1, 0);
+"""
+
+VERSION_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS trg_vendor_version_{table}_{event.lower()} AFTER {event} ON {table} "
+    "BEGIN UPDATE vendor_master_version SET version = version + 1 WHERE id = 1; END;"
+    for table in ("vendors", "vendor_aliases")
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+# Canonical vendors, in intake priority order (first listed wins when a text names several).
+SEED_VENDORS = ["Figma", "Microsoft", "Amazon Business", "Dell", "Adobe", "Google"]
+
+SEED_ALIASES = {
+    "MSFT": "Microsoft",
+    "Microsoft Ireland": "Microsoft",
+    "Microsoft Ireland Operations": "Microsoft",
+    "Amazon": "Amazon Business",
+    "Amazon.com": "Amazon Business",
+    "AMZN": "Amazon Business",
+    "Dell Technologies": "Dell",
+    "Dell EMC": "Dell",
+    "Adobe Systems": "Adobe",
+    "Figma Design": "Figma",
+}
+
+LEGAL_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "llc", "ltd", "limited", "plc",
+    "gmbh", "ag", "sa", "bv", "nv", "pty", "lp", "llp", "srl", "oy", "ab",
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Single-word keys free text can contain by accident ("don't" -> "t"); such a
+# vendor is still resolved by name, just never spotted in free text.
+MIN_MENTION_LENGTH = 2
+STOP_WORDS = {
+    "a", "an", "and", "any", "as", "at", "be", "by", "for", "from", "in", "is", "it", "of", "on", "or",
+    "our", "the", "to", "us", "we", "with",
+}
+
+VENDOR_ROWS_SQL = "SELECT vendor_id, vendor_name FROM vendors ORDER BY vendor_id"
+ALIAS_ROWS_SQL = "SELECT alias, vendor_id FROM vendor_aliases"
+VERSION_SQL = "SELECT version FROM vendor_master_version WHERE id = 1"
+
+
+def tokens(name):
+    """Lower-case word tokens with trailing legal suffixes ("Corp", "Inc.") removed."""
+    words = TOKEN_RE.findall(str(name).lower().replace("&", " and "))
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return words
+
+
+def normalize(name):
+    """Comparison key for a vendor name: ``"Microsoft Corp."`` -> ``"microsoft"``."""
+    return " ".join(tokens(name))
+
+
+class VendorIndex:
+    """Immutable name -> canonical vendor index built from vendor and alias rows."""
+
+    def __init__(self, vendors, aliases=(), version=None):
+        self.version = version
+        self.names = {}       # vendor_id -> canonical name
+        self._priority = {}   # canonical name -> position (lower wins)
+        self._exact = {}      # normalized name or alias -> canonical name
+        self._by_token = {}   # token -> {canonical names containing it}
+        self._token_count = {}
+        for priority, (vendor_id, name) in enumerate(vendors):
+            self.names[vendor_id] = name
+            self._priority[name] = priority
+            key = normalize(name)
+            if not key:
+                continue
+            self._exact.setdefault(key, name)
+            words = set(key.split())
+            self._token_count[name] = len(words)
+            for word in words:
+                self._by_token.setdefault(word, set()).add(name)
+        for alias, vendor_id in aliases:
+            if vendor_id in self.names and normalize(alias):
+                self._exact.setdefault(normalize(alias), self.names[vendor_id])
+        # Keys ``match`` looks for in free text.
+        self._mentions = {k: v for k, v in self._exact.items()
+                          if " " in k or (len(k) >= MIN_MENTION_LENGTH and k not in STOP_WORDS)}
+        self._max_words = max((len(k.split()) for k in self._mentions), default=0)
+
+    @classmethod
+    def load(cls, conn):
+        version = conn.execute(text(VERSION_SQL)).scalar()
+        vendors = conn.execute(text(VENDOR_ROWS_SQL)).all()
+        aliases = conn.execute(text(ALIAS_ROWS_SQL)).all()
+        return cls(vendors, aliases, version)
+
+    def candidates(self, name):
+        """Vendors whose every name token occurs in ``name``, most specific first."""
+        words = set(tokens(name))
+        hits = {}
+        for word in words:
+            for vendor in self._by_token.get(word, ()):
+                hits[vendor] = hits.get(vendor, 0) + 1
+        full = [v for v, n in hits.items() if n == self._token_count[v]]
+        return sorted(full, key=lambda v: (-self._token_count[v], self._priority[v]))
+
+    def resolve(self, name, fuzzy=True):
+        """Canonical vendor for ``name``, or None when it is unknown or ambiguous."""
+        if name is None:
+            return None
+        key = normalize(name)
+        hit = self._exact.get(key)
+        if hit is not None or not fuzzy or not key:
+            return hit
+        found = self.candidates(name)
+        if len(found) == 1 or (len(found) > 1 and self._token_count[found[0]] > self._token_count[found[1]]):
+            return found[0]
+        return None
+
+    def key(self, name):
+        """Value to compare vendors by: the canonical name, or the normalized input when unknown.
+
+        Only exact names and registered aliases resolve here: token candidates
+        are suggestions ("Dell Financial Services" is not Dell), never a match.
+        """
+        resolved = self.resolve(name, fuzzy=False)
+        return resolved if resolved is not None else normalize(name)
+
+    def same_vendor(self, a, b):
+        return self.key(a) == self.key(b)
+
+    def match(self, free_text):
+        """Highest-priority vendor named anywhere in ``free_text`` ("" if none).
+
+        Looks up every run of up to N consecutive words (N = longest known
+        name), so the cost is O(words) dict lookups; same interface as
+        ``intake.VendorMatcher.match``. One-letter names and stop words are
+        not looked for.
+        """
+        words = TOKEN_RE.findall(free_text.lower().replace("&", " and ")) if free_text else []
+        best = None
+        for i in range(len(words)):
+            for n in range(min(self._max_words, len(words) - i), 0, -1):
+                hit = self._mentions.get(" ".join(words[i:i + n]))
+                if hit is not None:
+                    if best is None or self._priority[hit] < self._priority[best]:
+                        best = hit
+                    break
+        return best or ""
+
+
+class VendorRegistry:
+    """Per-database cache of ``VendorIndex``, reloaded when the version counter changes."""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def current(self, conn):
+        db = str(conn.engine.url)
+        version = conn.execute(text(VERSION_SQL)).scalar()
+        with self._lock:
+            index = self._indexes.get(db)
+        if index is None or index.version != version:
+            index = VendorIndex.load(conn)
+            with self._lock:
+                self._indexes[db] = index
+        return index
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+REGISTRY = VendorRegistry()
+
+
+def current(conn):
+    """The vendor index for ``conn``'s database, loaded once and refreshed on change."""
+    return REGISTRY.current(conn)
+
+
+def install(conn):
+    """Create the alias and version tables and triggers; seed the default vendors and aliases."""
+    for stmt in split_statements(VENDOR_DDL) + VERSION_TRIGGERS:
+        conn.execute(text(stmt))
+    conn.execute(text("INSERT OR IGNORE INTO vendors(vendor_name) VALUES (:v)"), [{"v": v} for v in SEED_VENDORS])
+    conn.execute(text("""
+        INSERT OR IGNORE INTO vendor_aliases(alias, vendor_id)
+        SELECT :alias, vendor_id FROM vendors WHERE vendor_name = :vendor
+    """), [{"alias": a, "vendor": v} for a, v in SEED_ALIASES.items()])
+
+
+def add_alias(conn, alias, vendor_name):
+    """Map ``alias`` to an existing canonical vendor; returns False if the vendor is unknown."""
+    result = conn.execute(text("""
+        INSERT INTO vendor_aliases(alias, vendor_id)
+        SELECT :alias, vendor_id FROM vendors WHERE vendor_name = :vendor
+        ON CONFLICT(alias) DO UPDATE SET vendor_id = excluded.vendor_id
+    """), {"alias": alias.strip(), "vendor": vendor_name})
+    return result.rowcount > 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve vendor names or add aliases to the vendor master.")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    resolve = sub.add_parser("resolve")
+    resolve.add_argument("names", nargs="+")
+    alias = sub.add_parser("alias")
+    alias.add_argument("alias")
+    alias.add_argument("vendor")
+    args = parser.parse_args(argv)
+
+    with create_engine(args.db, future=True).begin() as conn:
+        if args.command == "alias":
+            if not add_alias(conn, args.alias, args.vendor):
+                print(f"Unknown vendor: {args.vendor}")
+                return 1
+            print(f"{args.alias} -> {args.vendor}")
+            return 0
+        index = current(conn)
+        for name in args.names:
+            print(f"{name!r:40} -> {index.resolve(name)!r}  candidates={index.candidates(name)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Workflow state transitions: Request -> Approval -> PO -> Sent -> Closed.
+
+Each function performs one state change for a list of IDs on the caller's
+connection, so the whole change commits or rolls back as one transaction
+(wrap it in ``write_tx`` / ``WriteQueue.execute``). The allowed source
+status is checked in the UPDATE's WHERE clause and the UPDATE ... RETURNING
+result drives the dependent INSERT/UPDATE, so an ID whose status moved on in
+the meantime is skipped rather than transitioned twice. Every function
+returns the IDs that actually changed.
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from sqlalchemy import bindparam, text
+
+PENDING_STATUSES = ["Submitted", "Pending Approval"]
+DECISIONS = {"Approved": "Approved", "Rejected": "Rejected"}  # decision -> new request status
+
+# Tables each transition writes (for cache invalidation by callers).
+REQUEST_TABLES = ["requests"]
+DECISION_TABLES = ["requests", "approvals"]
+PO_TABLES = ["requests", "purchase_orders"]
+
+# IDs per ``IN :ids`` statement; SQLite's default cap is 32766 bound variables.
+ID_BATCH = 10000
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _ids(values):
+    return sorted({int(v) for v in values})
+
+
+def _batches(ids):
+    return (ids[start:start + ID_BATCH] for start in range(0, len(ids), ID_BATCH))
+
+
+def _update_returning(conn, sql, ids, **params):
+    lists = ["ids"] + [k for k, v in params.items() if isinstance(v, list)]
+    stmt = text(sql).bindparams(*(bindparam(k, expanding=True) for k in lists))
+    return [row[0] for batch in _batches(ids) for row in conn.execute(stmt, dict(params, ids=batch))]
+
+
+def submit_request(conn, requester_name, department, item_desc, quantity, est_cost, justification,
+                   vendor_name=None, created_at=None):
+    """Record a new request in ``Submitted`` status; returns its ``request_id``."""
+    return conn.execute(text("""
+        INSERT INTO requests(created_at, requester_name, department, item_desc, quantity, est_cost, justification, vendor_name, status)
+        VALUES (:created_at, :requester_name, :department, :item_desc, :quantity, :est_cost, :justification, :vendor_name, 'Submitted')
+        RETURNING request_id
+    """), {
+        "created_at": created_at or _now(),
+        "requester_name": requester_name,
+        "department": department,
+        "item_desc": item_desc,
+        "quantity": int(quantity),
+        "est_cost": float(est_cost),
+        "justification": justification,
+        "vendor_name": (vendor_name or "").strip() or None,
+    }).scalar()
+
+
+def decide_requests(conn, request_ids, decision, approver_name, comments=None, decided_at=None):
+    """Approve or reject pending requests and record one approval row per request."""
+    if decision not in DECISIONS:
+        raise ValueError(f"Unknown decision: {decision}")
+    comments = (comments or "").strip() or None
+    if decision == "Rejected" and not comments:
+        raise ValueError("Comments required for rejection.")
+    ids = _ids(request_ids)
+    if not ids:
+        return []
+    done = _update_returning(
+        conn,
+        "UPDATE requests SET status=:to WHERE request_id IN :ids AND status IN :src RETURNING request_id",
+        to=DECISIONS[decision], ids=ids, src=PENDING_STATUSES,
+    )
+    if done:
+        decided_at = decided_at or _now()
+        conn.execute(text("""
+            INSERT INTO approvals(request_id, approver_name, decision, comments, decided_at)
+            VALUES (:request_id, :approver_name, :decision, :comments, :decided_at)
+        """), [{"request_id": rid, "approver_name": approver_name.strip(), "decision": decision,
+                "comments": comments, "decided_at": decided_at} for rid in done])
+    return sorted(done)
+
+
+def create_pos(conn, orders, created_at=None):
+    """Create POs for approved requests.
+
+    ``orders`` is a list of dicts with ``request_id``, ``po_number`` (blank
+    for ``PO-<request_id>``), ``created_by``, ``vendor_name`` and
+    ``total_amount``. A duplicate PO number fails the whole batch.
+    """
+    by_id = {int(o["request_id"]): o for o in orders}
+    if not by_id:
+        return []
+    done = _update_returning(
+        conn,
+        "UPDATE requests SET status='PO Created' WHERE request_id IN :ids AND status='Approved' RETURNING request_id",
+        ids=sorted(by_id),
+    )
+    if done:
+        created_at = created_at or _now()
+        conn.execute(text("""
+            INSERT INTO purchase_orders(request_id, po_number, created_at, created_by, vendor_name, total_amount, status)
+            VALUES (:request_id, :po_number, :created_at, :created_by, :vendor_name, :total_amount, 'Created')
+        """), [{
+            "request_id": rid,
+            "po_number": (by_id[rid].get("po_number") or "").strip() or f"PO-{rid:06d}",
+            "created_at": created_at,
+            "created_by": by_id[rid]["created_by"].strip(),
+            "vendor_name": by_id[rid]["vendor_name"].strip(),
+            "total_amount": float(by_id[rid]["total_amount"]),
+        } for rid in done])
+    return sorted(done)
+
+
+def _move_pos(conn, request_ids, src, po_status, request_status):
+    ids = _ids(request_ids)
+    if not ids:
+        return []
+    done = _update_returning(
+        conn,
+        "UPDATE purchase_orders SET status=:to WHERE request_id IN :ids AND status IN :src RETURNING request_id",
+        to=po_status, ids=ids, src=src,
+    )
+    stmt = text("UPDATE requests SET status=:to WHERE request_id IN :ids").bindparams(bindparam("ids", expanding=True))
+    for batch in _batches(done):
+        conn.execute(stmt, {"to": request_status, "ids": batch})
+    return sorted(done)
+
+
+def mark_pos_sent(conn, request_ids):
+    """Created -> Sent (request: PO Created -> PO Sent)."""
+    return _move_pos(conn, request_ids, ["Created"], "Sent", "PO Sent")
+
+
+def close_pos(conn, request_ids):
+    """Created/Sent -> Closed (request -> Closed)."""
+    return _move_pos(conn, request_ids, ["Created", "Sent"], "Closed", "Closed")
+
+
+def main(argv=None):
+    from buyit.core import Hub
+
+    parser = argparse.ArgumentParser(description="Run workflow transitions for a batch of request IDs.")
+    parser.add_argument("--db", default="sqlite:///buyit_hub.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("approve", "reject"):
+        decide = sub.add_parser(name)
+        decide.add_argument("ids", nargs="+", type=int)
+        decide.add_argument("--approver", required=True)
+        decide.add_argument("--comments")
+    for name in ("send", "close"):
+        sub.add_parser(name).add_argument("ids", nargs="+", type=int)
+    args = parser.parse_args(argv)
+
+    hub = Hub(args.db)
+    hub.ensure_schema()
+    try:
+        if args.command in ("approve", "reject"):
+            decision = "Approved" if args.command == "approve" else "Rejected"
+            done = hub.write(lambda conn: decide_requests(conn, args.ids, decision, args.approver, args.comments))
+        else:
+            move = mark_pos_sent if args.command == "send" else close_pos
+            done = hub.write(lambda conn: move(conn, args.ids))
+    except ValueError as e:
+        print(e)
+        return 2
+    finally:
+        hub.close()
+    skipped = sorted(set(args.ids) - set(done))
+    print(f"{args.command}: {len(done)} changed" + (f", skipped {skipped}" if skipped else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from buyit import ingest, migrations, workflow
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """A freshly migrated SQLite database."""
+    engine = create_engine(f"sqlite:///{tmp_path}/buyit.db", future=True)
+    with engine.begin() as conn:
+        migrations.migrate(conn)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def make_pos():
+    """``make_pos(conn, [amount, ...], vendor)``: approved requests with one PO each; returns the PO numbers."""
+    def make(conn, amounts, vendor="Dell"):
+        ids = [workflow.submit_request(conn, "Shalini", "IT", "Laptop", 1, amount, "Test", vendor) for amount in amounts]
+        workflow.decide_requests(conn, ids, "Approved", "Isha")
+        workflow.create_pos(conn, [{"request_id": i, "po_number": "", "created_by": "Shalini", "vendor_name": vendor,
+                                    "total_amount": amount} for i, amount in zip(ids, amounts)])
+        return [f"PO-{i:06d}" for i in ids]
+    return make
+
+
+def _invoices(conn, po_number, rows, vendor="Dell"):
+    chunk, _ = ingest.clean_chunk(pd.DataFrame([{
+        "po_number": po_number, "vendor_name": vendor, "invoice_number": number, "invoice_amount": amount,
+        "invoice_date": "2026-01-05",
+    } for number, amount in rows]))
+    return ingest.ingest_chunk(conn, chunk)
+
+
+def _sql(statement, **params):
+    return lambda conn: conn.execute(text(statement), params)
+
+
+@pytest.fixture
+def workload(make_pos):
+    """``[(step, fn(conn)), ...]``: every kind of write the app makes, for checking trigger-maintained tables."""
+    def submit(conn):
+        for item, dept, vendor in [("Laptop for design team", "Design", "Dell"), ("Figma seats", "Design", "Figma"),
+                                   ("Monitor arms", "IT", "Dell"), ("Office chairs", "Facilities", None)]:
+            workflow.submit_request(conn, "Ana", dept, item, 2, 1200, f"Replace old {item.lower()}", vendor)
+
+    return [
+        ("submit", submit),
+        ("decide", lambda conn: (workflow.decide_requests(conn, [1, 2, 3], "Approved", "Isha"),
+                                 workflow.decide_requests(conn, [4], "Rejected", "Isha", "Not this quarter"))),
+        ("create POs", lambda conn: workflow.create_pos(conn, [
+            {"request_id": i, "po_number": "", "created_by": "Shalini", "vendor_name": v, "total_amount": 1000}
+            for i, v in [(1, "Dell"), (2, "Figma"), (3, "Dell")]])),
+        ("send POs", lambda conn: workflow.mark_pos_sent(conn, [1, 2])),
+        ("invoices", lambda conn: (
+            _invoices(conn, "PO-000001", [("INV-1", 400), ("INV-2", 700), ("INV-1", 400)]),
+            _invoices(conn, "PO-000002", [("INV-3", 100)], vendor="Dell"),
+            _invoices(conn, "PO-000009", [("INV-4", 100)]))),
+        ("edit request", _sql("UPDATE requests SET item_desc = 'Laptops for the design team', est_cost = 1500 "
+                              "WHERE request_id = 1")),
+        ("resolve exception", _sql("UPDATE invoices SET status = 'Matched', exception_reason = NULL "
+                                   "WHERE invoice_number = 'INV-2'")),
+        ("change PO", _sql("UPDATE purchase_orders SET total_amount = 1200, vendor_name = 'Dell Inc' "
+                           "WHERE po_number = 'PO-000003'")),
+        ("close PO", lambda conn: workflow.close_pos(conn, [1])),
+        ("delete invoice", _sql("DELETE FROM invoices WHERE invoice_number = 'INV-3'")),
+        ("delete PO and request", lambda conn: (
+            conn.execute(text("DELETE FROM purchase_orders WHERE request_id = 3")),
+            conn.execute(text("DELETE FROM approvals WHERE request_id = 3")),
+            conn.execute(text("DELETE FROM requests WHERE request_id = 3")))),
+    ]
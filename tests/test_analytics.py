@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from buyit import analytics, archive, datagen
+
+
+@pytest.fixture
+def generated(engine):
+    datagen.generate(engine, requests=400, years=1, seed=11)
+    return engine
+
+
+def window(conn):
+    months = analytics.available_months(conn)
+    return months[0], months[-1]
+
+
+def histogram(hist):
+    return hist.sort_values(["stage", "month", "bin"]).reset_index(drop=True)
+
+
+def assert_same_cycles(expected, actual):
+    pd.testing.assert_frame_equal(histogram(expected)[["stage", "month", "bin", "n"]],
+                                  histogram(actual)[["stage", "month", "bin", "n"]], check_dtype=False)
+    pd.testing.assert_frame_equal(analytics.cycle_summary(expected), analytics.cycle_summary(actual),
+                                  check_dtype=False)
+
+
+def cached_months(conn):
+    return conn.execute(text("SELECT COUNT(*) FROM cycle_months")).scalar()
+
+
+def test_cached_closed_months_match_a_fresh_computation(generated):
+    with generated.begin() as conn:
+        first, last = window(conn)
+        warmed = analytics.cycle_histograms(conn, first, last)
+        assert cached_months(conn) == len(analytics.months_between(first, last)) - 1
+        from_cache = analytics.cycle_histograms(conn, first, last)
+        analytics.clear(conn)
+        fresh = analytics.cycle_histograms(conn, first, last)
+    assert not warmed.empty
+    assert_same_cycles(warmed, from_cache)
+    assert_same_cycles(fresh, from_cache)
+
+
+def test_hot_and_archived_histograms_add_up(generated, tmp_path):
+    store = archive.ArchiveStore(str(tmp_path / "archive"))
+    with generated.begin() as conn:
+        first, last = window(conn)
+        before = analytics.cycle_histograms(conn, first, last)
+    archive.archive_closed(generated, store.root)
+
+    with generated.begin() as conn:
+        cold = store.cycle_histogram(conn)
+        cold = cold[cold["month"].isin(analytics.months_between(first, last))]
+        assert not cold.empty
+        analytics.clear(conn)
+        hot = analytics.cycle_histograms(conn, first, last)
+        assert hot["n"].sum() + cold["n"].sum() == before["n"].sum()
+        # The cache holds hot + archived counts, so a hot-only read does not fill it.
+        assert cached_months(conn) == 0
+        # Cached before archiving, then recomputed from hot + archive: the same either way.
+        assert_same_cycles(before, analytics.cycle_histograms(conn, first, last, store))
+        analytics.clear(conn)
+        assert_same_cycles(before, analytics.cycle_histograms(conn, first, last, store))
+
+
+def test_backdated_rows_invalidate_cached_months(generated):
+    with generated.begin() as conn:
+        first, last = window(conn)
+        warmed = analytics.cycle_histograms(conn, first, last)
+        assert cached_months(conn)
+
+    datagen.generate(generated, requests=200, years=1, seed=12)
+
+    with generated.begin() as conn:
+        assert cached_months(conn) == 0
+        after = analytics.cycle_histograms(conn, first, last)
+        assert after["n"].sum() > warmed["n"].sum()
+        analytics.clear(conn)
+        assert_same_cycles(after, analytics.cycle_histograms(conn, first, last))
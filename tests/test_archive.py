@@ -0,0 +1,115 @@
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from buyit import analytics, archive, datagen, export, ledger, lineage, rollups
+
+
+class Killed(BaseException):
+    """The process dies between writing a batch's files and committing it."""
+
+
+def frame(conn, sql):
+    return pd.read_sql(text(sql), conn)
+
+
+def sorted_frame(df, keys):
+    return df.sort_values(keys).reset_index(drop=True).round(2)
+
+
+def snapshot(conn, store, request_id):
+    """What the Analytics page and the export show, hot and archived rows together."""
+    lineage_rows = pd.concat([lineage.lookup(conn, request_id), store.lineage_lookup(conn, request_id)])
+    return {
+        "kpis": sorted_frame(store.merge_panel(conn, "kpis", frame(conn, rollups.KPI_SQL)), ["metric", "bucket"]),
+        "spend_by_vendor": sorted_frame(
+            store.merge_panel(conn, "spend_by_vendor", frame(conn, rollups.SPEND_BY_VENDOR_SQL)), ["vendor_name"]),
+        "spend_window": sorted_frame(analytics.spend(conn, "2000-01", "2999-12", store),
+                                     ["month", "department", "vendor_name"]),
+        "lineage": lineage_rows[["request_id", "po_number", "invoice_number"]].reset_index(drop=True),
+        "export_rows": {table: sum(len(rows) for rows in export.iter_table_chunks(conn, table, 500, store))
+                        for _, table in export.REPORT_TABLES},
+    }
+
+
+def assert_same(before, after):
+    assert before.keys() == after.keys()
+    for name in before:
+        if isinstance(before[name], pd.DataFrame):
+            pd.testing.assert_frame_equal(before[name], after[name], check_dtype=False, obj=name)
+        else:
+            assert before[name] == after[name], name
+
+
+@pytest.fixture
+def generated(engine):
+    datagen.generate(engine, requests=400, years=1, seed=7)
+    return engine
+
+
+def closed_pos(conn):
+    return conn.execute(text("SELECT request_id FROM purchase_orders WHERE status = 'Closed' ORDER BY po_id")).scalars().all()
+
+
+def test_round_trip_moves_closed_pos_without_changing_what_pages_show(generated, tmp_path):
+    root = str(tmp_path / "archive")
+    store = archive.ArchiveStore(root)
+    with generated.connect() as conn:
+        closed = closed_pos(conn)
+        assert closed
+        before = snapshot(conn, store, closed[0])
+        assert len(before["lineage"]) > 0
+
+    pos, rows = archive.archive_closed(generated, root, batch_size=25)
+
+    with generated.connect() as conn:
+        assert pos == len(closed) and closed_pos(conn) == []
+        for table in ("requests", "approvals", "purchase_orders"):
+            hot = conn.execute(text(f"SELECT COUNT(*) FROM {table} WHERE request_id IN ({','.join(map(str, closed))})"))
+            assert hot.scalar() == 0, table
+        batches = conn.execute(text("SELECT COUNT(*), SUM(po_count), SUM(row_count) FROM archive_batches")).one()
+        assert tuple(batches) == ((len(closed) + 24) // 25, len(closed), rows)
+        for table in archive.ARCHIVED:
+            months = os.listdir(os.path.join(root, table))
+            assert months and all(m.startswith("month=") for m in months), table
+
+        # Derived tables describe the hot rows only.
+        assert rollups.verify(conn) == [] and lineage.verify(conn) == [] and ledger.verify(conn) == []
+        hot_requests = conn.execute(text("SELECT COUNT(*) FROM requests")).scalar()
+        assert conn.execute(text("SELECT COUNT(*) FROM search_index WHERE kind = 'request'")).scalar() == hot_requests
+        assert lineage.lookup(conn, closed[0]).empty
+
+        assert_same(before, snapshot(conn, store, closed[0]))
+
+
+def test_batch_that_dies_mid_write_is_never_read(generated, tmp_path, monkeypatch):
+    root = str(tmp_path / "archive")
+    store = archive.ArchiveStore(root)
+    write_batch = archive._write_batch
+
+    def dies_after_writing(conn, root, batch_id):
+        write_batch(conn, root, batch_id)
+        raise Killed()
+
+    with generated.connect() as conn:
+        closed = closed_pos(conn)
+        before = snapshot(conn, store, closed[0])
+    monkeypatch.setattr(archive, "_write_batch", dies_after_writing)
+    with pytest.raises(Killed):
+        archive.archive_closed(generated, root)
+    monkeypatch.undo()
+
+    assert any(archive._batch_files(root, table) for table in archive.ARCHIVED)
+    with generated.connect() as conn:
+        assert closed_pos(conn) == closed
+        assert archive.committed_batches(conn) == set()
+        assert store.scan(conn, "purchase_orders").empty
+        assert_same(before, snapshot(conn, store, closed[0]))
+
+    # The next run sweeps the orphan files and archives everything exactly once.
+    archive.archive_closed(generated, root)
+    with generated.connect() as conn:
+        assert len(store.scan(conn, "purchase_orders")) == len(closed)
+        assert_same(before, snapshot(conn, store, closed[0]))
@@ -0,0 +1,26 @@
+import gc
+import os
+import time
+
+from buyit import export
+
+
+def test_temp_report_is_removed_with_its_owner(tmp_path):
+    path = tmp_path / "buyit_report_x.xlsx"
+    path.write_bytes(b"report")
+    report = export.TempReport(str(path), "xlsx")
+    assert report.exists() and report.read_bytes() == b"report"
+    del report
+    gc.collect()
+    assert not path.exists()
+
+
+def test_sweep_removes_only_stale_reports(tmp_path):
+    stale, fresh, other = (tmp_path / n for n in ("buyit_report_a.zip", "buyit_report_b.zip", "notes.txt"))
+    for p in (stale, fresh, other):
+        p.write_bytes(b"x")
+    old = time.time() - 2 * 24 * 3600
+    os.utime(stale, (old, old))
+    os.utime(other, (old, old))
+    assert export.sweep_reports(directory=str(tmp_path)) == 1
+    assert not stale.exists() and fresh.exists() and other.exists()
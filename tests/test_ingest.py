@@ -0,0 +1,77 @@
+import sqlite3
+
+import pandas as pd
+from sqlalchemy import create_engine, event, text
+
+from buyit import ingest, ledger, migrations, workflow
+
+
+def seeded(tmp_path, pos):
+    engine = create_engine(f"sqlite:///{tmp_path}/ingest.db", future=True)
+    # Some builds raise the limit; hold every connection to SQLite's default.
+    event.listen(engine, "connect", lambda dbapi_conn, _: dbapi_conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 32766))
+    with engine.begin() as conn:
+        migrations.migrate(conn)
+        ids = [workflow.submit_request(conn, "Shalini", "IT", "Laptop", 1, 1000, "Test", "Dell") for _ in range(pos)]
+        workflow.decide_requests(conn, ids, "Approved", "Isha")
+        workflow.create_pos(conn, [{"request_id": i, "po_number": "", "created_by": "Shalini", "vendor_name": "Dell",
+                                    "total_amount": 1000} for i in ids])
+    return engine
+
+
+def test_chunk_larger_than_the_sqlite_variable_limit(tmp_path):
+    engine = seeded(tmp_path, 3)
+    rows = 40000
+    po_numbers = [f"PO-X{n:06d}" for n in range(rows)]
+    invoice_numbers = ["INV-UNKNOWN-PO"] * rows
+    for n, known in zip((0, 15000, rows - 1), ("PO-000001", "PO-000002", "PO-000003")):
+        po_numbers[n], invoice_numbers[n] = known, f"INV-{known}"
+    chunk, _ = ingest.clean_chunk(pd.DataFrame({
+        "po_number": po_numbers, "vendor_name": "Dell", "invoice_number": invoice_numbers,
+        "invoice_amount": 500.0, "invoice_date": "2026-01-05",
+    }))
+    with engine.begin() as conn:
+        matched = ingest.ingest_chunk(conn, chunk)
+    engine.dispose()
+    assert len(matched) == rows
+    assert sorted(matched.loc[matched["status"] == "Matched", "po_number"]) == ["PO-000001", "PO-000002", "PO-000003"]
+
+
+def test_distinct_invoice_numbers_beyond_the_sqlite_variable_limit(tmp_path):
+    engine = seeded(tmp_path, 1)
+    rows = 40000
+    chunk, _ = ingest.clean_chunk(pd.DataFrame({
+        "po_number": "PO-000001", "vendor_name": "Dell", "invoice_number": [f"INV-{n:06d}" for n in range(rows)],
+        "invoice_amount": 0.01, "invoice_date": "2026-01-05",
+    }))
+    with engine.begin() as conn:
+        ingest.ingest_chunk(conn, chunk.iloc[:1])
+        matched = ingest.ingest_chunk(conn, chunk)
+    engine.dispose()
+    assert matched["status"].value_counts().to_dict() == {"Matched": rows - 1, "Duplicate": 1}
+
+
+def test_invoice_booked_by_another_session_mid_chunk_is_a_duplicate(engine, make_pos, monkeypatch):
+    with engine.begin() as conn:
+        po, = make_pos(conn, [1000])
+        ingest.ingest_chunk(conn, ingest.invoice_row(po, "Dell", "INV-A", 10, "2026-01-05"))
+
+    # The first duplicate check misses INV-A, as if another session booked it right after the lookup.
+    booked_invoices, checks = ledger.booked_invoices, []
+
+    def racing(conn, numbers):
+        checks.append(numbers)
+        booked = booked_invoices(conn, numbers)
+        return booked.iloc[0:0] if len(checks) == 1 else booked
+
+    monkeypatch.setattr(ledger, "booked_invoices", racing)
+    chunk, _ = ingest.clean_chunk(pd.DataFrame({
+        "po_number": po, "vendor_name": "Dell", "invoice_number": ["INV-B", "INV-A"], "invoice_amount": 10.0,
+        "invoice_date": "2026-01-06",
+    }))
+    with engine.begin() as conn:
+        matched = ingest.ingest_chunk(conn, chunk)
+        rows = conn.execute(text("SELECT invoice_number, status FROM invoices ORDER BY invoice_id")).all()
+    assert len(checks) == 2
+    assert matched["status"].tolist() == ["Matched", "Duplicate"]
+    assert rows == [("INV-A", "Matched"), ("INV-B", "Matched"), ("INV-A", "Duplicate")]
@@ -0,0 +1,49 @@
+import pytest
+
+from benchmarks.bench_intake import legacy_extract_fields, legacy_with_master, make_texts, master_keywords
+from buyit import vendors
+from buyit.intake import DEFAULT_VENDOR_KEYWORDS, extract_fields, extract_frame, extract_many
+
+CORPUS = [
+    "Need 25 Figma licenses for the Design team, annual plan, budget $12,500.",
+    "Please order 4 laptops from Dell. Estimated 7200 USD. Required for new hires.",
+    "Requesting 10 seats of microsoft 365 for Finance; approx 3,450.75 dollars per year.",
+    "Renewal: Adobe Creative Cloud, usd 899.99, 3 subscriptions",
+    "Buy from Amazon: 12 units of USB-C docks, $1,080",
+    "Amazon Business order for HR, 2 units.",
+    "Dell or Figma, whichever is cheaper, 5 units, $500.",
+    "Google Workspace seats, 40 seats at usd1200",
+    "Dellwood chairs for the lobby, budget around $2,000.",
+    "Microsoft's Surface docks, 3 units",
+    "No numbers or vendors here",
+    "   Leading and trailing spaces, 7 units, 70 usd.   ",
+    "",
+]
+
+
+@pytest.fixture
+def master(engine):
+    """``(keyword -> canonical name, VendorIndex)`` for the seeded vendor master."""
+    with engine.connect() as conn:
+        return master_keywords(conn), vendors.current(conn)
+
+
+def test_matches_the_legacy_extractor():
+    corpus = CORPUS + make_texts(500, list(DEFAULT_VENDOR_KEYWORDS))
+    expected = [legacy_extract_fields(t) for t in corpus]
+    assert [extract_fields(t) for t in corpus] == expected
+    assert list(extract_many(corpus)) == expected
+
+
+def test_matches_the_legacy_extractor_over_the_vendor_master(master):
+    keywords, index = master
+    corpus = CORPUS + make_texts(500, list(keywords)) + [
+        "MSFT seats for 12 analysts, $3,000",
+        "Reorder from Amazon.com, 6 units",
+        "Dell EMC storage shelf, 1 unit, 18,000 usd",
+        "Figma Design seats and a Dell monitor, 2 units",
+    ]
+    expected = [legacy_with_master(t, keywords) for t in corpus]
+    assert [extract_fields(t, index) for t in corpus] == expected
+    assert extract_frame(corpus, index).to_dict("records") == expected
+    assert [e["vendor_name"] for e in expected[-4:]] == ["Microsoft", "Amazon Business", "Dell", "Figma"]
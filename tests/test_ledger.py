@@ -0,0 +1,63 @@
+import pandas as pd
+from sqlalchemy import text
+
+from buyit import ingest, ledger
+
+
+def invoices(po_number, *rows, vendor="Dell"):
+    chunk, _ = ingest.clean_chunk(pd.DataFrame([{
+        "po_number": po_number, "vendor_name": vendor, "invoice_number": number, "invoice_amount": amount,
+        "invoice_date": "2026-01-05",
+    } for number, amount in rows]))
+    return chunk
+
+
+def test_triggers_keep_the_ledger_current(engine, make_pos):
+    with engine.begin() as conn:
+        po, = make_pos(conn, [1000])
+        assert ledger.balance(conn, po) == {"po_number": po, "total_amount": 1000, "invoiced_to_date": 0,
+                                            "remaining": 1000, "invoice_count": 0}
+        ingest.ingest_chunk(conn, invoices(po, ("INV-1", 300), ("INV-2", 900)))
+        assert (ledger.balance(conn, po)["invoiced_to_date"], ledger.balance(conn, po)["invoice_count"]) == (300, 1)
+
+        # Resolving the over-billed Exception books it; changing and deleting invoices moves the balance back.
+        conn.execute(text("UPDATE purchase_orders SET total_amount = 1500 WHERE po_number = :p"), {"p": po})
+        conn.execute(text("UPDATE invoices SET status = 'Matched' WHERE invoice_number = 'INV-2'"))
+        assert ledger.balance(conn, po) == {"po_number": po, "total_amount": 1500, "invoiced_to_date": 1200,
+                                            "remaining": 300, "invoice_count": 2}
+        conn.execute(text("UPDATE invoices SET invoice_amount = 100 WHERE invoice_number = 'INV-1'"))
+        conn.execute(text("DELETE FROM invoices WHERE invoice_number = 'INV-2'"))
+        assert ledger.balance(conn, po)["invoiced_to_date"] == 100
+        assert ledger.verify(conn) == []
+
+        conn.execute(text("DELETE FROM purchase_orders WHERE po_number = :p"), {"p": po})
+        assert ledger.balance(conn, po) is None
+        assert ledger.verify(conn) == []
+
+
+def test_partial_invoices_are_checked_against_the_running_balance(engine, make_pos):
+    with engine.begin() as conn:
+        same_chunk, across_chunks = make_pos(conn, [1000, 1000])
+        matched = ingest.ingest_chunk(conn, invoices(same_chunk, ("INV-1", 600), ("INV-2", 500), ("INV-3", 400)))
+        assert matched["status"].tolist() == ["Matched", "Exception", "Matched"]
+        assert matched["exception_reason"][1].startswith("Cumulative over-billing: PO=$1000.00, invoiced before=$600.00")
+
+        assert ingest.ingest_chunk(conn, invoices(across_chunks, ("INV-4", 600)))["status"].tolist() == ["Matched"]
+        later = ingest.ingest_chunk(conn, invoices(across_chunks, ("INV-5", 500), ("INV-6", 440)))
+        assert later["status"].tolist() == ["Exception", "Matched"]
+        assert ledger.balance(conn, across_chunks)["remaining"] == -40
+        assert ledger.verify(conn) == []
+
+
+def test_duplicates_within_and_across_chunks(engine, make_pos):
+    with engine.begin() as conn:
+        po, = make_pos(conn, [1000])
+        first = ingest.ingest_chunk(conn, invoices(po, ("INV-1", 10), ("INV-1", 10), ("INV-2", 10)))
+        assert first["status"].tolist() == ["Matched", "Duplicate", "Matched"]
+        assert first["exception_reason"][1] == "Duplicate invoice number: INV-1 repeated in the same batch"
+
+        second = ingest.ingest_chunk(conn, invoices(po, ("INV-2", 10), ("INV-3", 10)))
+        booked_id = conn.execute(text("SELECT invoice_id FROM invoices WHERE invoice_number = 'INV-2'")).scalar()
+        assert second["status"].tolist() == ["Duplicate", "Matched"]
+        assert second["exception_reason"][0] == f"Duplicate invoice number: INV-2 already booked as invoice {booked_id}"
+        assert ledger.balance(conn, po)["invoice_count"] == 3
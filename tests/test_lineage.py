@@ -0,0 +1,26 @@
+from buyit import lineage
+
+
+def test_lineage_follows_every_write(engine, workload):
+    for step, write in workload:
+        with engine.begin() as conn:
+            write(conn)
+            assert lineage.verify(conn) == [], step
+
+
+def test_lookup_by_any_key_returns_the_whole_request(engine, workload):
+    with engine.begin() as conn:
+        for _, write in workload:
+            write(conn)
+        by_request = lineage.lookup(conn, request_id=1)
+        assert by_request["invoice_number"].tolist() == ["INV-1", "INV-2", "INV-1"]
+        assert by_request["item_desc"].unique().tolist() == ["Laptops for the design team"]
+        assert by_request["po_status"].unique().tolist() == ["Closed"]
+        assert lineage.lookup(conn, po_number="PO-000001").equals(by_request)
+        assert lineage.lookup(conn, invoice_number="INV-2").equals(by_request)
+
+        # A request without a PO has one placeholder row; deleted requests and unknown keys have none.
+        assert lineage.lookup(conn, request_id=4)[["po_number", "invoice_number"]].isna().all(axis=None)
+        assert len(lineage.lookup(conn, request_id=4)) == 1
+        assert lineage.lookup(conn, request_id=3).empty
+        assert lineage.lookup(conn, invoice_number="INV-404").empty
@@ -0,0 +1,18 @@
+from sqlalchemy import text
+
+from buyit import queries, workflow
+
+
+def test_all_matching_pending_ids_span_every_page(engine, monkeypatch):
+    monkeypatch.setattr(workflow, "ID_BATCH", 7)
+    with engine.begin() as conn:
+        finance = [workflow.submit_request(conn, "Ana", "Finance", "Desk", 1, 500 + n, "Test") for n in range(40)]
+        workflow.submit_request(conn, "Ana", "Design", "Desk", 1, 500, "Test")
+        workflow.decide_requests(conn, finance[:3], "Rejected", "Isha", "No budget")
+
+        params = queries.page_params(None, 25, "finance", "", 510, 0)
+        ids = [row[0] for row in conn.execute(text(queries.PENDING_REQUEST_IDS), params)]
+        assert sorted(ids) == finance[10:]
+
+        assert workflow.decide_requests(conn, ids, "Approved", "Isha") == finance[10:]
+        assert conn.execute(text("SELECT COUNT(*) FROM approvals WHERE decision = 'Approved'")).scalar() == 30
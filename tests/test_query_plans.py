@@ -0,0 +1,25 @@
+from sqlalchemy import create_engine, text
+
+from buyit import migrations, plancheck
+
+INDEX_EXISTS = text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND name = :name")
+
+
+def test_page_query_plans_use_their_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/plans.db", future=True)
+    with engine.begin() as conn:
+        migrations.migrate(conn)
+        failures = plancheck.check_plans(conn)
+    engine.dispose()
+    assert [(page, name, problem) for page, name, problem, _ in failures] == []
+
+
+def test_unused_vendor_amount_index_is_dropped(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/plans.db", future=True)
+    params = {"name": "idx_purchase_orders_vendor_amount"}
+    with engine.begin() as conn:
+        migrations.migrate(conn, target=9)
+        assert conn.execute(INDEX_EXISTS, params).scalar() == 1
+        migrations.migrate(conn)
+        assert conn.execute(INDEX_EXISTS, params).scalar() == 0
+    engine.dispose()
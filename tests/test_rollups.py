@@ -0,0 +1,17 @@
+from sqlalchemy import text
+
+from buyit import rollups
+
+
+def test_rollups_follow_every_write(engine, workload):
+    for step, write in workload:
+        with engine.begin() as conn:
+            write(conn)
+            assert rollups.verify(conn) == [], step
+
+    with engine.connect() as conn:
+        kpis = {(m, b): n for m, b, n in conn.execute(text(rollups.KPI_SQL))}
+        spend = dict(conn.execute(text(rollups.SPEND_BY_VENDOR_SQL)).all())
+    assert kpis[("requests.status", "Rejected")] == 1 and kpis[("purchase_orders.status", "Closed")] == 1
+    assert kpis[("invoices.status", "Duplicate")] == 1
+    assert spend == {"Dell": 1000, "Figma": 1000}
@@ -0,0 +1,59 @@
+from sqlalchemy import text
+
+from buyit import search
+
+INDEXED = "SELECT rowid, kind, ref_id, item_desc, justification, exception_reason FROM search_index ORDER BY rowid"
+
+# What search.rebuild would index from the current source rows.
+EXPECTED = f"""
+SELECT {search.REQUEST_DOC.format(row='r')} FROM requests r
+UNION ALL
+SELECT {search.INVOICE_DOC.format(row='i')} FROM invoices i WHERE i.exception_reason IS NOT NULL
+ORDER BY 1
+"""
+
+
+def _rows(conn, sql):
+    return [tuple(row) for row in conn.execute(text(sql))]
+
+
+def test_triggers_keep_the_index_in_sync(engine, workload):
+    for step, write in workload:
+        with engine.begin() as conn:
+            write(conn)
+            assert _rows(conn, INDEXED) == _rows(conn, EXPECTED), step
+
+
+def test_queries_after_the_workload(engine, workload):
+    with engine.begin() as conn:
+        for step, write in workload:
+            write(conn)
+            if step == "invoices":
+                assert search.search(conn, "vendor mism")["po_number"].tolist() == ["PO-000002"]
+                assert search.search(conn, "cumulative")["po_number"].tolist() == ["PO-000001"]
+
+        hits = search.search(conn, "lapt desi")
+        assert hits[["kind", "request_id"]].values.tolist() == [["request", 1]]
+        assert hits.at[0, "snippet"] == "**Laptops** for the **design** team"
+        assert search.search(conn, "lapt", prefix=False).empty
+
+        # Resolved and deleted exceptions, and deleted requests, drop out.
+        assert search.search(conn, "vendor mism").empty
+        assert search.search(conn, "cumulative").empty
+        assert search.search(conn, "monitor").empty
+        assert search.search(conn, "not found")[["kind", "po_number"]].values.tolist() == [["invoice", "PO-000009"]]
+        assert search.search(conn, "duplicate")["status"].tolist() == ["Duplicate"]
+
+        assert search.search(conn, "replace", order="newest")["request_id"].tolist() == [4, 2, 1]
+        assert search.search(conn, "replace", limit=2, order="newest")["request_id"].tolist() == [4, 2]
+
+
+def test_user_text_cannot_inject_fts_syntax(engine, workload):
+    assert search.match_query('figma OR "seats" -chairs NEAR(') == '"figma"* "OR"* "seats"* "chairs"* "NEAR"*'
+    assert search.match_query("?! ()") == ""
+    with engine.begin() as conn:
+        for _, write in workload:
+            write(conn)
+        assert search.search(conn, "figma: seats*").at[0, "request_id"] == 2
+        assert search.search(conn, 'figma OR "chairs"').empty
+        assert search.search(conn, "?! ()").empty
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from buyit import ingest
+from buyit.vendors import VendorIndex
+
+VENDORS = [(1, "Figma"), (2, "Microsoft"), (3, "Amazon Business"), (4, "Dell"), (5, "T")]
+ALIASES = [("MSFT", 2), ("Dell Technologies", 4)]
+
+
+def make_index():
+    return VendorIndex(VENDORS, ALIASES)
+
+
+def test_key_resolves_exact_names_and_aliases_only():
+    index = make_index()
+    assert index.key("Microsoft Corp.") == "Microsoft"
+    assert index.key("MSFT") == "Microsoft"
+    assert index.key("Dell Financial Services") != "Dell"
+    assert index.key("T-Mobile") != "T"
+    assert index.candidates("Dell Financial Services") == ["Dell"]
+
+
+def test_similar_invoice_vendor_is_a_mismatch():
+    chunk = pd.DataFrame({
+        "po_number": ["PO-1", "PO-2", "PO-3"],
+        "vendor_name": ["Dell Financial Services", "T-Mobile", "Dell Technologies"],
+        "invoice_number": ["A-1", "B-1", "C-1"],
+        "invoice_amount": [10.0, 10.0, 10.0],
+        "invoice_date": ["2026-01-01"] * 3,
+    })
+    pos = pd.DataFrame({"po_number": ["PO-1", "PO-2", "PO-3"], "po_vendor_name": ["Dell", "T", "Dell"],
+                        "total_amount": [100.0, 100.0, 100.0]})
+    matched = ingest.match_invoices(chunk, pos, 50, make_index())
+    assert list(matched["status"]) == ["Exception", "Exception", "Matched"]
+    assert matched["exception_reason"][0].startswith("Vendor mismatch: PO=Dell vs Invoice=Dell Financial Services")
+
+
+def test_match_ignores_one_letter_and_stop_word_keys():
+    index = make_index()
+    assert index.match("We don't have laptops, need 5 units") == ""
+    assert index.match("need AT&T lines") == ""
+    assert index.match("Need 3 MSFT Surface laptops") == "Microsoft"
+    assert index.resolve("T") == "T"
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from buyit import storage, workflow
+
+
+def submit(conn, n):
+    return [workflow.submit_request(conn, "Ana", "IT", "Laptop", 1, 1000, "Test", "Dell") for _ in range(n)]
+
+
+def statuses(conn, ids):
+    rows = conn.execute(text("SELECT request_id, status FROM requests ORDER BY request_id")).all()
+    return [status for request_id, status in rows if request_id in ids]
+
+
+def order(request_id, po_number=""):
+    return {"request_id": request_id, "po_number": po_number, "created_by": "Shalini", "vendor_name": "Dell",
+            "total_amount": 1000}
+
+
+def test_decide_skips_ids_that_are_no_longer_pending(engine):
+    with engine.begin() as conn:
+        ids = submit(conn, 4)
+        assert workflow.decide_requests(conn, ids[:1], "Rejected", "Isha", "Too expensive") == ids[:1]
+        conn.execute(text("UPDATE requests SET status = 'Pending Approval' WHERE request_id = :id"), {"id": ids[1]})
+
+        # Rejected, Pending Approval, Submitted, Submitted, and an unknown ID.
+        assert workflow.decide_requests(conn, ids + [999], "Approved", "Isha") == ids[1:]
+        assert statuses(conn, ids) == ["Rejected", "Approved", "Approved", "Approved"]
+        decisions = conn.execute(text("SELECT request_id, decision FROM approvals ORDER BY approval_id")).all()
+        assert decisions == [(ids[0], "Rejected")] + [(i, "Approved") for i in ids[1:]]
+
+        assert workflow.decide_requests(conn, ids, "Approved", "Isha") == []
+
+
+def test_decide_validates_before_writing(engine):
+    with engine.begin() as conn:
+        ids = submit(conn, 1)
+        with pytest.raises(ValueError, match="Comments required"):
+            workflow.decide_requests(conn, ids, "Rejected", "Isha", "  ")
+        with pytest.raises(ValueError, match="Unknown decision"):
+            workflow.decide_requests(conn, ids, "Maybe", "Isha")
+        assert statuses(conn, ids) == ["Submitted"]
+
+
+def test_duplicate_po_number_rolls_back_the_whole_batch(engine):
+    with engine.begin() as conn:
+        ids = submit(conn, 3)
+        workflow.decide_requests(conn, ids, "Approved", "Isha")
+        workflow.create_pos(conn, [order(ids[0], "PO-TAKEN")])
+
+    with pytest.raises(IntegrityError):
+        storage.run_in_transaction(engine, lambda conn: workflow.create_pos(
+            conn, [order(ids[1]), order(ids[2], "PO-TAKEN")]))
+
+    with engine.connect() as conn:
+        assert statuses(conn, ids) == ["PO Created", "Approved", "Approved"]
+        assert conn.execute(text("SELECT po_number FROM purchase_orders")).scalars().all() == ["PO-TAKEN"]
+
+
+def test_po_transitions_skip_ids_in_the_wrong_status(engine):
+    with engine.begin() as conn:
+        ids = submit(conn, 4)
+        workflow.decide_requests(conn, ids[:3], "Approved", "Isha")
+        # Only Approved requests get a PO; the Submitted one is skipped.
+        assert workflow.create_pos(conn, [order(i) for i in ids]) == ids[:3]
+
+        assert workflow.close_pos(conn, ids[:1]) == ids[:1]
+        # Closed, Created, Created, no PO.
+        assert workflow.mark_pos_sent(conn, ids) == ids[1:3]
+        assert workflow.mark_pos_sent(conn, ids) == []
+        assert statuses(conn, ids) == ["Closed", "PO Sent", "PO Sent", "Submitted"]
+
+        assert workflow.close_pos(conn, ids) == ids[1:3]
+        assert statuses(conn, ids) == ["Closed", "Closed", "Closed", "Submitted"]
+        pos = conn.execute(text("SELECT status FROM purchase_orders ORDER BY request_id")).scalars().all()
+        assert pos == ["Closed", "Closed", "Closed"]